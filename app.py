@@ -2,22 +2,39 @@
 
 APP_VERSION = "v0.1.2"
 
-import os, base64, tempfile, logging, resource, psutil
-import discord
-from discord.ext import commands, tasks
-from discord import app_commands
-from dotenv import load_dotenv
-from sim.team_summary import team_summary
-from sim.player_lookup import player_lookup
-from sim.ops import simulate_add, simulate_drop, simulate_whatif
+import startup  # first: starts the boot clock
+import os, io, re, time, json, hashlib, asyncio, threading, importlib, base64, tempfile, logging, resource
+with startup.timed_import("discord"):
+    import discord
+    from discord.ext import commands, tasks
+    from discord import app_commands
+with startup.timed_import("dotenv"):
+    from dotenv import load_dotenv
+with startup.timed_import("sim"):
+    from sim.team_summary import team_summary
+    from sim.player_lookup import player_lookup
+    from sim.ops import simulate_add, simulate_drop, simulate_whatif, _pick_name
+    from sim.diff import diff_snapshots, summarize
+    from sim.audit import audit, new_violations
+    from sim.attr_index import attr_index, parse_filters, select, byes
+    from sim.query import columns, run_query, QueryError, plan_cache
+    from sim.market import market, position_market
+    from sim.overlay import books, parse_trade, simulate_trade, resolve_team
+    from sim.patch import apply_roster_ops
+    from sleeper_players import lookup_player
+    import render
 
 # ---- Load env FIRST
 load_dotenv()
 BOT_ENV = os.getenv("BOT_ENV", "prod")
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN", "")
 DISCORD_GUILD_ID = int(os.getenv("DISCORD_GUILD_ID", "0"))
-SHEET_ID = os.getenv("RSFF_SHEET_ID", "")
-RANGES = [r.strip() for r in os.getenv("RSFF_RANGES", "").split(",") if r.strip()]
+# Sheet / ranges / feed channel are per league: see leagues.py (RSFF_LEAGUES_FILE or the classic
+# RSFF_SHEET_ID, RSFF_RANGES, RSFF_FEED_CHANNEL_ID variables for a single league).
+SNAPSHOT_FRESH_S = float(os.getenv("RSFF_SNAPSHOT_FRESH_MINUTES", "10")) * 60  # reconnects reuse a snapshot this young
+TREE_HASH_FILE = os.getenv("RSFF_TREE_HASH_FILE", ".rsff_tree_hash")
+HTTP_PORT = int(os.getenv("RSFF_HTTP_PORT", "0") or 0)  # JSON/CSV export for other tools (off when 0)
+WRITEBACK_FLUSH_S = float(os.getenv("RSFF_WRITEBACK_FLUSH_SECONDS", "10"))  # queue flush tick (RSFF_WRITEBACK=1)
 
 # ---- Optional: base64 SA shim
 b64 = os.getenv("GCP_SA_JSON_BASE64")
@@ -27,10 +44,25 @@ if b64 and not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
         f.write(base64.b64decode(b64))
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = path
 
-# ---- Imports that rely on env (after shim)
-from sheets_sync import pull_snapshot
-from sim.cap import cap_summary, cap_detail
-from sim.ops import simulate_add, simulate_drop
+# ---- Imports that rely on env (after shim). sheets_sync defers googleapiclient to first pull.
+with startup.timed_import("sync"):
+    from sheets_sync import pull_snapshot, fetch_stats
+    import history_store
+    from snapshot_cache import save_snapshot, load_snapshot
+    from leagues import LeagueRegistry, ROLE as SNAPSHOT_ROLE, SHARED_DIR
+    from shared_snapshot import publish
+    from sim.identity import player_table
+    from sim.cap import cap_summary, cap_detail
+    from sim.ops import simulate_add, simulate_drop
+    import profiling
+    import memstats
+    import sleeper_players
+    import outbound
+    import tracing
+    import http_export
+    import writeback
+
+tracing.configure()  # RSFF_TRACE_FILE: JSON spans per sync/command stage; off when unset
 
 # ---- Bot intents and creation (BEFORE any decorators)
 intents = discord.Intents.none()
@@ -50,51 +82,428 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("rsff")
 log.info(f"bot.intents.message_content={bot.intents.message_content} BOT_ENV={BOT_ENV} GUILD_ID={DISCORD_GUILD_ID}")
 
-SNAPSHOT = None
+LEAGUES = LeagueRegistry.from_env()
+_BOOT_AT = time.monotonic()
+_DISCONNECTED_AT = None    # monotonic time of the last gateway disconnect
 
-# ---- Background sync
-@tasks.loop(minutes=30)
-async def autosync():
-    global SNAPSHOT
+def _pull(league, force: bool = False):
+    """
+    Fetch a fresh snapshot for a league, persist it for the next boot / after eviction
+    and append it to the league's history store. Runs in a worker thread.
+    Unless forced, the full fetch is skipped when the sheet's change token still matches
+    the snapshot we hold, and that snapshot is returned as-is.
+    Failures are counted by the league's circuit breaker and re-raised; the snapshot we
+    hold keeps serving, flagged stale in reply footers until a pull succeeds again.
+    """
+    with league.pull_lock, tracing.span("sync", league=league.name, force=force) as sp:
+        try:
+            snap = _pull_locked(league, force, sp)
+        except Exception as e:
+            league.breaker.record_failure(e)
+            held = league.peek()
+            if held is not None:
+                held["_stale"] = "Sheets unreachable, showing last good copy"
+            raise
+        league.breaker.record_success()
+        snap.pop("_stale", None)
+        sp.set(hash=snap["hash"])
+        return snap
+
+def _pull_locked(league, force: bool, sp):
+    """_pull's body; the caller holds league.pull_lock. `sp` is the sync's trace span."""
+    snap = pull_snapshot(league.sheet_id, league.ranges, since=None if force else league.rev)
+    if snap is None:
+        current = league.peek() or load_snapshot(league.snapshot_file)
+        if current is not None and current.get("rev") == league.rev:
+            league.last_pull = current["checked_at"] = time.time()
+            sp.set(fetched=False)
+            return current
+        snap = pull_snapshot(league.sheet_id, league.ranges)  # disk copy went missing: fetch after all
+    sp.set(fetched=True)
+    snap["checked_at"] = time.time()
+    startup.mark("first Sheets pull done")
+    return _install_snapshot(league, snap)
+
+def _install_snapshot(league, snap):
+    """Persist, record, index, audit, publish and swap in a new snapshot (pulled or patched)."""
+    with tracing.span("sync.save"):
+        try:
+            save_snapshot(snap, league.snapshot_file)
+        except Exception as e:
+            log.error(f"[{league.name}] snapshot cache write failed: {e}")
+    with tracing.span("sync.history") as hs:
+        try:
+            res = history_store.record_snapshot(snap, league.history_db)
+            hs.set(changed=res["changed"])
+            if res["stored"]:
+                log.info(f"[{league.name}] history: stored {snap['hash']} ({res['changed']} changed rows)")
+        except Exception as e:
+            log.error(f"[{league.name}] history store failed: {e}")
     try:
-        SNAPSHOT = pull_snapshot(SHEET_ID, RANGES)
-        log.info(f"⏱️ autosync → {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}")
+        with tracing.span("sync.index"):
+            player_table(snap)  # built once here: commands (and owner-published workers) find it ready
+            attr_index(snap)
+            columns(snap)
+            market(snap)
+            books(snap)
+        with tracing.span("sync.audit"):
+            audit(snap)  # stored on the snapshot: !audit and the feed read it, owners publish it
     except Exception as e:
-        log.error(f"autosync failed: {e}")
+        log.error(f"[{league.name}] audit failed: {e}")
+    if SNAPSHOT_ROLE == "owner":
+        with tracing.span("sync.publish"):
+            try:
+                gen = publish(snap, SHARED_DIR, league.name)
+                log.info(f"[{league.name}] published shared generation {gen}")
+            except Exception as e:
+                log.error(f"[{league.name}] shared snapshot publish failed: {e}")
+    with tracing.span("sync.swap"):
+        if league.resident or len(LEAGUES.leagues) == 1:
+            league.set_snapshot(snap)
+        else:
+            league.last_pull = time.time()  # evicted leagues stay on disk until someone asks
+            league.rev = snap.get("rev")
+    memstats.record_sync(league.name, snap["hash"])
+    return snap
+
+def _league(ctx):
+    guild = getattr(ctx, "guild", None)
+    return LEAGUES.for_guild(guild.id if guild else None)
+
+def _snap(ctx):
+    """Snapshot of the league serving this guild (reloaded from disk if it was evicted)."""
+    league = _league(ctx)
+    if league is None:
+        raise commands.CommandError("This server isn't mapped to an RSFF league.")
+    snap = LEAGUES.snapshot(league)
+    if snap is None:
+        if league.breaker.failures:
+            raise commands.CommandError(f"No snapshot for {league.name} yet — Google Sheets is unreachable, "
+                                        f"retrying in {league.breaker.wait_s() / 60:.0f}m.")
+        raise commands.CommandError(f"No snapshot for {league.name} yet — try again after the first sync.")
+    _revalidate(league)
+    return snap
+
+def _revalidate(league):
+    """Stale-while-revalidate: answer from the held snapshot, but bring an old one's refresh forward."""
+    if SNAPSHOT_ROLE == "worker" or time.time() - league.last_pull < SNAPSHOT_FRESH_S:
+        return
+    if league.breaker.allow() and league.next_due > time.monotonic():
+        LEAGUES.reschedule(league, 0)  # the shared fetcher picks it up on its next tick
+
+def _reply(ctx, text: str, **kwargs):
+    """Queue a reply (split into 2,000-char pages) on the paced send queue; returns without waiting."""
+    return outbound.OUTBOX.send(ctx.channel.id, ctx.send, text, **kwargs)
+
+def _offload(fn, *args, **kwargs):
+    """Run blocking work on a worker thread, inside the active !profile session and the caller's span."""
+    return asyncio.to_thread(tracing.bind(profiling.wrap(fn)), *args, **kwargs)
+
+async def _deferred(interaction: discord.Interaction, compute):
+    """Ack a slash command inside Discord's 3s window, build the reply off-loop, stream it as followups."""
+    name = interaction.command.name if interaction.command else "?"
+    with tracing.span("command", command=f"/{name}", user=interaction.user.id, guild=interaction.guild_id) as sp:
+        with tracing.span("discord.defer"):
+            await interaction.response.defer(thinking=True)
+        try:
+            text = await _offload(compute)
+        except Exception as e:
+            sp.fail(e)
+            text = f"❌ {e}"
+        outbound.OUTBOX.send(interaction.channel_id, interaction.followup.send, text)
+
+def _warm_heavy_imports():
+    """Load optional heavy modules off the event loop so the first fuzzy match doesn't pay for them."""
+    for mod in ("rapidfuzz.process", "rapidfuzz.fuzz"):
+        try:
+            importlib.import_module(mod)
+        except Exception:
+            pass
+    startup.mark("background imports warm")
+
+_CHANGE_ICONS = {
+    "ADD": "➕", "DROP": "➖", "IR_ON": "🚑", "IR_OFF": "💪",
+    "DP_ON": "⭐", "DP_OFF": "☆", "SALARY": "💲",
+}
+
+def _change_line(c) -> str:
+    icon = _CHANGE_ICONS.get(c["kind"], "•")
+    if c["kind"] == "SALARY":
+        return f"{icon} {c['kind']} {c['player']} ({c['team']}) `${c['salary_before']:,.0f}` → `${c['salary']:,.0f}`"
+    return f"{icon} {c['kind']} {c['player']} ({c['team']}) `${c['salary']:,.0f}`"
+
+def _feed_text(snap, changes, limit: int = 15) -> str:
+    counts = ", ".join(f"{k}:{v}" for k, v in summarize(changes).items())
+    lines = [f"**Transactions** ({counts})"] + [_change_line(c) for c in changes[:limit]]
+    if len(changes) > limit:
+        lines.append(f"_…and {len(changes) - limit} more_")
+    lines.append(render.footer(snap))
+    return "\n".join(lines)
+
+# ---- Background sync: one shared fetcher ticks and pulls at most one due league per tick,
+# spaced by RSFF_FETCH_SPACING_SECONDS; each league's AdaptiveScheduler picks its next due time.
+async def _sync_league(league):
+    sched = league.scheduler
+    if league.peek() is not None and time.time() - league.last_pull < sched.min_s / 2:
+        # just pulled (boot/restore/manual sync) — nothing to do yet
+        LEAGUES.reschedule(league, sched.min_s)
+        return
+    if not league.breaker.allow():
+        LEAGUES.reschedule(league, league.breaker.wait_s())  # circuit open: leave Sheets alone
+        return
+    prev = league.peek()
+    if prev is None and league.feed_channel_id:
+        prev = load_snapshot(league.snapshot_file)  # evicted league: diff against the disk copy
+    try:
+        snap = await _offload(_pull, league)
+    except Exception as e:
+        LEAGUES.reschedule(league, league.breaker.wait_s())
+        log.error(f"[{league.name}] autosync failed: {e} | {league.breaker.describe()}")
+        return
+    changed = bool(prev) and prev["hash"] != snap["hash"]
+    LEAGUES.reschedule(league, sched.next_delay(changed=changed))
+    log.info(f"⏱️ [{league.name}] autosync → {snap['hash']} @ {snap['ts']} | {sched.describe()}")
+    if league.feed_channel_id and changed:
+        _post_feed(league, prev, snap)
+
+def _post_feed(league, prev, snap):
+    """Transactions and newly introduced audit violations between two snapshots, to the feed channel."""
+    changes = diff_snapshots(prev, snap)
+    channel = bot.get_channel(league.feed_channel_id)
+    if changes and channel:
+        try:
+            outbound.OUTBOX.send(channel.id, channel.send, _feed_text(snap, changes))
+        except Exception as e:
+            log.error(f"[{league.name}] transaction feed failed: {e}")
+    fresh = new_violations(prev, snap)  # only what this sync introduced
+    if fresh and channel:
+        outbound.OUTBOX.send(channel.id, channel.send, render.audit_text(snap, fresh, title="New audit violations"))
+
+@tasks.loop(seconds=15)
+async def autosync():
+    for lg in LEAGUES.evict_idle():
+        log.info(f"[{lg.name}] evicted after idling")
+    league = LEAGUES.next_due()
+    if league is not None:
+        await _sync_league(league)
 
 @autosync.before_loop
 async def before_autosync():
     await bot.wait_until_ready()
 
+# ---- Write-back (RSFF_WRITEBACK=1): approved transactions are queued per league and flushed to
+# Rosters in batches; the held snapshot is patched in place of a full resync.
+def _rosters_range(league) -> str:
+    return next((r for r in league.ranges if r.split("!")[0].strip("'") == "Rosters"), "Rosters!A:K")
+
+def _flush_writeback(league):
+    """
+    Flush one batch of the league's queue. Runs in a worker thread, under the league's
+    pull lock so a sync can't swap the snapshot mid-write. Returns (prev, new, result);
+    `new` is the patched snapshot when anything was written.
+    """
+    q = writeback.queue(league.writeback_db)
+    with league.pull_lock, tracing.span("writeback.flush", league=league.name) as sp:
+        prev = LEAGUES.snapshot(league)
+        if prev is None:
+            return None, None, {"status": "idle", "written": [], "conflicts": [], "coalesced": 0, "deferred": 0}
+        res = q.flush(prev, league.sheet_id, _rosters_range(league))
+        sp.set(status=res["status"], written=len(res["written"]), conflicts=len(res["conflicts"]))
+        if not res["written"]:
+            return prev, None, res
+        with tracing.span("writeback.patch"):
+            new = apply_roster_ops(prev, res["written"])
+        new["checked_at"] = time.time()
+        return prev, _install_snapshot(league, new), res
+
+async def _flush_league(league) -> dict:
+    prev, new, res = await _offload(_flush_writeback, league)
+    for op, reason in res["conflicts"]:
+        log.warning(f"[{league.name}] write-back #{op['id']} {op['kind']} {op['player']} conflicts: {reason}")
+    if res["status"] == "stale":
+        LEAGUES.reschedule(league, 0)  # the sheet moved on: resync, the ops stay queued for the next flush
+    if new is not None:
+        LEAGUES.adopt(league, new)
+        log.info(f"[{league.name}] write-back: {len(res['written'])} op(s) written → {new['hash']}")
+        if league.feed_channel_id:
+            _post_feed(league, prev, new)
+    return res
+
+@tasks.loop(seconds=WRITEBACK_FLUSH_S)
+async def writeback_flusher():
+    for lg in LEAGUES.leagues:
+        q = writeback.queue(lg.writeback_db)
+        if not q.pending(1) or not q.ready():
+            continue
+        try:
+            await _flush_league(lg)
+        except Exception as e:
+            log.error(f"[{lg.name}] write-back flush failed: {e} | {q.breaker.describe()}")
+
+@writeback_flusher.before_loop
+async def before_writeback_flusher():
+    await bot.wait_until_ready()
+
 # ---- Lifecycle
-@bot.event
-async def on_ready():
-    await bot.change_presence(activity=discord.Game(name=f"RSFF {BOT_ENV} {APP_VERSION} — !help"))
-    global SNAPSHOT
-    SNAPSHOT = pull_snapshot(SHEET_ID, RANGES)
+def _tree_hash(guild) -> str:
+    """Stable hash of the slash-command definitions that would be pushed to Discord."""
+    payload = []
+    for cmd in bot.tree.get_commands(guild=guild):
+        try:
+            payload.append(cmd.to_dict(bot.tree))
+        except TypeError:  # discord.py < 2.4
+            payload.append(cmd.to_dict())
+    blob = json.dumps({"guild": guild.id if guild else 0, "commands": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
 
+async def _sync_tree_if_changed():
+    """Push the command tree (per league guild, else globally) only when its definition changed."""
+    guild_ids = sorted({lg.guild_id for lg in LEAGUES.leagues if lg.guild_id})
     try:
-        if DISCORD_GUILD_ID:
-            guild = discord.Object(id=DISCORD_GUILD_ID)
+        with open(TREE_HASH_FILE) as f:
+            pushed = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pushed = {}
+    for gid in guild_ids or [0]:
+        guild = discord.Object(id=gid) if gid else None
+        if guild:
             bot.tree.copy_global_to(guild=guild)
-            await bot.tree.sync(guild=guild)
-            print(f"✅ Slash commands synced to guild {DISCORD_GUILD_ID}")
+        digest = _tree_hash(guild)
+        if pushed.get(str(gid)) == digest:
+            log.info(f"slash commands unchanged for {gid or 'global'} — skipping tree sync")
+            continue
+        try:
+            synced = await bot.tree.sync(guild=guild)
+            where = f"to guild {gid}" if guild else "globally"
+            print(f"✅ Slash commands synced {where} ({len(synced)} cmds)")
+            pushed[str(gid)] = digest
+        except Exception as e:
+            print(f"Slash sync failed: {e}")
+    with open(TREE_HASH_FILE, "w") as f:
+        json.dump(pushed, f)
+
+@bot.event
+async def setup_hook():
+    """One-time initialization: runs once per process, before the first gateway connect."""
+    threading.Thread(target=_warm_heavy_imports, name="warm-imports", daemon=True).start()
+    now = time.time()
+    for lg in LEAGUES.leagues:
+        try:
+            age = now - os.path.getmtime(lg.snapshot_file)
+        except OSError:
+            age = None
+        if age is not None and age < SNAPSHOT_FRESH_S:
+            # fresh disk copy: serve it (lazily) and let the shared fetcher come back later
+            LEAGUES.reschedule(lg, SNAPSHOT_FRESH_S - age)
+    if SNAPSHOT_ROLE == "worker":
+        startup.mark("commands servable (attached to shared snapshots)")
+    elif len(LEAGUES.leagues) == 1:
+        lg = LEAGUES.leagues[0]
+        if lg.restore():
+            # Serve from the last good snapshot right away; the Sheets client is built later, off-loop
+            startup.mark("commands servable (restored snapshot)")
         else:
-            synced = await bot.tree.sync()
-            print(f"✅ Slash commands globally synced ({len(synced)} cmds)")
-    except Exception as e:
-        print(f"Slash sync failed: {e}")
+            try:
+                await _offload(_pull, lg)
+                startup.mark("commands servable (fresh pull)")
+            except Exception as e:
+                # boot anyway; commands explain the outage and autosync keeps retrying
+                LEAGUES.reschedule(lg, lg.breaker.wait_s())
+                log.error(f"[{lg.name}] first pull failed: {e} | {lg.breaker.describe()}")
+    else:
+        startup.mark("commands servable (leagues restore on demand)")
+    await _sync_tree_if_changed()
+    if not autosync.is_running():
+        autosync.start()
+    if writeback.ENABLED and SNAPSHOT_ROLE != "worker" and not writeback_flusher.is_running():
+        writeback_flusher.start()
+    if HTTP_PORT:
+        try:
+            await http_export.start(LEAGUES, os.getenv("RSFF_HTTP_HOST", "127.0.0.1"), HTTP_PORT)
+        except OSError as e:
+            log.error(f"HTTP export could not listen on {HTTP_PORT}: {e}")
+
+@bot.event
+async def on_ready():
+    """Per-connect work only: on_ready fires again after every gateway reconnect."""
+    global _DISCONNECTED_AT
+    await bot.change_presence(activity=discord.Game(name=f"RSFF {BOT_ENV} {APP_VERSION} — !help"))
+    for lg in LEAGUES.leagues:
+        if lg.resident and time.time() - lg.last_pull > SNAPSHOT_FRESH_S:
+            LEAGUES.reschedule(lg, 0)  # stale after the outage: let the shared fetcher refresh it
+    if not autosync.is_running():
+        autosync.start()
 
-    autosync.start()
-    print(f"✅ Logged in as {bot.user} | Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}")
+    if _DISCONNECTED_AT is not None:
+        log.info(f"reconnect→ready in {time.monotonic() - _DISCONNECTED_AT:.2f}s")
+        _DISCONNECTED_AT = None
+    else:
+        startup.mark("gateway ready")
+        log.info(f"boot→ready in {time.monotonic() - _BOOT_AT:.2f}s")
+        for line in startup.report():
+            log.info(f"startup: {line}")
+    print(f"✅ Logged in as {bot.user} | Leagues: " + "; ".join(lg.describe() for lg in LEAGUES.leagues))
     print(f"Bot user: {bot.user} id={bot.user.id} ENV={BOT_ENV}")
 
+@bot.event
+async def on_disconnect():
+    global _DISCONNECTED_AT
+    if _DISCONNECTED_AT is None:
+        _DISCONNECTED_AT = time.monotonic()
+
+@bot.event
+async def on_resumed():
+    global _DISCONNECTED_AT
+    if _DISCONNECTED_AT is not None:
+        log.info(f"reconnect→resumed in {time.monotonic() - _DISCONNECTED_AT:.2f}s")
+        _DISCONNECTED_AT = None
+
+@bot.event
+async def on_command(ctx):
+    league = _league(ctx)
+    if league:
+        league.scheduler.note_command()
+
+@bot.event
+async def on_command_completion(ctx):
+    ttfr = startup.first_response()
+    if ttfr is not None:
+        log.info(f"startup: time to first response {ttfr:.2f}s")
+    if profiling.ACTIVE is not None:
+        await _profile_note(ctx)
+
 @bot.event
 async def on_command_error(ctx, error):
+    if profiling.ACTIVE is not None:
+        await _profile_note(ctx)
     if isinstance(error, commands.CommandNotFound):
         return
     await ctx.send(f"⚠️ {type(error).__name__}: {error}")
 
+# ---- Profiling (!profile): off unless an admin starts a session
+async def _profile_finish(sess):
+    if profiling.ACTIVE is not sess:
+        return  # already stopped (count reached, timer fired or `!profile stop`)
+    report = profiling.stop()
+    name = f"rsff-profile-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+    log.info(f"profile finished: {sess.commands} commands, {sess.offloaded} worker calls")
+    try:
+        await sess.channel.send(f"📈 Profile done ({sess.commands} commands, {sess.offloaded} worker calls).",
+                                file=discord.File(io.BytesIO(report.encode()), filename=name))
+    except Exception as e:
+        log.error(f"profile upload failed: {e}")
+
+async def _profile_note(ctx):
+    sess = profiling.ACTIVE
+    if ctx.command is None or ctx.command.name == "profile":
+        return
+    if sess.note_command():
+        await _profile_finish(sess)
+
+async def _profile_timer(sess, seconds: float):
+    await asyncio.sleep(seconds)
+    await _profile_finish(sess)
+
 # ---- Debug helpers
 @bot.command(name="ping")
 async def ping_cmd(ctx):
@@ -104,16 +513,55 @@ async def ping_cmd(ctx):
 async def slash_ping(interaction: discord.Interaction):
     await interaction.response.send_message("pong (/)—ephemeral", ephemeral=True)
 
+def _memory_report(named: list, messages: list) -> list[str]:
+    """!statusmem body: RSS, deep sizes per league/tab/index and cache, retained snapshots, tracemalloc diff."""
+    rss = memstats.rss_bytes()
+    peak = max(rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)  # Linux reports KiB
+    lines = [f"Memory RSS: `{memstats.fmt_bytes(rss)}` (peak `{memstats.fmt_bytes(peak)}`)"]
+
+    # Deep sizes: one `seen` set across everything, so shared objects count once (first owner wins)
+    seen = set()
+    for name, s in named:
+        tabs, idx = memstats.snapshot_sizes(s, seen)
+        total = sum(b for *_, b in tabs) + sum(b for _, b in idx)
+        lines.append(f"**{name}** `{s['hash']}` — {memstats.fmt_bytes(total)}")
+        lines.append("  Tabs: " + ", ".join(f"{t} {memstats.fmt_bytes(b)} ({n} rows)" for t, n, b in tabs))
+        if idx:
+            lines.append("  Indexes: " + ", ".join(f"{k} {memstats.fmt_bytes(b)}" for k, b in idx))
+
+    caches = [f"discord messages {len(messages)} ({memstats.fmt_bytes(memstats.deep_size(messages, seen))})"]
+    for db, c in history_store.memory_caches().items():
+        caches.append(f"{db} {memstats.fmt_bytes(memstats.deep_size(c, seen))}")
+    if sleeper_players.mapped_bytes():
+        caches.append(f"sleeper index {memstats.fmt_bytes(sleeper_players.mapped_bytes())} mapped")
+    lines.append("Caches: " + ", ".join(caches))
+
+    retained = memstats.retained_snapshots([s for _, s in named])
+    if retained:
+        lines.append(f"⚠️ {len(retained)} old snapshot(s) still referenced: " + "; ".join(
+            f"`{r['hash']}` ← {', '.join(sorted(set(refs))) or '?'}" for r, refs in retained[:5]))
+    else:
+        lines.append("Old snapshots retained: none")
+
+    if memstats.RSS_HISTORY:
+        ring = list(memstats.RSS_HISTORY)[-8:]
+        lines.append("RSS per sync: " + " → ".join(
+            f"{time.strftime('%H:%M', time.localtime(t))} {memstats.fmt_bytes(b)}" for t, _, _, b in ring))
+    lines += memstats.generation_diff()
+    return lines
+
 @bot.command(name="statusmem")
 async def statusmem_cmd(ctx):
-    rss_mb = psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
-    tabs = SNAPSHOT.get("tabs", {})
-    lines = [
-        f"Memory RSS: `{rss_mb:,.0f} MB`",
-        "Tabs: " + ", ".join([f"{k}:{len(v)}" for k, v in tabs.items()]),
-        f"Snapshot `{SNAPSHOT['hash']}` @ {SNAPSHOT['ts']}",
-    ]
-    await ctx.send("\n".join(lines))
+    snap = _snap(ctx)
+    # collect references on the loop; the deep-size walks and the gc scan run on a worker thread
+    named = []
+    for lg in LEAGUES.leagues:
+        s = lg.reader.current() if lg.reader is not None else lg.peek()
+        if s is not None:
+            named.append((lg.name, s))
+    lines = await _offload(_memory_report, named, list(bot.cached_messages))
+    lines.append(f"Snapshot `{snap['hash']}` @ {snap['ts']}")
+    _reply(ctx, "\n".join(lines))
 
 @bot.tree.command(name="help", description="Show RSFF Bot commands")
 async def slash_help(interaction: discord.Interaction):
@@ -125,12 +573,62 @@ async def slash_help(interaction: discord.Interaction):
         "`!drop <player>` — Sim drop from your team (dead cap applies).",
         "`!leaders` — Top 5 cap space remaining.",
         "`!status` — Snapshot/time and row counts.",
-        "`!statusmem` — Process memory + tab counts.",
+        "`!statusmem` — Memory by tab/index/cache, retained snapshots, RSS per sync.",
         "`!sync` — Admin only: refresh from Google Sheet.",
+        "`/teamsum`, `/capdetail`, `/leaders`, `/whatif` — Same as the `!` versions; long replies arrive in pages.",
     ]), ephemeral=True)
 
+# ---- Heavy slash commands: defer at once, compute in a worker thread, stream pages back
+@bot.tree.command(name="leaders", description="Top 5 cap space remaining")
+async def slash_leaders(interaction: discord.Interaction):
+    def compute():
+        snap = _snap(interaction)
+        return render.leaders_text(snap, render.leaders_rows(snap))
+    await _deferred(interaction, compute)
+
+@bot.tree.command(name="teamsum", description="Full team summary: net cap, DP/IR relief, roster")
+@app_commands.describe(team="Team name (defaults to your mapped team)")
+async def slash_teamsum(interaction: discord.Interaction, team: str | None = None):
+    def compute():
+        snap = _snap(interaction)
+        query = team or resolve_user_team(snap, interaction.user)
+        if not query:
+            return "❓ Couldn’t map you to a team. Try `/teamsum <team>`."
+        return render.teamsum_text(snap, team_summary(snap, query))
+    await _deferred(interaction, compute)
+
+@bot.tree.command(name="capdetail", description="Top counted salaries + DP/IR relief")
+@app_commands.describe(team="Team name (defaults to your mapped team)")
+async def slash_capdetail(interaction: discord.Interaction, team: str | None = None):
+    def compute():
+        snap = _snap(interaction)
+        query = team or resolve_user_team(snap, interaction.user)
+        if not query:
+            return "❓ I couldn't map you to a team. Add your handle to Owners2025.`discord user`, or pass a team."
+        return render.capdetail_text(snap, cap_detail(snap, query, top_n=8))
+    await _deferred(interaction, compute)
+
+@bot.tree.command(name="whatif", description="Simulate add/drop moves for your team")
+@app_commands.describe(moves="e.g. add aaron rodgers drop mahomes")
+async def slash_whatif(interaction: discord.Interaction, moves: str):
+    def compute():
+        snap = _snap(interaction)
+        team = resolve_user_team(snap, interaction.user)
+        if not team:
+            return "❓ I couldn't map you to a team. Add your handle to Owners2025.discord user."
+        add_query, drop_query = render.parse_whatif(moves)
+        if not add_query and not drop_query:
+            return "Try: `/whatif add <player>` or `/whatif drop <player>` or `/whatif add <p1> drop <p2>`"
+        res = simulate_whatif(snap, team, add_query, drop_query)
+        if res["status"] == "INVALID":
+            return f"❌ {res['reason']}"
+        return render.whatif_text(snap, team, add_query, drop_query, res, team_summary(snap, team))
+    await _deferred(interaction, compute)
+
 @bot.command(name="help")
 async def help_cmd(ctx):
+    league = _league(ctx)
+    snap = LEAGUES.snapshot(league) if league else None
     lines = [
         "**RSFF Bot — Commands**",
         "",
@@ -140,28 +638,43 @@ async def help_cmd(ctx):
         "`!teamsum [team]` — Full team summary (net used, gross, DP, IR, players).",
         "",
         "__Players__",
-        "`!player <name>` — Player info: AAV, NFL team, bye, rostered-by, DP/IR, Sleeper ID.",
+        "`!player <name>` — Player info: AAV (+ position percentile), NFL team, bye, rostered-by, DP/IR, Sleeper ID (+ status/injury if indexed).",
+        "`!players pos=RB nfl=KC status=FA` — League-wide player search (keys: pos, nfl, bye, team, status).",
+        "`!byes <week> [pos]` — Rostered players on bye that week, by team.",
+        "`!market [pos]` — Salary percentiles by position (Salary2025 pool and rostered).",
+        "`!query <query>` — Ad-hoc filter/sort/group over all players, e.g. `!query status=fa aav<2m sort aav desc limit 10`,",
+        "    `!query rosters where ir group by team count having count>3`, `!query rostered group by pos sum aav, max aav`.",
         "",
         "__Transactions (simulated)__",
         "`!add <player>` — Sim add. Shows roster change and cap impact (before → after, Δ).",
         "`!drop <player>` — Sim drop. Applies dead-cap from rules and shows cap impact.",
         "`!whatif add <p1> [drop <p2>]` — Combined scenario with DP re-selection.",
         "    e.g., `!whatif add aaron rodgers drop mahomes`",
+        "`!trade <players> for <players> with <team>` — Both teams' cap, DP and roster size before → after.",
+        "    e.g., `!trade kelce, hill for adams with big dawgs` (use `nothing` for a one-sided deal)",
         "",
         "__Leaders & Status__",
         "`!leaders` — Top cap space remaining (Top 5).",
-        "`!status` — Snapshot hash/time and row counts.",
+        "`!status` — Snapshot hash/time, row counts and next autosync.",
         "`!version` — Bot version + snapshot.",
+        "`!startup` — Boot timeline: import times, time to first response.",
+        "`!history player <name>` / `!history team <team>` — Past roster moves / cap over time.",
+        "`!audit [team]` — Rule violations: over roster max, negative cap, multiple DP, DP on IR.",
         "",
         "__Admin__",
         "`!sync` — Admin only: refresh from Google Sheets.",
+        "`!leagues` — Admin only: leagues served by this bot and their sync state.",
+        "`!profile [N | <T>s] [cpu|sample] [mem]` — Admin only: profile the next N commands / T seconds, upload a report.",
+        "`!approve add <player> to <team>` / `!approve drop <player> from <team>` — Admin only: queue a transaction",
+        "    for the sheet (write-back, when enabled). `!writeback [flush]` — queue status / write now.",
         "",
         "_Notes:_",
         "• Team defaulting uses your Discord handle mapped in `Owners2025.discord user`.",
         "• Adds don’t hard-block at roster max; you’ll see a warning to drop someone.",
         "• Cap math follows RSFF rules: DP/IR relief and dead-cap on drops.",
-        f"_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_",
     ]
+    if snap:
+        lines.append(render.footer(snap))
     await ctx.send("\n".join(lines))
     
 # ---- Team resolution helpers + core commands
@@ -190,99 +703,170 @@ def resolve_user_team(snapshot, member) -> str | None:
             return c
     return None
 
+@bot.command(name="leagues")
+@commands.has_guild_permissions(administrator=True)
+async def leagues_cmd(ctx):
+    now = time.monotonic()
+    lines = [f"**Leagues** ({sum(lg.resident for lg in LEAGUES.leagues)}/{LEAGUES.max_resident} resident)"]
+    for lg in LEAGUES.leagues:
+        due = max(0.0, lg.next_due - now) / 60
+        lines.append(f"• {lg.describe()} — next pull in {due:.0f}m ({lg.scheduler.reason})")
+    await ctx.send("\n".join(lines))
+
+@bot.command(name="profile")
+@commands.has_guild_permissions(administrator=True)
+async def profile_cmd(ctx, *args: str):
+    """
+    !profile [N | <T>s] [cpu|sample] [mem] [top=K]
+      !profile 20            — cProfile the next 20 commands
+      !profile 60s sample    — sample all threads for 60 seconds (includes syncs)
+      !profile 30s mem       — also diff tracemalloc allocation sites over the window
+      !profile stop          — end early and upload what was captured
+    """
+    if args and args[0].lower() == "stop":
+        sess = profiling.ACTIVE
+        if sess is None:
+            return await ctx.send("No profile running.")
+        return await _profile_finish(sess)
+    if profiling.ACTIVE is not None:
+        return await ctx.send("⏳ A profile is already running — `!profile stop` to end it.")
+
+    count, seconds, mode, memory, top = 0, 0.0, "cpu", False, 25
+    for a in (x.lower() for x in args):
+        if a in ("cpu", "sample"):
+            mode = a
+        elif a in ("mem", "memory"):
+            memory = True
+        elif a.startswith("top="):
+            top = max(5, min(200, int(a[4:] or 25)))
+        elif a.endswith("s") and a[:-1].replace(".", "", 1).isdigit():
+            seconds = float(a[:-1])
+        elif a.isdigit():
+            count = int(a)
+        else:
+            return await ctx.send("Try `!profile 20`, `!profile 60s sample`, `!profile 30s mem` or `!profile stop`.")
+    if not count and not seconds:
+        count = 20
+
+    sess = profiling.start(mode=mode, commands=count, seconds=seconds, memory=memory, top=top)
+    sess.channel = ctx.channel
+    if seconds:
+        asyncio.create_task(_profile_timer(sess, seconds))
+    what = f"the next {count} commands" if count else ""
+    what += (" or " if count and seconds else "") + (f"{seconds:.0f}s" if seconds else "")
+    await ctx.send(f"📈 Profiling ({mode}{', tracemalloc' if memory else ''}) for {what}. "
+                   "The report is uploaded here when it ends.")
+
+@bot.command(name="startup")
+async def startup_cmd(ctx):
+    await ctx.send("**Startup timeline**\n```\n" + "\n".join(startup.report()) + "\n```")
+
 @bot.command(name="version")
 async def version_cmd(ctx):
-    await ctx.send(f"RSFF Bot {APP_VERSION} | Snapshot {SNAPSHOT['hash']}")
+    snap = _snap(ctx)
+    await ctx.send(f"RSFF Bot {APP_VERSION} | {render.footer(snap)}")
 
 @bot.command(name="status")
 async def status_cmd(ctx):
-    tabs = SNAPSHOT.get("tabs", {})
+    snap = _snap(ctx)
+    tabs = snap.get("tabs", {})
     counts = {k: len(v) for k, v in tabs.items()}
+    league = _league(ctx)
+    fs = fetch_stats(league.sheet_id)
+    skip_pct = 100 * fs["skips"] / fs["checks"] if fs["checks"] else 0
     await ctx.send("\n".join([
-        f"Snapshot `{SNAPSHOT['hash']}` @ {SNAPSHOT['ts']}",
-        "Rows → " + ", ".join([f"{k}:{v}" for k, v in counts.items()])
+        f"Snapshot `{snap['hash']}` @ {snap['ts']} ({render.fmt_age(render.snapshot_age(snap) or 0)})",
+        "Rows → " + ", ".join([f"{k}:{v}" for k, v in counts.items()]),
+        league.scheduler.describe(),
+        league.breaker.describe(),
+        f"Fetches → {fs['fetches']} full, {fs['skips']} skipped unchanged ({skip_pct:.0f}%)"
+        f" | {memstats.fmt_bytes(fs['bytes_fetched'])} downloaded, {memstats.fmt_bytes(fs['bytes_saved'])} saved",
+        f"Query plans → {plan_cache()}",
+        *([http_export.describe()] if HTTP_PORT else []),
+        *([writeback.queue(league.writeback_db).describe()] if writeback.ENABLED else []),
     ]))
 
 @bot.command(name="leaders")
 @commands.cooldown(2, 10, commands.BucketType.user)
 async def leaders_cmd(ctx, what: str = "cap"):
+    snap = _snap(ctx)
     if what.lower() not in ("cap", "capspace", "space"):
         return await ctx.send("Try `!leaders` (cap space leaders).")
-    owners = SNAPSHOT.get("tabs", {}).get("Owners2025", [])
-    rows, seen = [], set()
-    for o in owners:
-        q = (o.get("team_name") or o.get("display_name") or o.get("owner_display") or o.get("discord user") or "").strip()
-        if not q or q in seen: continue
-        seen.add(q)
-        try:
-            res = cap_summary(SNAPSHOT, q)
-            rows.append((res["cap_remaining"], res["team_name"], res["cap_used"], res["cap_limit"]))
-        except Exception:
-            continue
-    rows.sort(reverse=True)
-    if not rows: return await ctx.send("No teams found.")
-    header = f"**Cap Space Leaders (Top 5)**\n_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_"
-    lines = [header] + [f"• **{n}** → Remaining `${r:,.0f}` (Used `${u:,.0f}` / `${L:,.0f}`)" for r,n,u,L in rows[:5]]
-    await ctx.send("\n".join(lines))
+    rows = await _offload(render.leaders_rows, snap)
+    _reply(ctx, render.leaders_text(snap, rows))
 
 @bot.command(name="cap")
 @commands.cooldown(2, 10, commands.BucketType.user)
 async def cap_cmd(ctx, *, team_name: str | None = None):
-    query = team_name or resolve_user_team(SNAPSHOT, ctx.author)
+    snap = _snap(ctx)
+    query = team_name or resolve_user_team(snap, ctx.author)
     if not query:
         return await ctx.send("❓ I couldn't map you to a team. Add your handle to Owners2025.`discord user`, or run `!cap <team>` once.")
-    res = cap_summary(SNAPSHOT, query)
-    lines = [
-        f"**{res['team_name']}**",
-        f"Cap Used: `${res['cap_used']:,.0f}` / `${res['cap_limit']:,.0f}`",
-    ]
-    if res.get("dp_relief", 0) > 0:
-        who = f" ({res['dp_player']})" if res.get("dp_player") else ""
-        lines.append(f"DP Relief: `-${res['dp_relief']:,.0f}`{who}")
-    lines += [
-        f"Remaining: `${res['cap_remaining']:,.0f}`",
-        f"Players Counted: {res['players_counted']}",
-        f"_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_",
-    ]
-    await ctx.send("\n".join(lines))
+    await ctx.send(render.cap_text(snap, cap_summary(snap, query)))
 
 @bot.command(name="capdetail")
 @commands.cooldown(2, 10, commands.BucketType.user)
 async def capdetail_cmd(ctx, *, team_name: str | None = None):
-    query = team_name or resolve_user_team(SNAPSHOT, ctx.author)
+    snap = _snap(ctx)
+    query = team_name or resolve_user_team(snap, ctx.author)
     if not query:
         return await ctx.send("❓ I couldn't map you to a team. Add your handle to Owners2025.`discord user`, or run `!capdetail <team>` once.")
     try:
-        det = cap_detail(SNAPSHOT, query, top_n=8)
-        lines = [
-            f"**{det['team_name']} — Cap Detail**",
-            f"Used `${det['cap_used']:,.0f}` / `${det['cap_limit']:,.0f}` | Remaining `${det['cap_remaining']:,.0f}`",
-        ]
-        if det.get("dp_relief", 0) > 0:
-            lines.append(f"DP Relief: `-${det['dp_relief']:,.0f}` ({det['dp_player']})")
-        lines.append("**Top salaries counted:**")
-        for p in det["top"]:
-            dp_tag = " (DP)" if p["name"] == det.get("dp_player") else ""
-            lines.append(f"• {p['name']} {p['pos'] or ''} — `${p['salary']:,.0f}`{dp_tag}")
-        lines.append(f"_Players counted: {det['total_counted']} · Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_")
-        await ctx.send("\n".join(lines))
+        det = await _offload(cap_detail, snap, query, top_n=8)
+        _reply(ctx, render.capdetail_text(snap, det))
     except Exception as e:
         await ctx.send(f"❌ {e}")
 
+@bot.command(name="audit")
+@commands.cooldown(2, 10, commands.BucketType.user)
+async def audit_cmd(ctx, *, team_name: str | None = None):
+    snap = _snap(ctx)
+    res = await _offload(audit, snap)
+    violations = res["violations"]
+    if team_name:
+        q = team_name.strip().lower()
+        violations = [v for v in violations if q in v["team"].lower()]
+        return _reply(ctx, render.audit_text(snap, violations, title=f"Audit: {team_name}"))
+    _reply(ctx, render.audit_text(snap, violations, teams=res["teams"]))
+
 @bot.command(name="sync")
 @commands.has_guild_permissions(administrator=True)
 async def sync_cmd(ctx):
-    global SNAPSHOT
-    before = {k: len(v) for k, v in (SNAPSHOT or {"tabs": {}}).get("tabs", {}).items()}
-    SNAPSHOT = pull_snapshot(SHEET_ID, RANGES)
-    after = {k: len(v) for k, v in SNAPSHOT.get("tabs", {}).items()}
+    league = _league(ctx)
+    if league is None:
+        return await ctx.send("❓ This server isn't mapped to an RSFF league.")
+    if SNAPSHOT_ROLE == "worker":
+        return await ctx.send("ℹ️ This shard reads the shared snapshot; syncing is done by the owner process.")
+    prev = LEAGUES.snapshot(league)
+    before = {k: len(v) for k, v in (prev or {"tabs": {}}).get("tabs", {}).items()}
+    try:
+        snap = await _offload(_pull, league, True)  # explicit sync: always fetch
+    except Exception as e:
+        LEAGUES.reschedule(league, league.breaker.wait_s())
+        held = f"Still serving {render.footer(prev)}" if prev else "No snapshot to serve yet."
+        return await ctx.send(f"❌ Sync failed: {type(e).__name__}: {e}\n{held}\n{league.breaker.describe()}")
+    LEAGUES.adopt(league, snap)
+    LEAGUES.reschedule(league, league.scheduler.next_delay(changed=bool(prev) and prev["hash"] != snap["hash"]))
+    after = {k: len(v) for k, v in snap.get("tabs", {}).items()}
     keys = sorted(set(before) | set(after))
     diffs = []
     for k in keys:
         b, a = before.get(k, 0), after.get(k, 0)
         mark = "↔️" if a == b else ("⬆️" if a > b else "⬇️")
         diffs.append(f"{k}:{b}→{a} {mark}")
-    await ctx.send("🔄 Synced.\n" f"Snapshot `{SNAPSHOT['hash']}` @ {SNAPSHOT['ts']}\n" "Rows: " + ", ".join(diffs))
+    lines = ["🔄 Synced.", f"Snapshot `{snap['hash']}` @ {snap['ts']}", "Rows: " + ", ".join(diffs)]
+    changes = diff_snapshots(prev, snap)
+    if changes:
+        lines.append("Changes: " + ", ".join(f"{k}:{v}" for k, v in summarize(changes).items()))
+        lines += [_change_line(c) for c in changes[:10]]
+        if len(changes) > 10:
+            lines.append(f"_…and {len(changes) - 10} more_")
+    elif prev:
+        lines.append("Changes: none")
+    fresh = new_violations(prev, snap)
+    if fresh:
+        lines.append(f"⚠️ {len(fresh)} new audit violation(s) — see `!audit`")
+    _reply(ctx, "\n".join(lines))
 
 @sync_cmd.error
 async def sync_error(ctx, error):
@@ -291,132 +875,161 @@ async def sync_error(ctx, error):
 
 @bot.command(name="drop")
 async def drop_cmd(ctx, *, player: str):
-    team = resolve_user_team(SNAPSHOT, ctx.author)
+    snap = _snap(ctx)
+    team = resolve_user_team(snap, ctx.author)
     if not team:
         return await ctx.send("❓ I couldn't map you to a team. Add your handle to Owners2025.discord user, or run `!cap <team>` once.")
-    res = simulate_drop(SNAPSHOT, team, player)
+    res = simulate_drop(snap, team, player)
     if res["status"] == "INVALID":
         return await ctx.send(f"❌ {res['reason']}")
-
-    ts = team_summary(SNAPSHOT, team)
-    used_before = float(ts["cap_used"])
-    cap_limit   = float(ts["cap_limit"])
-    rem_before  = cap_limit - used_before
-
-    base = float(res["salary_base"])
-    dead = float(res["dead_cap"])
-    was_dp = bool(res.get("was_dp", False))
-    was_ir = bool(res.get("was_ir", False))
-
-    if was_dp or was_ir:
-        used_after = used_before + dead
-    else:
-        used_after = used_before - base + dead
-
-    rem_after  = cap_limit - used_after
-    delta_used = used_after - used_before
-    delta_rem  = rem_after - rem_before
-
-    lines = [
-        f"**Drop {res['player']}** for **{res['team']}**",
-        f"Dead Cap (from rules): `${dead:,.0f}` on base `${base:,.0f}`",
-        f"Roster: {res['roster_before']} → {res['roster_after']} (max {14})",
-        "",
-        f"**Cap Used:** `${used_before:,.0f}` → `${used_after:,.0f}`  _(Δ `${delta_used:,.0f}`)_",
-        f"**Cap Remaining:** `${rem_before:,.0f}` → `${rem_after:,.0f}`  _(Δ `${delta_rem:,.0f}`)_",
-        f"_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_",
-    ]
-    await ctx.send("\n".join(lines))
+    await ctx.send(render.drop_text(snap, res, team_summary(snap, team)))
 
 @bot.command(name="add")
 async def add_cmd(ctx, *, player: str):
-    team = resolve_user_team(SNAPSHOT, ctx.author)
+    snap = _snap(ctx)
+    team = resolve_user_team(snap, ctx.author)
     if not team:
         return await ctx.send("❓ I couldn't map you to a team. Add your handle to Owners2025.discord user, or run `!cap <team>` once.")
-    res = simulate_add(SNAPSHOT, team, player)
+    res = simulate_add(snap, team, player)
     if res["status"] == "INVALID":
         return await ctx.send(f"❌ {res['reason']}")
+    await ctx.send(render.add_text(snap, res, team_summary(snap, team)))
 
-    # Baseline from snapshot
-    ts = team_summary(SNAPSHOT, team)
-    used_before = float(ts["cap_used"])
-    cap_limit   = float(ts["cap_limit"])
-    rem_before  = cap_limit - used_before
+_APPROVE = re.compile(r"^(?P<kind>add|drop)\s+(?P<player>.+?)\s+(?:to|from)\s+(?P<team>.+)$", re.I)
 
-    used_after = used_before + float(res["salary_effective"])
-    rem_after  = cap_limit - used_after
-    delta_used = used_after - used_before
-    delta_rem  = rem_after - rem_before
+def _writeback_league(ctx):
+    """(league, None) for the league whose queue an admin command works on, else (None, reason)."""
+    if not writeback.ENABLED:
+        return None, "ℹ️ Write-back is off: set `RSFF_WRITEBACK=1` (and give the service account edit access)."
+    if SNAPSHOT_ROLE == "worker":
+        return None, "ℹ️ This shard reads the shared snapshot; write-back runs in the owner process."
+    league = _league(ctx)
+    if league is None:
+        return None, "❓ This server isn't mapped to an RSFF league."
+    return league, None
 
-    lines = [
-        f"**Add {res['player']}** to **{res['team']}**",
-        f"Availability: {res.get('availability','FA')}",
-        f"Salary: `${res['salary_effective']:,.0f}` (base `${res['salary_base']:,.0f}`)",
-        f"Roster: {res['roster_before']} → {res['roster_after']} (max {14})",
-        "",
-        f"**Cap Used:** `${used_before:,.0f}` → `${used_after:,.0f}`  _(Δ `${delta_used:,.0f}`)_",
-        f"**Cap Remaining:** `${rem_before:,.0f}` → `${rem_after:,.0f}`  _(Δ `${delta_rem:,.0f}`)_",
-    ]
-    for v in res.get("violations", []):
-        lines.append(f"⚠️ {v['code']}: {v['detail']}")
-    lines.append(f"_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_")
-    await ctx.send("\n".join(lines))
+@bot.command(name="approve")
+@commands.has_guild_permissions(administrator=True)
+async def approve_cmd(ctx, *, args: str = ""):
+    league, why = _writeback_league(ctx)
+    if league is None:
+        return await ctx.send(why)
+    m = _APPROVE.match(args.strip())
+    if not m:
+        return await ctx.send("Usage: `!approve add <player> to <team>` or `!approve drop <player> from <team>`.")
+    snap = _snap(ctx)
+    kind = m["kind"].lower()
+    team = resolve_team(snap, m["team"])
+    if team is None:
+        return await ctx.send(f"❌ No single team matches '{m['team']}'.")
+    q = writeback.queue(league.writeback_db)
+    res = (simulate_add if kind == "add" else simulate_drop)(snap, team, m["player"])
+    if res["status"] == "INVALID":
+        # dropping an add that is still queued cancels it before it reaches the sheet
+        queued_adds = [op["player"] for op in q.pending() if op["kind"] == "add" and op["team"] == team]
+        picked = _pick_name(queued_adds, m["player"]) if kind == "drop" and queued_adds else None
+        if picked is None:
+            return await ctx.send(f"❌ {res['reason']}")
+        op_id, _ = q.enqueue(kind, team, picked, str(ctx.author))
+        return await ctx.send(f"↩️ Queued #{op_id}: cancels the pending add of {picked} to {team}.")
+    op_id, queued = q.enqueue(kind, team, res["player"], str(ctx.author))
+    text = (render.add_text if kind == "add" else render.drop_text)(snap, res, team_summary(snap, team))
+    note = (f"📝 Queued for the sheet as #{op_id} (next flush within ~{WRITEBACK_FLUSH_S:.0f}s)." if queued
+            else f"📝 Already queued as #{op_id}.")
+    _reply(ctx, f"{text}\n{note}")
+
+@bot.command(name="writeback")
+@commands.has_guild_permissions(administrator=True)
+async def writeback_cmd(ctx, action: str = ""):
+    league, why = _writeback_league(ctx)
+    if league is None:
+        return await ctx.send(why)
+    q = writeback.queue(league.writeback_db)
+    if action.lower() == "flush":
+        if not q.ready():
+            return await ctx.send(f"⏳ Not now: {q.describe()}")
+        try:
+            res = await _flush_league(league)
+        except Exception as e:
+            return await ctx.send(f"❌ Write-back failed: {type(e).__name__}: {e}\n{q.describe()}")
+        if res["status"] == "stale":
+            await ctx.send("🔄 The sheet changed since the last sync; resyncing first, the queue is kept.")
+    elif action:
+        return await ctx.send("Usage: `!writeback` (status) or `!writeback flush`.")
+    _reply(ctx, render.writeback_text(LEAGUES.snapshot(league), q.describe(), q.pending(), q.recent()))
+
+@approve_cmd.error
+@writeback_cmd.error
+async def writeback_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        await ctx.send(f"⛔ `!{ctx.command.name}` is admin-only.")
 
 @bot.command(name="teamsum")
 async def teamsum_cmd(ctx, *, team_name: str | None = None):
-    query = team_name or resolve_user_team(SNAPSHOT, ctx.author)
+    snap = _snap(ctx)
+    query = team_name or resolve_user_team(snap, ctx.author)
     if not query:
         return await ctx.send("❓ Couldn’t map you to a team. Try `!teamsum <team>`.")
-
-    res = team_summary(SNAPSHOT, query)
-
-    lines = [
-        f"**Team: {res['team_name']}**",
-        f"Cap Used (net): `${res['cap_used']:,.0f}` / `${res['cap_limit']:,.0f}`",
-        f"Breakdown: Gross `${res['gross_cap']:,.0f}` – DP `${res['dp_relief']:,.0f}` – IR `${res['ir_relief']:,.0f}`",
-        f"Cap Remaining: `${res['cap_remaining']:,.0f}`",
-        f"Players Counted: {res['players_counted']} / 14",
-        f"_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_",
-        "",
-        "**Active Roster:**",
-    ]
-
-    for p in res["active"]:
-        dp_tag = " (DP)" if p["dp"] else ""
-        lines.append(f"{p['pos']:<4} {p['name']} — `${p['salary']:,.0f}`{dp_tag}")
-
-    if res["ir"]:
-        lines += [
-            "",
-            f"**Injured Reserve ({len(res['ir'])} players — IR Relief: -${res['ir_relief']:,.0f})**"
-        ]
-        for p in res["ir"]:
-            lines.append(f"{p['pos']:<4} {p['name']} — `${p['salary']:,.0f}` (IR)")
-
-    await ctx.send("\n".join(lines))
+    res = await _offload(team_summary, snap, query)
+    _reply(ctx, render.teamsum_text(snap, res))
 
 @bot.command(name="player")
 async def player_cmd(ctx, *, name: str):
-    res = player_lookup(SNAPSHOT, name)
+    snap = _snap(ctx)
+    res = player_lookup(snap, name)
     if not res:
         return await ctx.send(f"❌ No match for `{name}`. Try more letters (e.g., `!player patrick maho`).")
 
-    status = "Free Agent" if res["status"] == "FA" else f"Rostered by **{res['rostered_by']}**"
-    flags = []
-    if res.get("dp"): flags.append("DP")
-    if res.get("on_ir"): flags.append("IR")
-    flag_txt = f" ({', '.join(flags)})" if flags else ""
+    # Enrich from the local Sleeper index (position/team/status/injury), when one is built
+    # and the player has a Sleeper ID (never a Yahoo one: the two ID ranges overlap)
+    sleeper = lookup_player(res.get("sleeper_id"))
+    if sleeper:
+        res["pos"] = res.get("pos") or sleeper["position"]
+        res["nfl"] = res.get("nfl") or sleeper["team"]
+    await ctx.send(render.player_text(snap, res, sleeper))
 
-    lines = [
-        f"**{res['name']}** — {res.get('pos') or '?'} {res.get('nfl') or ''}{flag_txt}",
-        f"AAV: `${res['aav']:,.0f}` | Status: {status}",
-    ]
-    if res.get("player_id"):
-        lines.append(f"Sleeper ID: `{res['player_id']}`")
-    if res.get("bye"):
-        lines.append(f"Bye: {res['bye']}")
-    lines.append(f"_Search match: {res.get('match_score', 0)}/100 · Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_")
-    await ctx.send("\n".join(lines))
+@bot.command(name="byes")
+@commands.cooldown(2, 10, commands.BucketType.user)
+async def byes_cmd(ctx, week: str = "", pos: str = ""):
+    if not week.isdigit():
+        return await ctx.send("Try `!byes <week> [pos]`, e.g. `!byes 9 RB`.")
+    snap = _snap(ctx)
+    _reply(ctx, render.byes_text(snap, int(week), byes(snap, int(week), pos), pos))
+
+@bot.command(name="players")
+@commands.cooldown(2, 10, commands.BucketType.user)
+async def players_cmd(ctx, *, criteria: str = ""):
+    filters, bad = parse_filters(criteria)
+    if bad or not filters:
+        return await ctx.send("Try `!players pos=RB nfl=KC status=FA` — keys: pos, nfl, bye, team, "
+                              "status (FA, rostered, IR, DP); `pos=rb,wr` matches either.")
+    snap = _snap(ctx)
+    _reply(ctx, render.players_text(snap, filters, select(snap, filters)))
+
+@bot.command(name="market")
+@commands.cooldown(2, 10, commands.BucketType.user)
+async def market_cmd(ctx, pos: str = ""):
+    snap = _snap(ctx)
+    if not pos:
+        return _reply(ctx, render.market_overview_text(snap, market(snap)["positions"]))
+    m = position_market(snap, pos)
+    if m is None:
+        known = ", ".join(p.upper() for p in market(snap)["positions"]) or "none"
+        return await ctx.send(f"❌ No salaries for position `{pos}`. Positions: {known}.")
+    _reply(ctx, render.market_text(snap, pos, m))
+
+@bot.command(name="query")
+@commands.cooldown(3, 15, commands.BucketType.user)
+async def query_cmd(ctx, *, text: str = ""):
+    if not text.strip():
+        return await ctx.send("Try `!query status=fa aav<2m sort aav desc limit 10` — clauses: [from players|rosters] "
+                              "conditions, group by <col> count|sum <col>|max <col>, having, sort <col> [desc], limit, show <cols>.")
+    snap = _snap(ctx)
+    try:
+        res = await _offload(run_query, snap, text)
+    except QueryError as e:
+        return await ctx.send(f"❌ {e}")
+    _reply(ctx, render.query_text(snap, res))
 
 @bot.command(name="whatif")
 async def whatif_cmd(ctx, *, args: str):
@@ -426,83 +1039,107 @@ async def whatif_cmd(ctx, *, args: str):
       !whatif drop mahomes
       !whatif add aaron rodgers drop mahomes
     """
-    team = resolve_user_team(SNAPSHOT, ctx.author)
+    snap = _snap(ctx)
+    team = resolve_user_team(snap, ctx.author)
     if not team:
         return await ctx.send("❓ I couldn't map you to a team. Add your handle to Owners2025.discord user, or run `!cap <team>` once.")
 
-    # very light parser
-    tokens = args.split()
-    add_query, drop_query = None, None
-    i = 0
-    while i < len(tokens):
-        t = tokens[i].lower()
-        if t == "add":
-            i += 1
-            start = i
-            while i < len(tokens) and tokens[i].lower() not in {"add", "drop"}:
-                i += 1
-            add_query = " ".join(tokens[start:i]).strip()
-            continue
-        if t == "drop":
-            i += 1
-            start = i
-            while i < len(tokens) and tokens[i].lower() not in {"add", "drop"}:
-                i += 1
-            drop_query = " ".join(tokens[start:i]).strip()
-            continue
-        i += 1
-
+    add_query, drop_query = render.parse_whatif(args)
     if not add_query and not drop_query:
         return await ctx.send("Try: `!whatif add <player>` or `!whatif drop <player>` or `!whatif add <p1> drop <p2>`")
 
-    res = simulate_whatif(SNAPSHOT, team, add_query, drop_query)
+    res = await _offload(simulate_whatif, snap, team, add_query, drop_query)
     if res["status"] == "INVALID":
         return await ctx.send(f"❌ {res['reason']}")
+    ts = await _offload(team_summary, snap, team)
+    _reply(ctx, render.whatif_text(snap, team, add_query, drop_query, res, ts))
 
-    ts = team_summary(SNAPSHOT, team)
-    used_before = float(ts["cap_used"])
-    cap_limit   = float(ts["cap_limit"])
-    rem_before  = cap_limit - used_before
-
-    used_after = used_before + float(res["used_delta"])
-    rem_after  = cap_limit - used_after
-    delta_used = used_after - used_before
-    delta_rem  = rem_after - rem_before
-
-    lines = [f"**What-if for {team}**"]
-    if add_query:
-        ar = res.get("add_result")
-        if ar and ar.get("status") == "OK":
-            lines += [
-                f"• Add **{ar['player']}** → Salary `${ar['salary_effective']:,.0f}` (base `${ar['salary_base']:,.0f}`)",
-            ]
-        elif ar:
-            lines += [f"• Add {add_query}: ❌ {ar.get('reason')}"]
-
-    if drop_query:
-        dr = res.get("drop_result")
-        if dr and dr.get("status") == "OK":
-            lines += [
-                f"• Drop **{dr['player']}** → Dead Cap `${dr['dead_cap']:,.0f}` on base `${dr['salary_base']:,.0f}`",
-            ]
-        elif dr:
-            lines += [f"• Drop {drop_query}: ❌ {dr.get('reason')}"]
-
-    if res.get("violations"):
-        for v in res["violations"]:
-            lines.append(f"⚠️ {v['code']}: {v['detail']}")
-
-    if res.get("dp_before") is not None and res.get("dp_after") is not None:
-        if abs(res["dp_after"] - res["dp_before"]) > 1e-6:
-            lines.append(f"_DP re-selected: `${res['dp_before']:,.0f}` → `${res['dp_after']:,.0f}`_")
-
-    lines += [
-        "",
-        f"**Cap Used:** `${used_before:,.0f}` → `${used_after:,.0f}`  _(Δ `${delta_used:,.0f}`)_",
-        f"**Cap Remaining:** `${rem_before:,.0f}` → `${rem_after:,.0f}`  _(Δ `${delta_rem:,.0f}`)_",
-        f"_Snapshot {SNAPSHOT['hash']} @ {SNAPSHOT['ts']}_",
-    ]
-    await ctx.send("\n".join(lines))
+@bot.command(name="trade")
+@commands.cooldown(2, 10, commands.BucketType.user)
+async def trade_cmd(ctx, *, args: str = ""):
+    parsed = parse_trade(args)
+    if parsed is None:
+        return await ctx.send("Try: `!trade <players> for <players> with <team>`, e.g. `!trade kelce, hill for adams with big dawgs`")
+    snap = _snap(ctx)
+    team = resolve_user_team(snap, ctx.author)
+    if not team:
+        return await ctx.send("❓ I couldn't map you to a team. Add your handle to Owners2025.discord user, or run `!cap <team>` once.")
+    give, get, other = parsed
+    res = await _offload(simulate_trade, snap, team, give, get, other)
+    if res["status"] == "INVALID":
+        return await ctx.send(f"❌ {res['reason']}")
+    _reply(ctx, render.trade_text(snap, res))
+
+@bot.command(name="history")
+@commands.cooldown(2, 10, commands.BucketType.user)
+async def history_cmd(ctx, kind: str = "", *, query: str = ""):
+    kind = kind.lower()
+    if kind not in ("player", "team") or not query.strip():
+        return await ctx.send("Try `!history player <name>` or `!history team <team>`.")
+    league = _league(ctx)
+    if league is None:
+        return await ctx.send("❓ This server isn't mapped to an RSFF league.")
+
+    if kind == "player":
+        events = history_store.player_history(query, path=league.history_db)
+        if not events:
+            return await ctx.send(f"❌ No history for `{query}`.")
+        lines = [f"**History: {query}** (newest first)"]
+        for e in events:
+            r = {" ".join(str(k).split()).lower(): v for k, v in e["row"].items()}
+            name = r.get("player name") or r.get("player") or r.get("name") or query
+            team = r.get("team") or "?"
+            if e["op"] == "del":
+                what = f"removed from sheet ({team})"
+            elif str(r.get("on roster flag", "")).upper() == "TRUE":
+                flags = [f for f, k in (("IR", "on ir?"), ("DP", "dp?")) if str(r.get(k, "")).upper() == "TRUE"]
+                what = f"on **{team}**" + (f" ({', '.join(flags)})" if flags else "")
+            else:
+                what = f"off roster ({team})"
+            lines.append(f"• {e['ts']} — {name}: {what}")
+        return _reply(ctx, "\n".join(lines))
+
+    caps = history_store.team_history(query, path=league.history_db)
+    if not caps:
+        return await ctx.send(f"❌ No cap history for `{query}`.")
+    lines = [f"**Cap history: {caps[0]['team']}** (newest first)"]
+    for c in caps:
+        lines.append(f"• {c['ts']} — Used `${c['cap_used']:,.0f}` | Remaining `${c['cap_remaining']:,.0f}` | Players {c['players_counted']}")
+    _reply(ctx, "\n".join(lines))
+
+# ---- Tracing: only when RSFF_TRACE_FILE is set are commands and their stages wrapped in spans
+async def _trace_begin(ctx):
+    ctx.trace_span = tracing.begin(
+        "command", command=ctx.command.qualified_name if ctx.command else "?",
+        user=ctx.author.id, guild=ctx.guild.id if ctx.guild else None,
+    )
+    ctx.send = tracing.traced("discord.send", ctx.send)  # direct replies and paged ones alike
+
+async def _trace_end(ctx):
+    sp = getattr(ctx, "trace_span", None)
+    if sp is not None:
+        if ctx.command_failed:
+            sp.status = "error"
+        sp.end()
+
+def _instrument_tracing():
+    bot.before_invoke(_trace_begin)
+    bot.after_invoke(_trace_end)
+    g = globals()
+    tracing.instrument(g, "resolve_user_team", name="team.resolve")
+    tracing.instrument(g, "cap_summary", "cap_detail", "team_summary", "player_lookup",
+                       "simulate_add", "simulate_drop", "simulate_whatif", "simulate_trade",
+                       "select", "byes", "run_query", "position_market", "apply_roster_ops", prefix="sim.")
+    # fuzzy/normalized name matching, wherever the sim modules call it from
+    import sim.player_lookup, sim.ops, sim.identity
+    tracing.instrument(sim.player_lookup, "_fuzzy_best", name="match.fuzzy")
+    tracing.instrument(sim.ops, "_pick_name", name="match.pick")
+    for mod in (sim.player_lookup, sim.ops, sim.identity):
+        tracing.instrument(mod, "keys_for_name", name="match.name")
+    tracing.instrument(render, *[n for n in dir(render) if n.endswith("_text") or n == "leaders_rows"], prefix="render.")
+
+if tracing.EXPORTER is not None:
+    _instrument_tracing()
 
 if __name__ == "__main__":
     if not DISCORD_TOKEN:
@@ -0,0 +1,254 @@
+# fake_sheets.py
+# Local stand-in for the bits of the Google Sheets v4 client that sheets_sync uses,
+# so the bot, the batch CLI and benchmarks can run without credentials or network.
+#
+# Backing file: JSON {"<Tab>": [[header...], [row...], ...], ...}. A saved snapshot
+# (rsff_snapshot.json, tabs of dicts) is accepted too and turned back into grids.
+# Point sheets_sync at it with RSFF_FAKE_SHEETS=/path/to/file.json.
+#
+# Editing the file is an edit to the "spreadsheet": it is reloaded on the next request
+# and the Drive version / modifiedTime served by files().get move on. Writes through
+# values().batchUpdate (write-back) are saved to the file the same way, as grids.
+import os
+import re
+import json
+import datetime
+
+_A1 = re.compile(r"^(?P<c1>[A-Za-z]+)?(?P<r1>\d+)?(?::(?P<c2>[A-Za-z]+)?(?P<r2>\d+)?)?$")
+
+
+def _grid(rows) -> list[list[str]]:
+    """Tab rows as a value grid; dict rows (snapshot form) become header + rows."""
+    if not rows or isinstance(rows[0], list):
+        return [list(map(str, r)) for r in rows or []]
+    header = list(rows[0].keys())
+    return [header] + [[str(r.get(h, "")) for h in header] for r in rows]
+
+
+def _col(n: int) -> str:
+    s = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        s = chr(65 + rem) + s
+    return s or "A"
+
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _unformat(v):
+    """What UNFORMATTED_VALUE would return for a displayed cell: numbers and booleans typed."""
+    if not isinstance(v, str):
+        return v
+    s = v.strip()
+    if s.upper() in ("TRUE", "FALSE"):
+        return s.upper() == "TRUE"
+    t = s.replace("$", "").replace(",", "")
+    if not t or t.startswith("+") or not t.lstrip("-").replace(".", "", 1).isdigit():
+        return v
+    f = float(t)
+    return int(f) if f.is_integer() and "." not in t else f
+
+
+def _slice(grid, a1: str):
+    """Cells of an A1 range ('A1:K500', 'A:F', '') from a grid, trailing blank rows dropped like the API."""
+    m = _A1.match(a1 or "")
+    if not m:
+        raise KeyError(f"Unable to parse range: {a1}")
+    a, b = m.group("c1"), m.group("r1")
+    if ":" in a1:
+        c2, r2 = m.group("c2"), m.group("r2")
+    else:  # single column or cell
+        c2, r2 = a, b
+    r1, r2 = int(b or 1), int(r2) if r2 else len(grid)
+    c1, c2 = _col_index(a) if a else 1, _col_index(c2) if c2 else 0
+    rows = []
+    for r in grid[r1 - 1:r2]:
+        cells = r[c1 - 1:c2 or None]
+        while cells and cells[-1] == "":
+            cells = cells[:-1]
+        rows.append(cells)
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows, r1, c1
+
+
+def _cell_out(v) -> str:
+    """How a written value reads back as a displayed cell."""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return "" if v is None else str(v)
+
+
+def _write(grid, a1: str, values):
+    """Put a block of values at an A1 range's top-left cell, growing the grid as needed."""
+    m = _A1.match(a1 or "")
+    if not m or not m.group("r1"):
+        raise KeyError(f"Unable to parse range: {a1}")
+    r1, c1 = int(m.group("r1")), _col_index(m.group("c1") or "A")
+    for dr, row in enumerate(values):
+        r = r1 - 1 + dr
+        while len(grid) <= r:
+            grid.append([])
+        cells = grid[r]
+        for dc, v in enumerate(row):
+            c = c1 - 1 + dc
+            if len(cells) <= c:
+                cells.extend([""] * (c + 1 - len(cells)))
+            cells[c] = _cell_out(v)
+
+
+def load_tabs(path: str) -> dict[str, list[list[str]]]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if "tabs" in data and "hash" in data:
+        data = data["tabs"]
+    return {tab: _grid(rows) for tab, rows in data.items()}
+
+
+class _Request:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class _Values:
+    def __init__(self, book: "FakeService"):
+        self._book = book
+
+    def get(self, spreadsheetId: str, range: str, valueRenderOption: str = "FORMATTED_VALUE", **_):
+        def run():
+            vr = self.batchGet(spreadsheetId, [range], valueRenderOption=valueRenderOption).execute()["valueRanges"][0]
+            return {"range": vr["range"], "majorDimension": vr["majorDimension"], "values": vr["values"]}
+        return _Request(run)
+
+    def batchGet(self, spreadsheetId: str, ranges: list[str], majorDimension: str = "ROWS",
+                 valueRenderOption: str = "FORMATTED_VALUE", **_):
+        def run():
+            self._book.refresh()
+            out = []
+            for rng in ranges:
+                tab, _, a1 = rng.partition("!")
+                tab = tab.strip("'").replace("''", "'")
+                grid = self._book.tabs.get(tab)
+                if grid is None:
+                    raise KeyError(f"Unable to parse range: {rng}")
+                rows, r1, c1 = _slice(grid, a1)
+                if valueRenderOption == "UNFORMATTED_VALUE":
+                    rows = [[_unformat(v) for v in r] for r in rows]
+                width = max((len(r) for r in rows), default=1)
+                self._book.requests += 1
+                out.append({
+                    "range": f"{tab}!{_col(c1)}{r1}:{_col(c1 + width - 1)}{r1 + max(len(rows), 1) - 1}",
+                    "majorDimension": majorDimension,
+                    "values": rows,
+                })
+            return {"spreadsheetId": spreadsheetId, "valueRanges": out}
+        return _Request(run)
+
+    def batchUpdate(self, spreadsheetId: str, body: dict, **_):
+        def run():
+            self._book.refresh()
+            cells, responses = 0, []
+            for d in body.get("data", []):
+                tab, _, a1 = d["range"].partition("!")
+                tab = tab.strip("'").replace("''", "'")
+                grid = self._book.tabs.get(tab)
+                if grid is None:
+                    raise KeyError(f"Unable to parse range: {d['range']}")
+                _write(grid, a1, d.get("values", []))
+                cells += sum(len(r) for r in d.get("values", []))
+                resp = {"spreadsheetId": spreadsheetId, "updatedRange": d["range"]}
+                if body.get("includeValuesInResponse"):
+                    # the written cells as a read would return them
+                    rows, _, _ = _slice(grid, a1)
+                    if body.get("responseValueRenderOption") == "UNFORMATTED_VALUE":
+                        rows = [[_unformat(v) for v in r] for r in rows]
+                    resp["updatedData"] = {"range": d["range"], "majorDimension": "ROWS", "values": rows}
+                responses.append(resp)
+            self._book.write_requests += 1
+            self._book.save()
+            return {"spreadsheetId": spreadsheetId, "totalUpdatedCells": cells,
+                    "totalUpdatedRanges": len(body.get("data", [])), "responses": responses}
+        return _Request(run)
+
+
+class _Spreadsheets:
+    def __init__(self, book: "FakeService"):
+        self._book = book
+
+    def values(self):
+        return _Values(self._book)
+
+    def get(self, spreadsheetId: str, **_):
+        def run():
+            self._book.refresh()
+            sheets = []
+            for tab, grid in self._book.tabs.items():
+                width = max((len(r) for r in grid), default=0)
+                sheets.append({"properties": {
+                    "title": tab,
+                    "gridProperties": {"rowCount": len(grid), "columnCount": width},
+                }})
+            return {"spreadsheetId": spreadsheetId, "sheets": sheets}
+        return _Request(run)
+
+
+class _Files:
+    def __init__(self, book: "FakeService"):
+        self._book = book
+
+    def get(self, fileId: str, fields: str = "", **_):
+        def run():
+            self._book.refresh()
+            self._book.metadata_requests += 1
+            modified = datetime.datetime.fromtimestamp(self._book.mtime, datetime.timezone.utc)
+            return {
+                "id": fileId,
+                "version": str(self._book.version),
+                "modifiedTime": modified.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+            }
+        return _Request(run)
+
+
+class FakeService:
+    """Quacks like build('sheets', 'v4', ...) — and build('drive', 'v3', ...) — for the calls sheets_sync makes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.version = 1
+        self.tabs = load_tabs(path)
+        self.requests = 0           # ranges served, for fetch benchmarks
+        self.metadata_requests = 0  # Drive files.get calls
+        self.write_requests = 0     # values.batchUpdate calls
+
+    def refresh(self):
+        """Reload the backing file if it was modified since it was read."""
+        mtime = os.path.getmtime(self.path)
+        if mtime != self.mtime:
+            self.mtime, self.tabs = mtime, load_tabs(self.path)
+            self.version += 1
+
+    def save(self):
+        """Write the grids back to the backing file: the next read (or reload) sees the edit."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.tabs, f)
+        os.replace(tmp, self.path)
+        self.mtime = os.path.getmtime(self.path)
+        self.version += 1
+
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    def files(self):
+        return _Files(self)
@@ -0,0 +1,258 @@
+# history_store.py
+# Local SQLite history of every distinct snapshot.
+#
+# Only rows that changed since the previous stored snapshot are written (as
+# 'set' or 'del' events), so the database grows with league activity rather
+# than with the number of syncs. Team cap numbers are stored the same way.
+import os
+import json
+import sqlite3
+import hashlib
+
+from sim.cap import cap_summary
+from sim.identity import norm_name
+
+# One entry per database path (one per league):
+#   conn  — sqlite connection
+#   state — (tab, row_key) -> (digest, row JSON) of the latest stored row, loaded lazily
+#   caps  — team_norm -> (cap_used, cap_remaining, players_counted) last stored, loaded lazily
+_DBS = {}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id    INTEGER PRIMARY KEY,
+    hash  TEXT NOT NULL,                 -- repeats when the sheet reverts to an earlier state
+    ts    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_ts ON snapshots(ts);
+
+CREATE TABLE IF NOT EXISTS row_events (
+    snapshot_id  INTEGER NOT NULL REFERENCES snapshots(id),
+    tab          TEXT NOT NULL,
+    row_key      TEXT NOT NULL,
+    op           TEXT NOT NULL,          -- 'set' | 'del'
+    team_norm    TEXT,
+    player_norm  TEXT,
+    data         TEXT                    -- row JSON (last known row for 'del')
+);
+CREATE INDEX IF NOT EXISTS row_events_player ON row_events(player_norm, snapshot_id);
+CREATE INDEX IF NOT EXISTS row_events_team   ON row_events(team_norm, snapshot_id);
+
+CREATE TABLE IF NOT EXISTS team_caps (
+    snapshot_id      INTEGER NOT NULL REFERENCES snapshots(id),
+    team_norm        TEXT NOT NULL,
+    team             TEXT NOT NULL,
+    cap_used         REAL,
+    cap_remaining    REAL,
+    players_counted  INTEGER
+);
+CREATE INDEX IF NOT EXISTS team_caps_team ON team_caps(team_norm, snapshot_id);
+
+CREATE TABLE IF NOT EXISTS row_state (
+    tab      TEXT NOT NULL,
+    row_key  TEXT NOT NULL,
+    digest   TEXT NOT NULL,
+    data     TEXT NOT NULL,
+    PRIMARY KEY (tab, row_key)
+);
+"""
+
+
+def _db(path: str | None = None) -> dict:
+    """Return the cached handle for a history database, creating the schema on first use."""
+    path = path or os.getenv("RSFF_HISTORY_DB", "rsff_history.sqlite3")
+    h = _DBS.get(path)
+    if h is None:
+        conn = sqlite3.connect(path, check_same_thread=False)  # pulls may run in a worker thread
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _drop_unique_hash(conn)
+        h = _DBS[path] = {"conn": conn, "state": None, "caps": None}
+    return h
+
+
+def _drop_unique_hash(conn):
+    """Rebuild a snapshots table created with UNIQUE(hash), so a revert (A -> B -> A) can be stored."""
+    if not any(origin == "u" for _, _, _, origin, _ in conn.execute("PRAGMA index_list(snapshots)")):
+        return
+    with conn:
+        conn.execute("CREATE TABLE snapshots_new (id INTEGER PRIMARY KEY, hash TEXT NOT NULL, ts TEXT NOT NULL)")
+        conn.execute("INSERT INTO snapshots_new(id, hash, ts) SELECT id, hash, ts FROM snapshots")
+        conn.execute("DROP TABLE snapshots")
+        conn.execute("ALTER TABLE snapshots_new RENAME TO snapshots")
+        conn.execute("CREATE INDEX IF NOT EXISTS snapshots_ts ON snapshots(ts)")
+
+
+def release(path: str | None = None):
+    """Drop the in-memory change-detection state for an idle database (reloaded on next write)."""
+    h = _DBS.get(path or os.getenv("RSFF_HISTORY_DB", "rsff_history.sqlite3"))
+    if h:
+        h["state"] = h["caps"] = None
+
+
+def memory_caches() -> dict:
+    """In-memory change-detection caches per database file, for memory accounting."""
+    return {os.path.basename(p): {"state": h["state"], "caps": h["caps"]} for p, h in _DBS.items()}
+
+
+def _low(s) -> str:
+    return str(s or "").strip().lower()
+
+
+def _field(row: dict, *keys) -> str:
+    """Case/space-insensitive column read (' Player Name' == 'player name')."""
+    want = set(keys)
+    for k, v in row.items():
+        if " ".join(str(k).split()).lower() in want and str(v or "").strip():
+            return str(v).strip()
+    return ""
+
+
+def _row_keys(tab: str, rows: list[dict]):
+    """Yield (row_key, team_norm, player_norm, row) with a stable identity per row."""
+    seen = {}
+    for r in rows:
+        player = _field(r, "player name", "player_name", "player", "name")
+        team = _field(r, "team", "team_name")
+        pid = _field(r, "player id", "player_id", "sleeper_player_id", "yahoo_player_id")
+        if pid or player:
+            base = f"{pid or norm_name(player)}|{_low(team)}"
+        else:
+            base = hashlib.md5(json.dumps(r, sort_keys=True).encode()).hexdigest()
+        n = seen[base] = seen.get(base, 0) + 1
+        key = base if n == 1 else f"{base}#{n}"
+        yield key, _low(team) or None, norm_name(player) or None, r
+
+
+def _load_state(h: dict):
+    db = h["conn"]
+    if h["state"] is None:
+        h["state"] = {(t, k): (d, data) for t, k, d, data in db.execute("SELECT tab, row_key, digest, data FROM row_state")}
+    if h["caps"] is None:
+        caps = h["caps"] = {}
+        for team_norm, used, rem, cnt in db.execute(
+            "SELECT team_norm, cap_used, cap_remaining, players_counted FROM team_caps ORDER BY snapshot_id"
+        ):
+            caps[team_norm] = (used, rem, cnt)
+
+
+def _team_caps(snapshot) -> dict:
+    owners = snapshot.get("tabs", {}).get("Owners2025", [])
+    out = {}
+    for o in owners:
+        q = str(o.get("team_name") or o.get("display_name") or o.get("owner_display") or "").strip()
+        if not q or _low(q) in out:
+            continue
+        try:
+            res = cap_summary(snapshot, q)
+        except Exception:
+            continue
+        out[_low(res["team_name"])] = (res["team_name"], res["cap_used"], res["cap_remaining"], res["players_counted"])
+    return out
+
+
+def record_snapshot(snapshot, path: str | None = None) -> dict:
+    """
+    Append a snapshot unless it repeats the latest stored one, storing only rows/team
+    caps that changed. A return to an older state is stored, so history shows the revert.
+    All inserts for one snapshot happen in a single transaction.
+    """
+    h = _db(path)
+    db = h["conn"]
+    last = db.execute("SELECT hash FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+    if last and last[0] == snapshot["hash"]:
+        return {"stored": False, "changed": 0}
+    _load_state(h)
+    state, last_caps = h["state"], h["caps"]
+
+    events, state_upserts, state_deletes = [], [], []
+    live = set()
+    for tab, rows in snapshot.get("tabs", {}).items():
+        for key, team_norm, player_norm, r in _row_keys(tab, rows):
+            live.add((tab, key))
+            data = json.dumps(r, sort_keys=True, default=str)
+            digest = hashlib.md5(data.encode()).hexdigest()
+            prev = state.get((tab, key))
+            if prev and prev[0] == digest:
+                continue
+            events.append((tab, key, "set", team_norm, player_norm, data))
+            state_upserts.append((tab, key, digest, data))
+    for (tab, key), (_, data) in state.items():
+        if (tab, key) not in live:
+            r = json.loads(data)
+            player = _field(r, "player name", "player_name", "player", "name")
+            team = _field(r, "team", "team_name")
+            events.append((tab, key, "del", _low(team) or None, norm_name(player) or None, data))
+            state_deletes.append((tab, key))
+
+    caps = [(tn, *v) for tn, v in _team_caps(snapshot).items() if last_caps.get(tn) != v[1:]]
+
+    with db:
+        cur = db.execute("INSERT INTO snapshots(hash, ts) VALUES (?, ?)", (snapshot["hash"], snapshot["ts"]))
+        sid = cur.lastrowid
+        db.executemany(
+            "INSERT INTO row_events(snapshot_id, tab, row_key, op, team_norm, player_norm, data) VALUES (?,?,?,?,?,?,?)",
+            [(sid, *e) for e in events],
+        )
+        db.executemany(
+            "INSERT INTO team_caps(snapshot_id, team_norm, team, cap_used, cap_remaining, players_counted) VALUES (?,?,?,?,?,?)",
+            [(sid, *c) for c in caps],
+        )
+        db.executemany("INSERT OR REPLACE INTO row_state(tab, row_key, digest, data) VALUES (?,?,?,?)", state_upserts)
+        db.executemany("DELETE FROM row_state WHERE tab = ? AND row_key = ?", state_deletes)
+
+    for tab, key, digest, data in state_upserts:
+        state[(tab, key)] = (digest, data)
+    for k in state_deletes:
+        state.pop(k, None)
+    for tn, _, used, rem, cnt in caps:
+        last_caps[tn] = (used, rem, cnt)
+    return {"stored": True, "changed": len(events)}
+
+
+# ---------- queries ----------
+
+def player_history(name: str, limit: int = 10, path: str | None = None) -> list[dict]:
+    """Latest Rosters events for a player (exact normalized name, else name prefix), newest first."""
+    db = _db(path)["conn"]
+    q = norm_name(name)
+    if not q:
+        return []
+    sql = (
+        "SELECT s.ts, e.op, e.data FROM row_events e JOIN snapshots s ON s.id = e.snapshot_id "
+        "WHERE e.tab = 'Rosters' AND {} ORDER BY e.snapshot_id DESC LIMIT ?"
+    )
+    rows = db.execute(sql.format("e.player_norm = ?"), (q, limit)).fetchall()
+    if not rows:
+        # prefix match stays on the index: player_norm >= q AND player_norm < q + U+FFFF
+        rows = db.execute(sql.format("e.player_norm >= ? AND e.player_norm < ?"), (q, q + "￿", limit)).fetchall()
+    return [{"ts": ts, "op": op, "row": json.loads(data)} for ts, op, data in rows]
+
+
+def team_history(team: str, limit: int = 10, path: str | None = None) -> list[dict]:
+    """Cap used/remaining each time it changed for a team, newest first."""
+    db = _db(path)["conn"]
+    tn = _low(team)
+    if not db.execute("SELECT 1 FROM team_caps WHERE team_norm = ? LIMIT 1", (tn,)).fetchone():
+        # partial team name, like `!cap` accepts
+        hit = db.execute("SELECT DISTINCT team_norm FROM team_caps WHERE team_norm LIKE ? LIMIT 1", (f"%{tn}%",)).fetchone()
+        if hit:
+            tn = hit[0]
+    rows = db.execute(
+        "SELECT s.ts, c.team, c.cap_used, c.cap_remaining, c.players_counted "
+        "FROM team_caps c JOIN snapshots s ON s.id = c.snapshot_id "
+        "WHERE c.team_norm = ? ORDER BY c.snapshot_id DESC LIMIT ?",
+        (tn, limit),
+    ).fetchall()
+    return [
+        {"ts": ts, "team": t, "cap_used": used, "cap_remaining": rem, "players_counted": cnt}
+        for ts, t, used, rem, cnt in rows
+    ]
+
+
+def stats(path: str | None = None) -> dict:
+    db = _db(path)["conn"]
+    (n_snap,) = db.execute("SELECT COUNT(*) FROM snapshots").fetchone()
+    (n_evt,) = db.execute("SELECT COUNT(*) FROM row_events").fetchone()
+    return {"snapshots": n_snap, "row_events": n_evt}
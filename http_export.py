@@ -0,0 +1,195 @@
+# http_export.py
+# Optional read-only HTTP export for other tools, so nobody has to scrape Discord:
+#
+#   GET /leagues                          league names with their current snapshot hash
+#   GET /{league}/caps.json|csv           every team's cap limit / used / remaining / DP relief
+#   GET /{league}/rosters.json|csv        on-roster players (?team=<name> for one team)
+#   GET /{league}/players.json|csv        the identity table: one row per known player
+#
+# Enabled by RSFF_HTTP_PORT (bound to RSFF_HTTP_HOST, default 127.0.0.1). Each body is
+# serialized once per snapshot — and gzipped once, for clients that accept it — and
+# cached on the snapshot, so it goes away with it. Responses carry ETag "<snapshot hash>"
+# ("<hash>-gz" for the gzipped form); a matching If-None-Match gets 304 Not Modified,
+# so polling clients cost a header compare.
+import io
+import csv
+import gzip
+import json
+import asyncio
+import logging
+
+from aiohttp import web
+
+from sim.cap import cap_summary
+from sim.identity import player_table
+import render
+
+log = logging.getLogger("rsff")
+
+TABLES = ("caps", "rosters", "players")
+_TYPES = {"json": "application/json", "csv": "text/csv; charset=utf-8"}
+
+_CAP_COLUMNS = ("team_name", "cap_limit", "cap_used", "cap_remaining", "players_counted", "dp_relief", "dp_player")
+_ROSTER_COLUMNS = ("team", "name", "pos", "nfl", "bye", "aav", "cap_hit", "on_ir", "dp", "sleeper_id", "yahoo_id")
+_PLAYER_COLUMNS = ("name", "sleeper_id", "yahoo_id", "pos", "nfl", "bye", "has_salary", "aav", "cap_hit",
+                   "team", "on_roster", "on_ir", "dp", "roster_pos", "roster_aav")
+
+STATS = {"requests": 0, "not_modified": 0, "built": 0, "bytes_sent": 0}
+
+
+# ---------- tables ----------
+
+def _caps(snap, team: str = "") -> list[dict]:
+    out = []
+    for name in render.team_names(snap):
+        try:
+            res = cap_summary(snap, name)
+        except Exception:
+            continue
+        out.append({k: res.get(k) for k in _CAP_COLUMNS})
+    out.sort(key=lambda r: -(r["cap_remaining"] or 0))
+    return out
+
+
+def _rosters(snap, team: str = "") -> list[dict]:
+    players = player_table(snap)["players"]
+    rows = []
+    for p in players:
+        if not p["on_roster"] or (team and p["team"].lower() != team):
+            continue
+        r = {k: p.get(k) for k in _ROSTER_COLUMNS}
+        r["pos"] = p["roster_pos"] or p["pos"]
+        r["aav"] = p["roster_aav"] or p["aav"]
+        rows.append(r)
+    rows.sort(key=lambda r: (r["team"].lower(), -(r["aav"] or 0)))
+    return rows
+
+
+def _players(snap, team: str = "") -> list[dict]:
+    return [{k: p.get(k) for k in _PLAYER_COLUMNS} for p in player_table(snap)["players"]]
+
+
+_BUILDERS = {"caps": (_caps, _CAP_COLUMNS), "rosters": (_rosters, _ROSTER_COLUMNS), "players": (_players, _PLAYER_COLUMNS)}
+
+
+def serialize(snap, league: str, table: str, fmt: str, team: str = "") -> bytes:
+    build, columns = _BUILDERS[table]
+    rows = build(snap, team)
+    if fmt == "csv":
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        w.writeheader()
+        w.writerows(rows)
+        return buf.getvalue().encode("utf-8")
+    doc = {"league": league, "hash": snap["hash"], "ts": snap["ts"], "table": table, "rows": rows}
+    if team:
+        doc["team"] = team
+    return json.dumps(doc, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def body(snap, league: str, table: str, fmt: str, team: str = "", gz: bool = False) -> bytes:
+    """Serialized (optionally gzipped) body for this snapshot, built on first request and cached on it."""
+    cache = snap.get("_export")
+    if cache is None:
+        cache = snap["_export"] = {}
+    key = (table, fmt, team, gz)
+    out = cache.get(key)
+    if out is None:
+        if gz:
+            out = gzip.compress(body(snap, league, table, fmt, team), compresslevel=6, mtime=0)
+        else:
+            out = serialize(snap, league, table, fmt, team)
+            STATS["built"] += 1
+        cache[key] = out
+    return out
+
+
+# ---------- HTTP ----------
+
+def _etag_matches(header: str, snap_hash: str) -> bool:
+    for tag in (header or "").split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        tag = tag.removeprefix("W/").strip('"')
+        if tag.removesuffix("-gz") == snap_hash:
+            return True
+    return False
+
+
+class _Handlers:
+    def __init__(self, registry):
+        self.registry = registry
+
+    def _league(self, name: str):
+        for lg in self.registry.leagues:
+            if lg.name == name:
+                return lg
+        raise web.HTTPNotFound(text=f"unknown league {name!r}\n")
+
+    async def leagues(self, request):
+        out = []
+        for lg in self.registry.leagues:
+            snap = lg.peek() if lg.reader is None else lg.reader.current()
+            out.append({"name": lg.name, "hash": snap["hash"] if snap else None, "ts": snap["ts"] if snap else None,
+                        "tables": [f"/{lg.name}/{t}.{f}" for t in TABLES for f in _TYPES]})
+        return web.json_response({"leagues": out})
+
+    async def table(self, request):
+        STATS["requests"] += 1
+        league = self._league(request.match_info["league"])
+        table, fmt = request.match_info["table"], request.match_info["fmt"]
+        if table not in TABLES or fmt not in _TYPES:
+            raise web.HTTPNotFound(text=f"tables: {', '.join(TABLES)}; formats: {', '.join(_TYPES)}\n")
+        snap = await asyncio.to_thread(self.registry.snapshot, league)  # may reload an evicted league from disk
+        if snap is None:
+            raise web.HTTPServiceUnavailable(text="no snapshot yet\n", headers={"Retry-After": "60"})
+
+        team = ""
+        if table == "rosters" and request.query.get("team"):
+            q = request.query["team"].strip().lower()
+            names = [n.lower() for n in render.team_names(snap)]
+            team = q if q in names else next((n for n in names if q in n), "")
+            if not team:
+                raise web.HTTPNotFound(text=f"no team matching {q!r}\n")
+
+        gz = "gzip" in request.headers.get("Accept-Encoding", "")
+        headers = {
+            "ETag": f'"{snap["hash"]}-gz"' if gz else f'"{snap["hash"]}"',
+            "Cache-Control": "no-cache",  # always revalidate; a 304 is nearly free
+            "Vary": "Accept-Encoding",
+            "X-Snapshot-Ts": str(snap["ts"]),
+        }
+        if _etag_matches(request.headers.get("If-None-Match", ""), snap["hash"]):
+            STATS["not_modified"] += 1
+            return web.Response(status=304, headers=headers)
+
+        cached = snap.get("_export") or {}
+        data = cached.get((table, fmt, team, gz))
+        if data is None:  # first request for this snapshot: serialize off the event loop
+            data = await asyncio.to_thread(body, snap, league.name, table, fmt, team, gz)
+        if gz:
+            headers["Content-Encoding"] = "gzip"
+        STATS["bytes_sent"] += len(data)
+        return web.Response(body=data, headers=headers, content_type=_TYPES[fmt].split(";")[0],
+                            charset="utf-8")
+
+
+async def start(registry, host: str = "127.0.0.1", port: int = 8080) -> web.AppRunner:
+    """Serve the export endpoints on the running event loop; returns the runner (call .cleanup() to stop)."""
+    h = _Handlers(registry)
+    app = web.Application()
+    app.router.add_get("/leagues", h.leagues)
+    app.router.add_get(r"/{league}/{table}.{fmt}", h.table)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info(f"HTTP export listening on http://{host}:{port}/leagues")
+    return runner
+
+
+def describe() -> str:
+    s = STATS
+    pct = 100 * s["not_modified"] / s["requests"] if s["requests"] else 0
+    return (f"HTTP export → {s['requests']} requests, {s['not_modified']} not modified ({pct:.0f}%),"
+            f" {s['built']} bodies built, {s['bytes_sent']:,} bytes sent")
@@ -0,0 +1,200 @@
+# leagues.py
+# Per-guild league registry: one process serves several leagues, each with its own
+# sheet, snapshot (plus the indexes/caches hung off it), history DB, write-back queue and
+# sync schedule.
+#
+# Config: RSFF_LEAGUES_FILE points at a JSON list such as
+#   [{"name": "main", "guild_id": 123, "sheet_id": "...", "ranges": ["Rosters!A:K", ...],
+#     "feed_channel_id": 456}, ...]
+# Without it, a single league is built from the classic RSFF_SHEET_ID / RSFF_RANGES /
+# DISCORD_GUILD_ID / RSFF_FEED_CHANNEL_ID variables, so existing deployments are unchanged.
+import os
+import json
+import time
+import threading
+
+import history_store
+from snapshot_cache import load_snapshot
+from sync_schedule import AdaptiveScheduler, CircuitBreaker
+from shared_snapshot import SnapshotReader
+
+# Process role for sharded deployments (see shared_snapshot.py):
+#   standalone — pull and hold snapshots in-process (default)
+#   owner      — pull, then publish each snapshot + indexes for workers
+#   worker     — never pull; attach to the owner's published generations
+ROLE = os.getenv("RSFF_SNAPSHOT_ROLE", "standalone").strip().lower()
+SHARED_DIR = os.getenv("RSFF_SHARED_SNAPSHOT_DIR", "rsff_shared")
+
+
+class League:
+    def __init__(self, name: str, guild_id: int, sheet_id: str, ranges: list[str],
+                 feed_channel_id: int = 0, snapshot_file: str | None = None, history_db: str | None = None,
+                 writeback_db: str | None = None):
+        self.name = name
+        self.guild_id = int(guild_id or 0)
+        self.sheet_id = sheet_id
+        self.ranges = list(ranges or [])
+        self.feed_channel_id = int(feed_channel_id or 0)
+        self.snapshot_file = snapshot_file or f"rsff_snapshot.{name}.json"
+        self.history_db = history_db or f"rsff_history.{name}.sqlite3"
+        self.writeback_db = writeback_db or f"rsff_writeback.{name}.sqlite3"
+        self.scheduler = AdaptiveScheduler.from_env()
+        self.breaker = CircuitBreaker.from_env()
+
+        self._snapshot = None
+        self.last_pull = 0.0      # time.time() of the last successful pull (or of the restored file)
+        self.rev = None           # sheet change token of the held/saved snapshot (kept across eviction)
+        self.last_used = 0.0      # time.monotonic() of the last command served
+        self.next_due = 0.0       # time.monotonic() when the shared fetcher should pull next
+        self.pull_lock = threading.Lock()
+        self.reader = SnapshotReader(SHARED_DIR, name) if ROLE == "worker" else None
+
+    @property
+    def resident(self) -> bool:
+        return self._snapshot is not None
+
+    def peek(self):
+        """Current in-memory snapshot without touching LRU state or loading from disk."""
+        return self._snapshot
+
+    def set_snapshot(self, snap, pulled_at: float | None = None):
+        self._snapshot = snap
+        self.rev = snap.get("rev")
+        self.last_pull = pulled_at if pulled_at is not None else time.time()
+
+    def restore(self) -> bool:
+        """Reload the last saved snapshot from disk. Returns False if there is none."""
+        snap = load_snapshot(self.snapshot_file)
+        if not snap:
+            return False
+        self.set_snapshot(snap, float(snap.get("saved_at") or 0.0))
+        return True
+
+    def evict(self):
+        """Drop the snapshot and everything derived from it; the disk copy stays."""
+        self._snapshot = None
+        history_store.release(self.history_db)
+
+    def describe(self) -> str:
+        state = "resident" if self.resident else "evicted"
+        return f"{self.name} (guild {self.guild_id or 'any'}) — {state}"
+
+
+class LeagueRegistry:
+    def __init__(self, leagues: list[League], max_resident: int = 4, idle_evict_s: float = 3600,
+                 fetch_spacing_s: float = 30):
+        self.leagues = leagues
+        self.by_guild = {lg.guild_id: lg for lg in leagues if lg.guild_id}
+        self.max_resident = max(1, max_resident)
+        self.idle_evict_s = idle_evict_s
+        self.fetch_spacing_s = fetch_spacing_s
+        self._last_fetch = 0.0
+        self._lock = threading.Lock()
+        # Stagger the first pulls so leagues never all hit Sheets at once
+        now = time.monotonic()
+        for i, lg in enumerate(leagues):
+            lg.next_due = now + i * fetch_spacing_s
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv("RSFF_LEAGUES_FILE", "")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                cfg = json.load(f)
+            leagues = [
+                League(
+                    name=c["name"],
+                    guild_id=c.get("guild_id", 0),
+                    sheet_id=c["sheet_id"],
+                    ranges=c.get("ranges", []),
+                    feed_channel_id=c.get("feed_channel_id", 0),
+                    snapshot_file=c.get("snapshot_file"),
+                    history_db=c.get("history_db"),
+                    writeback_db=c.get("writeback_db"),
+                )
+                for c in cfg
+            ]
+        else:
+            leagues = [League(
+                name="default",
+                guild_id=int(os.getenv("DISCORD_GUILD_ID", "0")),
+                sheet_id=os.getenv("RSFF_SHEET_ID", ""),
+                ranges=[r.strip() for r in os.getenv("RSFF_RANGES", "").split(",") if r.strip()],
+                feed_channel_id=int(os.getenv("RSFF_FEED_CHANNEL_ID", "0")),
+                # single-league installs keep their existing file names
+                snapshot_file=os.getenv("RSFF_SNAPSHOT_FILE", "rsff_snapshot.json"),
+                history_db=os.getenv("RSFF_HISTORY_DB", "rsff_history.sqlite3"),
+                writeback_db=os.getenv("RSFF_WRITEBACK_DB", "rsff_writeback.sqlite3"),
+            )]
+        return cls(
+            leagues,
+            max_resident=int(os.getenv("RSFF_MAX_RESIDENT_LEAGUES", "4")),
+            idle_evict_s=float(os.getenv("RSFF_LEAGUE_IDLE_MINUTES", "60")) * 60,
+            fetch_spacing_s=float(os.getenv("RSFF_FETCH_SPACING_SECONDS", "30")),
+        )
+
+    # ---- lookup
+    def for_guild(self, guild_id: int | None) -> League | None:
+        """League serving a guild; DMs and unmapped guilds fall back to a lone league."""
+        lg = self.by_guild.get(int(guild_id or 0))
+        if lg is None and len(self.leagues) == 1:
+            lg = self.leagues[0]
+        return lg
+
+    def snapshot(self, league: League):
+        """The league's snapshot, reloading it from disk if it was evicted (None if never pulled)."""
+        if league.reader is not None:
+            return league.reader.current()
+        with self._lock:
+            league.last_used = time.monotonic()
+            if not league.resident:
+                league.restore()
+                self._enforce_budget(keep=league)
+            return league.peek()
+
+    def adopt(self, league: League, snap):
+        """Install a freshly pulled snapshot as resident, evicting others if over budget."""
+        with self._lock:
+            league.set_snapshot(snap)
+            league.last_used = time.monotonic()
+            self._enforce_budget(keep=league)
+
+    # ---- memory budget
+    def _enforce_budget(self, keep: League | None = None):
+        resident = sorted((lg for lg in self.leagues if lg.resident and lg is not keep), key=lambda lg: lg.last_used)
+        extra = len(resident) + (1 if keep and keep.resident else 0) - self.max_resident
+        for lg in resident[:max(0, extra)]:
+            lg.evict()
+
+    def evict_idle(self) -> list[League]:
+        """Evict leagues nobody has queried for idle_evict_s (never the only league)."""
+        if len(self.leagues) == 1:
+            return []
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for lg in self.leagues:
+                if lg.resident and now - lg.last_used > self.idle_evict_s:
+                    lg.evict()
+                    out.append(lg)
+        return out
+
+    # ---- shared fetch scheduler
+    def next_due(self) -> League | None:
+        """
+        The most overdue league, if any is due and the shared spacing since the last
+        fetch has passed. At most one league is handed out per call. Workers never fetch.
+        """
+        if ROLE == "worker":
+            return None
+        now = time.monotonic()
+        if now - self._last_fetch < self.fetch_spacing_s:
+            return None
+        due = [lg for lg in self.leagues if lg.next_due <= now]
+        if not due:
+            return None
+        self._last_fetch = now
+        return min(due, key=lambda lg: lg.next_due)
+
+    def reschedule(self, league: League, delay_s: float):
+        league.next_due = time.monotonic() + delay_s
@@ -0,0 +1,263 @@
+# loadgen.py
+# Load generator for the bot's prefix commands. Builds discord.py Contexts around fake
+# messages/members (mapped through Owners2025) and pushes them through bot.invoke, so
+# checks, cooldowns, argument parsing, the real handlers and the on_command* events all
+# run exactly as in production — only ctx.send is captured instead of hitting Discord.
+# Latency runs until the command's last reply page has left the outbound queue.
+#
+#   python loadgen.py --snapshot rsff_snapshot.json --rate 200 --concurrency 32 --duration 30
+#   python loadgen.py --fake-sheets book.json --mix cap=5,teamsum=3,whatif=2 --rate 0
+#   python loadgen.py --snapshot s.json --replay commands.jsonl   # {"author": "...", "content": "!cap"}
+#
+# --rate is arrivals/sec (open loop; 0 = as fast as the concurrency limit allows).
+# Latency is measured from each command's scheduled arrival, so queueing shows up
+# once the bot can't keep pace. A ticker task measures event-loop lag alongside.
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import itertools
+from collections import defaultdict
+from types import SimpleNamespace
+
+os.environ.setdefault("DISCORD_TOKEN", "loadgen")
+import app  # noqa: E402  (builds the bot + registry; nothing connects without bot.run)
+import discord  # noqa: E402
+from discord.ext import commands  # noqa: E402
+from discord.ext.commands.view import StringView  # noqa: E402
+
+import render  # noqa: E402
+import outbound  # noqa: E402
+from rsff_cli import load_source  # noqa: E402
+
+DEFAULT_MIX = "cap=5,teamsum=3,capdetail=2,player=3,whatif=2,add=1,drop=1,leaders=1,status=1"
+_LAG_TICK_S = 0.05
+
+
+class FakeMember(SimpleNamespace):
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel(SimpleNamespace):
+    """Channel for out-of-band posts (e.g. the !profile upload); messages are kept, not sent."""
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((time.perf_counter(), content, kwargs))
+        return None
+
+
+class LoadContext(commands.Context):
+    """Context whose replies are recorded instead of sent."""
+
+    async def send(self, content=None, **kwargs):
+        self.message.replies.append((time.perf_counter(), content, kwargs))
+        return None
+
+
+def make_members(snap, admin: bool = False) -> list[FakeMember]:
+    """One fake member per Owners2025 row, named after its `discord user` so resolve_user_team maps it."""
+    perms = discord.Permissions.all() if admin else discord.Permissions.none()
+    out = []
+    for i, o in enumerate(snap.get("tabs", {}).get("Owners2025", [])):
+        handle = str(o.get("discord user") or o.get("owner_display") or f"user{i}").strip()
+        out.append(FakeMember(id=10_000 + i, name=handle, display_name=handle, global_name=handle,
+                              bot=False, guild_permissions=perms))
+    return out or [FakeMember(id=10_000, name="nobody", display_name="nobody", global_name="nobody",
+                              bot=False, guild_permissions=perms)]
+
+
+def synthetic_commands(snap, mix: str, rng: random.Random):
+    """Endless stream of '!cmd args' strings drawn from a weighted mix."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, w = part.partition("=")
+        if name.strip():
+            weights[name.strip()] = float(w or 1)
+    names = [r.get("player_name") or r.get("Player Name") or "" for r in snap.get("tabs", {}).get("Salary2025", [])]
+    names = [n for n in names if n] or ["mahomes"]
+    teams = render.team_names(snap) or [""]
+    cmds, w = list(weights), list(weights.values())
+    while True:
+        c = rng.choices(cmds, w)[0]
+        p = rng.choice(names)
+        if c in ("cap", "capdetail", "teamsum"):
+            yield f"!{c} {rng.choice(teams)}" if rng.random() < 0.5 else f"!{c}"
+        elif c in ("player", "add", "drop"):
+            yield f"!{c} {p.split()[-1].lower() if rng.random() < 0.5 else p}"
+        elif c == "whatif":
+            yield f"!whatif add {p} drop {rng.choice(names)}"
+        elif c == "history":
+            yield f"!history player {p}"
+        else:
+            yield f"!{c}"
+
+
+def replay_commands(path: str):
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not rows:
+        raise SystemExit(f"{path}: no commands")
+    for r in itertools.cycle(rows):
+        yield r.get("author"), r["content"]
+
+
+def _pct(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+async def _one(bot, guild, member, content: str, arrived: float, stats, sem):
+    async with sem:
+        started = time.perf_counter()
+        # a channel per command, so its paged replies can be awaited on their own
+        channel = FakeChannel(id=int(started * 1e6), name="loadgen", sent=[])
+        msg = SimpleNamespace(
+            id=int(started * 1e6), content=content, author=member, guild=guild, channel=channel,
+            created_at=datetime.datetime.now(datetime.timezone.utc), edited_at=None,
+            attachments=[], _state=None, replies=[],
+        )
+        view = StringView(content)
+        view.skip_string(bot.command_prefix)
+        invoked = view.get_word()
+        ctx = LoadContext(prefix=bot.command_prefix, view=view, bot=bot, message=msg,
+                          invoked_with=invoked, command=bot.all_commands.get(invoked))
+        try:
+            await bot.invoke(ctx)
+            await asyncio.sleep(0)  # let on_command_error tasks post their reply
+            await outbound.OUTBOX.drained(channel.id)  # latency = until the last page is out
+            ok = not ctx.command_failed
+        except Exception as e:
+            stats["errors"][type(e).__name__] += 1
+            ok = False
+        done = time.perf_counter()
+    stats["latency"][invoked].append(done - arrived)
+    stats["service"].append(done - started)
+    stats["ok" if ok else "failed"] += 1
+    stats["replies"] += len(msg.replies)
+    stats["bytes"] += sum(len(c or "") for _, c, _ in msg.replies)
+
+
+async def _lag_monitor(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(_LAG_TICK_S)
+        lags.append(max(0.0, time.perf_counter() - t - _LAG_TICK_S))
+
+
+async def run(args) -> dict:
+    snap = load_source(args.snapshot, args.fake_sheets, args.ranges)
+    league = app.LEAGUES.leagues[0]
+    app.LEAGUES.adopt(league, snap)
+    if not args.keep_cooldowns:
+        for cmd in app.bot.commands:
+            cmd._buckets._cooldown = None  # measure handler capacity, not the per-user rate limit
+        outbound.OUTBOX.pacing = False
+
+    bot = app.bot
+    await bot._async_setup_hook()  # what login() does first: binds the client to this loop (no network)
+    guild = SimpleNamespace(id=league.guild_id or 1, name="loadgen")
+    members = make_members(snap, admin=args.admin)
+    by_name = {m.name.lower(): m for m in members}
+    rng = random.Random(args.seed)
+
+    if args.replay:
+        source = ((by_name.get(str(a or "").lower()) or rng.choice(members), c) for a, c in replay_commands(args.replay))
+    else:
+        source = ((rng.choice(members), c) for c in synthetic_commands(snap, args.mix, rng))
+
+    stats = {"latency": defaultdict(list), "service": [], "ok": 0, "failed": 0, "replies": 0, "bytes": 0,
+             "errors": defaultdict(int)}
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    stop, lags = asyncio.Event(), []
+    lag_task = asyncio.create_task(_lag_monitor(stop, lags))
+
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration
+    pending, sent = set(), 0
+    while (args.count and sent < args.count) or (not args.count and time.perf_counter() < deadline):
+        if args.rate > 0:
+            arrived = t0 + sent / args.rate
+            if arrived > time.perf_counter():
+                await asyncio.sleep(arrived - time.perf_counter())
+        else:
+            # closed loop: the next command arrives only when a slot frees up
+            while len(pending) >= args.concurrency:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            arrived = time.perf_counter()
+        member, content = next(source)
+        pending.add(asyncio.create_task(_one(bot, guild, member, content, arrived, stats, sem)))
+        sent += 1
+    if pending:
+        await asyncio.wait(pending)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await lag_task
+
+    all_lat = sorted(x for v in stats["latency"].values() for x in v)
+    lags.sort()
+    return {
+        "commands": sent,
+        "ok": stats["ok"],
+        "failed": stats["failed"],
+        "replies": stats["replies"],
+        "reply_bytes": stats["bytes"],
+        "elapsed_s": elapsed,
+        "throughput_per_s": sent / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {q: _pct(all_lat, p) * 1000 for q, p in (("p50", .5), ("p90", .9), ("p99", .99), ("max", 1.0))},
+        "service_ms_p50": _pct(sorted(stats["service"]), .5) * 1000,
+        "loop_lag_ms": {q: _pct(lags, p) * 1000 for q, p in (("p50", .5), ("p99", .99), ("max", 1.0))},
+        "errors": dict(stats["errors"]),
+        "by_command": {
+            k: {"n": len(v), "p50_ms": _pct(sorted(v), .5) * 1000, "p99_ms": _pct(sorted(v), .99) * 1000}
+            for k, v in sorted(stats["latency"].items())
+        },
+    }
+
+
+def print_report(r: dict):
+    lat, lag = r["latency_ms"], r["loop_lag_ms"]
+    print(f"{r['commands']} commands in {r['elapsed_s']:.2f}s → {r['throughput_per_s']:,.0f}/s "
+          f"({r['ok']} ok, {r['failed']} failed, {r['replies']} replies, {r['reply_bytes']:,} bytes)")
+    print(f"latency  p50 {lat['p50']:.1f}ms  p90 {lat['p90']:.1f}ms  p99 {lat['p99']:.1f}ms  max {lat['max']:.1f}ms"
+          f"  (service p50 {r['service_ms_p50']:.1f}ms)")
+    print(f"loop lag p50 {lag['p50']:.1f}ms  p99 {lag['p99']:.1f}ms  max {lag['max']:.1f}ms")
+    if r["errors"]:
+        print("errors   " + ", ".join(f"{k}×{n}" for k, n in r["errors"].items()))
+    for k, v in r["by_command"].items():
+        print(f"  {k:<10} n={v['n']:<6} p50 {v['p50_ms']:.1f}ms  p99 {v['p99_ms']:.1f}ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay bot commands against fake Discord contexts.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--snapshot", help="saved snapshot JSON")
+    src.add_argument("--fake-sheets", help="fake Sheets backing file (see fake_sheets.py)")
+    ap.add_argument("--ranges", nargs="*", help="ranges to pull from --fake-sheets (default: every tab)")
+    ap.add_argument("--replay", help="JSONL of {author, content} to replay (cycled) instead of a synthetic mix")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="weighted synthetic mix, e.g. cap=5,teamsum=3")
+    ap.add_argument("--rate", type=float, default=100, help="arrivals per second (0 = closed loop)")
+    ap.add_argument("--concurrency", type=int, default=16, help="max commands in flight")
+    ap.add_argument("--duration", type=float, default=10, help="seconds to generate load")
+    ap.add_argument("--count", type=int, default=0, help="stop after N commands instead of --duration")
+    ap.add_argument("--admin", action="store_true", help="fake members get administrator (for !sync, !leagues)")
+    ap.add_argument("--keep-cooldowns", action="store_true", help="leave per-user command cooldowns and outbound send pacing in place")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        print_report(report)
+    return 1 if report["failed"] and not args.keep_cooldowns else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# memstats.py
+# Memory accounting behind `!statusmem`: deep sizes per snapshot tab, per derived
+# index and per cache, a scan for snapshot dicts that outlived their generation, an
+# RSS ring recorded after every sync, and (opt-in) a tracemalloc diff between the
+# last two sync generations.
+#
+# RSFF_TRACEMALLOC=1 starts tracemalloc at import (it slows allocation, so it's off
+# by default); RSFF_RSS_HISTORY sets how many syncs the RSS ring keeps (default 48).
+import os
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+TRACE = os.getenv("RSFF_TRACEMALLOC", "").strip().lower() in ("1", "true", "yes")
+RSS_HISTORY = deque(maxlen=int(os.getenv("RSFF_RSS_HISTORY", "48")))  # (epoch, league, hash, rss bytes)
+_GENERATIONS = deque(maxlen=2)                                          # (label, tracemalloc.Snapshot)
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+if TRACE and not tracemalloc.is_tracing():
+    tracemalloc.start(1)
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc, else psutil)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import psutil  # only needed off Linux
+        return psutil.Process(os.getpid()).memory_info().rss
+
+
+def deep_size(obj, seen: set | None = None) -> int:
+    """
+    Bytes held by obj and everything reachable through dicts/lists/tuples/sets.
+    Objects already in `seen` (by id) are not counted again, so passing one set
+    across several calls attributes shared strings/rows to whoever was sized first.
+    """
+    seen = set() if seen is None else seen
+    total, stack = 0, [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+    return total
+
+
+def snapshot_sizes(snap, seen: set | None = None) -> tuple[list, list]:
+    """([(tab, rows, bytes)], [(index key, bytes)]) for one snapshot; tabs are sized first."""
+    seen = set() if seen is None else seen
+    seen.add(id(snap))
+    tabs = snap.get("tabs", {})
+    seen.add(id(tabs))
+    # Shared (mmap'd) snapshots: only count tabs this process has decoded
+    items = tabs._cache.items() if hasattr(tabs, "_cache") else tabs.items()
+    tab_sizes = [(name, len(rows), deep_size(rows, seen)) for name, rows in items]
+    idx_sizes = [(k, deep_size(v, seen)) for k, v in dict.items(snap) if k.startswith("_")]
+    return tab_sizes, idx_sizes
+
+
+def live_snapshots() -> list[dict]:
+    """Every snapshot-shaped dict the garbage collector can still reach."""
+    return [o for o in gc.get_objects()
+            if isinstance(o, dict) and "hash" in o and "tabs" in o and "ts" in o]
+
+
+def retained_snapshots(current) -> list[tuple[dict, list[str]]]:
+    """Live snapshots that are not one of `current`, each with the types of what still refers to them."""
+    keep = {id(s) for s in current if s is not None}
+    live, out = live_snapshots(), []
+    for s in live:
+        if id(s) in keep:
+            continue
+        refs = [type(r).__name__ for r in gc.get_referrers(s) if r is not live and r is not out]
+        out.append((s, refs))
+    return out
+
+
+def record_sync(league: str, snap_hash: str):
+    """Called after each pull: append to the RSS ring and, when tracing, keep a generation snapshot."""
+    RSS_HISTORY.append((time.time(), league, snap_hash, rss_bytes()))
+    if tracemalloc.is_tracing() and TRACE:
+        _GENERATIONS.append((f"{league}@{snap_hash}", tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)))
+
+
+def generation_diff(top: int = 8) -> list[str]:
+    """Allocation sites that grew between the last two sync generations (needs RSFF_TRACEMALLOC=1)."""
+    if not TRACE:
+        return ["tracemalloc off — set RSFF_TRACEMALLOC=1 to diff sync generations"]
+    if len(_GENERATIONS) < 2:
+        return [f"tracemalloc on — waiting for two syncs ({len(_GENERATIONS)}/2)"]
+    (old_label, old), (new_label, new) = _GENERATIONS
+    stats = new.compare_to(old, "lineno")
+    grown = sum(s.size_diff for s in stats)
+    lines = [f"tracemalloc {old_label} → {new_label}: {grown / 1024:+,.0f} KiB net"]
+    for s in stats[:top]:
+        if s.size_diff <= 0:
+            break
+        frame = s.traceback[0]
+        lines.append(f"  {s.size_diff / 1024:+,.0f} KiB {s.count_diff:+,} blocks  {os.path.basename(frame.filename)}:{frame.lineno}")
+    return lines
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:,.0f} {unit}" if unit == "B" else f"{n:,.1f} {unit}"
+        n /= 1024
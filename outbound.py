@@ -0,0 +1,176 @@
+# outbound.py
+# Paginated, paced replies. Long command output is split on line boundaries into
+# Discord-sized pages and handed to a per-channel send queue, so handlers return as
+# soon as their text is queued and bursts are spread out instead of tripping 429s.
+#
+# Pacing mirrors Discord's limits: 5 messages / 5 s per channel and ~50 requests/s
+# globally. A 429 that still gets through is retried after its retry_after.
+import time
+import asyncio
+import logging
+from collections import deque
+
+import tracing
+
+LIMIT = 2000
+_FENCE = "```"
+
+log = logging.getLogger("rsff")
+
+
+def paginate(text: str, limit: int = LIMIT) -> list[str]:
+    """
+    Split text into pages of at most `limit` chars, on line breaks, keeping ``` blocks
+    balanced: a page that ends inside a block closes it and the next page reopens it.
+    Over-long lines are hard-split; a page never holds only fences.
+    """
+    close = "\n" + _FENCE
+    pages, cur, fence = [], "", False
+
+    def flush() -> str:
+        if cur.strip() not in ("", _FENCE):
+            pages.append(cur + (close if fence else ""))
+        return _FENCE if fence else ""  # the next page reopens an open block
+
+    for line in (text or "").split("\n"):
+        if cur and len(cur) + 1 + len(line) > limit - len(close):
+            cur = flush()
+        room = limit - len(close) - (len(cur) + 1 if cur else 0)
+        while len(line) > room:  # one enormous line: hard-split it, counting the fences around each piece
+            cur, line = (f"{cur}\n" if cur else "") + line[:room], line[room:]
+            cur = flush()
+            room = limit - len(close) - (len(cur) + 1 if cur else 0)
+        cur = f"{cur}\n{line}" if cur else line
+        if line.count(_FENCE) % 2:
+            fence = not fence
+    flush()
+    return pages or [""]
+
+
+def check_pages(pages: list[str], limit: int = LIMIT) -> list[str]:
+    """Problems with a pagination: pages over `limit`, or with unbalanced ``` fences."""
+    out = []
+    for i, page in enumerate(pages):
+        if len(page) > limit:
+            out.append(f"page {i}: {len(page)} chars > {limit}")
+        if page.count(_FENCE) % 2:
+            out.append(f"page {i}: unbalanced {_FENCE}")
+    return out
+
+
+class _Bucket:
+    """Sliding-window limiter: at most `count` sends per `per` seconds."""
+
+    def __init__(self, count: int, per: float):
+        self.count, self.per = count, per
+        self.times = deque()
+
+    def wait_time(self, now: float) -> float:
+        while self.times and now - self.times[0] >= self.per:
+            self.times.popleft()
+        return 0.0 if len(self.times) < self.count else self.per - (now - self.times[0])
+
+    def take(self, now: float):
+        self.times.append(now)
+
+
+class SendQueue:
+    def __init__(self, per_channel: int = 5, per_channel_s: float = 5.0, global_per_s: int = 50):
+        self.pacing = True
+        self._per_channel = (per_channel, per_channel_s)
+        self._global = _Bucket(global_per_s, 1.0)
+        self._buckets: dict[int, _Bucket] = {}
+        self._queues: dict[int, deque] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self.sent = 0
+        self.throttled_s = 0.0
+        self.retries = 0
+
+    def send(self, channel_id: int, send, text: str, **first_kwargs) -> asyncio.Future:
+        """
+        Queue `text` (paginated) for `send` — ctx.send, channel.send or interaction.followup.send.
+        Extra kwargs (files, ephemeral, ...) go with the first page. Returns a future that
+        resolves once every page is out; callers normally don't wait for it.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        q = self._queues.setdefault(channel_id, deque())
+        q.append((send, paginate(text), first_kwargs, fut, tracing.current()))
+        w = self._workers.get(channel_id)
+        if w is None or w.done():
+            self._workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+        return fut
+
+    async def drained(self, channel_id: int):
+        """Wait until everything queued for a channel has been sent."""
+        w = self._workers.get(channel_id)
+        if w is not None:
+            await asyncio.shield(w)
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def _pace(self, channel_id: int):
+        if not self.pacing:
+            return
+        bucket = self._buckets.setdefault(channel_id, _Bucket(*self._per_channel))
+        while True:
+            now = time.monotonic()
+            wait = max(bucket.wait_time(now), self._global.wait_time(now))
+            if wait <= 0:
+                bucket.take(now)
+                self._global.take(now)
+                return
+            self.throttled_s += wait
+            await asyncio.sleep(wait)
+
+    async def _send_page(self, send, page: str, kwargs: dict):
+        for attempt in range(4):
+            try:
+                return await send(page, **kwargs)
+            except Exception as e:
+                if getattr(e, "status", None) != 429 or attempt == 3:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(float(getattr(e, "retry_after", 1.0) or 1.0))
+
+    async def _drain(self, channel_id: int):
+        q = self._queues[channel_id]
+        tracing.detach()  # spawned from whichever command queued first; each item carries its own parent
+        while q:
+            send, pages, first_kwargs, fut, parent = q.popleft()
+            try:
+                # traced under the command that queued it (this worker may be serving many)
+                with tracing.span("outbound.pages", parent=parent, channel=channel_id, pages=len(pages)):
+                    for i, page in enumerate(pages):
+                        await self._pace(channel_id)
+                        await self._send_page(send, page, first_kwargs if i == 0 else {})
+                        self.sent += 1
+                if not fut.done():
+                    fut.set_result(len(pages))
+            except Exception as e:
+                log.error(f"outbound send to {channel_id} failed: {e}")
+                if not fut.done():
+                    fut.set_exception(e)
+                    fut.exception()  # mark retrieved: fire-and-forget callers never await it
+        self._queues.pop(channel_id, None)
+
+
+OUTBOX = SendQueue()
+
+
+if __name__ == "__main__":
+    # python outbound.py — pagination self-check on the shapes replies take
+    cases = {
+        "plain": "\n".join(f"line {i} " + "x" * 60 for i in range(200)),
+        "long line": "a" * 5000,
+        "long line in block": _FENCE + "\n" + "a" * 2500 + "\n" + _FENCE,
+        "table": "**Query**\n" + _FENCE + "\n" + "\n".join("row " + "y" * 90 for _ in range(120)) + "\n" + _FENCE + "\nfooter",
+        "unclosed block": _FENCE + "\n" + "\n".join("z" * 300 for _ in range(20)),
+    }
+    bad = 0
+    for name, text in cases.items():
+        pages = paginate(text)
+        problems = check_pages(pages)
+        bad += len(problems)
+        print(f"{name}: {[len(p) for p in pages]}" + (f" — {problems}" if problems else ""))
+    raise SystemExit(1 if bad else 0)
@@ -0,0 +1,184 @@
+# profiling.py
+# On-demand production profiling for `!profile`: capture the next N commands or the
+# next T seconds (work offloaded to threads included), then hand back a text report.
+#
+# Modes:
+#   cpu    — cProfile on the event-loop thread; Sheets pulls and sim work offloaded to
+#            worker threads get their own profiler and are merged into the same stats
+#   sample — a background thread samples every thread's stack every few ms
+#            (sys._current_frames); low overhead, wall-clock view, sees all threads
+# Optionally tracemalloc runs for the window and the report lists the allocation
+# sites that grew most.
+#
+# Off means off: ACTIVE is None and the only cost in the hot path is that check.
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+
+ACTIVE = None  # the running Session, if any
+
+_SAMPLE_INTERVAL_S = 0.005
+
+
+class Session:
+    def __init__(self, mode: str = "cpu", commands: int = 0, seconds: float = 0.0,
+                 memory: bool = False, top: int = 25):
+        self.mode = mode
+        self.max_commands = commands
+        self.seconds = seconds
+        self.memory = memory
+        self.top = top
+        self.commands = 0
+        self.offloaded = 0
+        self.started = time.perf_counter()
+        self.stopped = None
+
+        self._lock = threading.Lock()
+        self._stats = None              # merged pstats.Stats from worker-thread calls
+        self._profile = None
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        self._samples = 0
+        self._self = Counter()          # innermost frame per sample
+        self._cum = Counter()           # every distinct function on the stack per sample
+        self._mem_before = None
+        self._own_tracemalloc = False
+
+    # ---- lifecycle
+    def start(self):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._own_tracemalloc = True
+            self._mem_before = tracemalloc.take_snapshot()
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def finish(self) -> str:
+        """Stop collecting and return the report text."""
+        self.stopped = time.perf_counter()
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join(timeout=2)
+        mem_lines = self._memory_report() if self.memory else []
+        return "\n".join(self._header() + self._cpu_report() + mem_lines) + "\n"
+
+    # ---- hooks called from app.py (only while ACTIVE)
+    def note_command(self) -> bool:
+        """Count a finished command; True once the requested number has been seen."""
+        self.commands += 1
+        return bool(self.max_commands) and self.commands >= self.max_commands
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn (a Sheets pull or sim call on a worker thread) under this session."""
+        self.offloaded += 1
+        if self.mode != "cpu":
+            return fn(*args, **kwargs)  # the sampler already sees every thread
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            return fn(*args, **kwargs)  # another profiler owns this thread
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(prof)
+                else:
+                    self._stats.add(prof)
+
+    # ---- sampling
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while not self._stop_sampling.wait(_SAMPLE_INTERVAL_S):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                self._samples += 1
+                code = frame.f_code
+                self._self[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+                seen = set()
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if key not in seen:
+                        seen.add(key)
+                        self._cum[key] += 1
+                    frame = frame.f_back
+
+    # ---- report
+    def _header(self) -> list[str]:
+        took = (self.stopped or time.perf_counter()) - self.started
+        return [
+            f"RSFF profile — mode {self.mode}, {took:.1f}s, {self.commands} commands, {self.offloaded} worker calls",
+            "",
+        ]
+
+    def _cpu_report(self) -> list[str]:
+        if self.mode == "sample":
+            if not self._samples:
+                return ["(no samples)"]
+            lines = [f"Top {self.top} by cumulative samples ({self._samples} samples @ {_SAMPLE_INTERVAL_S * 1000:.0f}ms, all threads):"]
+            for (fname, line, name), n in self._cum.most_common(self.top):
+                lines.append(f"{n / self._samples:6.1%}  {n:6d}  {name}  {fname}:{line}")
+            lines += ["", f"Top {self.top} by self samples:"]
+            for (fname, line, name), n in self._self.most_common(self.top):
+                lines.append(f"{n / self._samples:6.1%}  {n:6d}  {name}  {fname}:{line}")
+            return lines
+
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        if self._stats is not None:
+            stats.add(self._stats)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        return out.getvalue().splitlines()
+
+    def _memory_report(self) -> list[str]:
+        after = tracemalloc.take_snapshot()
+        diff = after.compare_to(self._mem_before, "lineno")
+        current, peak = tracemalloc.get_traced_memory()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        lines = ["", f"tracemalloc: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB",
+                 f"Top {self.top} allocation sites by growth during the window:"]
+        for st in diff[:self.top]:
+            lines.append(f"{st.size_diff / 1024:+10.1f} KiB {st.count_diff:+7d} blocks  {st.traceback[0]}")
+        return lines
+
+
+def start(**kwargs) -> Session:
+    global ACTIVE
+    if ACTIVE is not None:
+        raise RuntimeError("a profile is already running")
+    ACTIVE = Session(**kwargs).start()
+    return ACTIVE
+
+
+def stop() -> str | None:
+    """End the active session (if any) and return its report."""
+    global ACTIVE
+    sess, ACTIVE = ACTIVE, None
+    return sess.finish() if sess else None
+
+
+def wrap(fn):
+    """fn itself when idle; otherwise fn run under the active session (for worker-thread calls)."""
+    sess = ACTIVE
+    if sess is None:
+        return fn
+    return lambda *a, **kw: sess.call(fn, *a, **kw)
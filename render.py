@@ -0,0 +1,461 @@
+# render.py
+# Text for command replies, shared by the Discord bot (app.py) and the offline CLI.
+# Each function takes the snapshot plus an already computed sim result and returns
+# the message body; nothing here talks to Discord or Sheets.
+from __future__ import annotations
+import time
+import datetime
+from typing import Dict, Any, List
+
+from sim.cap import cap_summary
+from sim.query import is_money
+
+
+def fmt_age(seconds: float) -> str:
+    if seconds < 90:
+        return "just now"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f}m old"
+    if seconds < 36 * 3600:
+        return f"{seconds / 3600:.0f}h old"
+    return f"{seconds / 86400:.0f}d old"
+
+
+def snapshot_age(snap) -> float | None:
+    """Seconds since the snapshot was last confirmed current (pulled, or checked unchanged)."""
+    at = snap.get("checked_at")
+    if at is None:
+        try:
+            at = datetime.datetime.strptime(snap["ts"], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (KeyError, TypeError, ValueError):
+            return None
+    return max(0.0, time.time() - float(at))
+
+
+def footer(snap) -> str:
+    age = snapshot_age(snap)
+    text = f"Snapshot {snap['hash']} @ {snap['ts']}" + (f" · {fmt_age(age)}" if age is not None else "")
+    if snap.get("_stale"):
+        # set by app._pull while Sheets is failing: we are serving the last good copy
+        text += f" · ⚠️ {snap['_stale']}"
+    return f"_{text}_"
+
+
+def _cap_delta_lines(used_before: float, used_after: float, cap_limit: float) -> List[str]:
+    rem_before = cap_limit - used_before
+    rem_after  = cap_limit - used_after
+    delta_used = used_after - used_before
+    delta_rem  = rem_after - rem_before
+    return [
+        f"**Cap Used:** `${used_before:,.0f}` → `${used_after:,.0f}`  _(Δ `${delta_used:,.0f}`)_",
+        f"**Cap Remaining:** `${rem_before:,.0f}` → `${rem_after:,.0f}`  _(Δ `${delta_rem:,.0f}`)_",
+    ]
+
+
+# ---------- league ----------
+
+def leaders_rows(snap) -> List[tuple]:
+    """(cap_remaining, team_name, cap_used, cap_limit) for every Owners2025 team, most space first."""
+    owners = snap.get("tabs", {}).get("Owners2025", [])
+    rows, seen = [], set()
+    for o in owners:
+        q = str(o.get("team_name") or o.get("display_name") or o.get("owner_display") or o.get("discord user") or "").strip()
+        if not q or q in seen: continue
+        seen.add(q)
+        try:
+            res = cap_summary(snap, q)
+            rows.append((res["cap_remaining"], res["team_name"], res["cap_used"], res["cap_limit"]))
+        except Exception:
+            continue
+    rows.sort(reverse=True)
+    return rows
+
+
+def leaders_text(snap, rows, top: int = 5) -> str:
+    if not rows:
+        return "No teams found."
+    header = f"**Cap Space Leaders (Top {top})**\n{footer(snap)}"
+    lines = [header] + [f"• **{n}** → Remaining `${r:,.0f}` (Used `${u:,.0f}` / `${L:,.0f}`)" for r,n,u,L in rows[:top]]
+    return "\n".join(lines)
+
+
+def team_names(snap) -> List[str]:
+    """Distinct team labels from Owners2025, in sheet order."""
+    out, seen = [], set()
+    for o in snap.get("tabs", {}).get("Owners2025", []):
+        q = str(o.get("team_name") or o.get("display_name") or o.get("owner_display") or "").strip()
+        if q and q.lower() not in seen:
+            seen.add(q.lower())
+            out.append(q)
+    return out
+
+
+# ---------- team ----------
+
+def cap_text(snap, res) -> str:
+    lines = [
+        f"**{res['team_name']}**",
+        f"Cap Used: `${res['cap_used']:,.0f}` / `${res['cap_limit']:,.0f}`",
+    ]
+    if res.get("dp_relief", 0) > 0:
+        who = f" ({res['dp_player']})" if res.get("dp_player") else ""
+        lines.append(f"DP Relief: `-${res['dp_relief']:,.0f}`{who}")
+    lines += [
+        f"Remaining: `${res['cap_remaining']:,.0f}`",
+        f"Players Counted: {res['players_counted']}",
+        footer(snap),
+    ]
+    return "\n".join(lines)
+
+
+def capdetail_text(snap, det) -> str:
+    lines = [
+        f"**{det['team_name']} — Cap Detail**",
+        f"Used `${det['cap_used']:,.0f}` / `${det['cap_limit']:,.0f}` | Remaining `${det['cap_remaining']:,.0f}`",
+    ]
+    if det.get("dp_relief", 0) > 0:
+        lines.append(f"DP Relief: `-${det['dp_relief']:,.0f}` ({det['dp_player']})")
+    lines.append("**Top salaries counted:**")
+    for p in det["top"]:
+        dp_tag = " (DP)" if p["name"] == det.get("dp_player") else ""
+        lines.append(f"• {p['name']} {p['pos'] or ''} — `${p['salary']:,.0f}`{dp_tag}")
+    lines.append(f"_Players counted: {det['total_counted']}_ · {footer(snap)}")
+    return "\n".join(lines)
+
+
+def teamsum_text(snap, res) -> str:
+    lines = [
+        f"**Team: {res['team_name']}**",
+        f"Cap Used (net): `${res['cap_used']:,.0f}` / `${res['cap_limit']:,.0f}`",
+        f"Breakdown: Gross `${res['gross_cap']:,.0f}` – DP `${res['dp_relief']:,.0f}` – IR `${res['ir_relief']:,.0f}`",
+        f"Cap Remaining: `${res['cap_remaining']:,.0f}`",
+        f"Players Counted: {res['players_counted']} / 14",
+        footer(snap),
+        "",
+        "**Active Roster:**",
+    ]
+
+    for p in res["active"]:
+        dp_tag = " (DP)" if p["dp"] else ""
+        lines.append(f"{p['pos']:<4} {p['name']} — `${p['salary']:,.0f}`{dp_tag}")
+
+    if res["ir"]:
+        lines += [
+            "",
+            f"**Injured Reserve ({len(res['ir'])} players — IR Relief: -${res['ir_relief']:,.0f})**"
+        ]
+        for p in res["ir"]:
+            lines.append(f"{p['pos']:<4} {p['name']} — `${p['salary']:,.0f}` (IR)")
+    return "\n".join(lines)
+
+
+# ---------- players ----------
+
+def player_text(snap, res, sleeper: Dict[str, Any] | None = None) -> str:
+    status = "Free Agent" if res["status"] == "FA" else f"Rostered by **{res['rostered_by']}**"
+    flags = []
+    if res.get("dp"): flags.append("DP")
+    if res.get("on_ir"): flags.append("IR")
+    flag_txt = f" ({', '.join(flags)})" if flags else ""
+
+    lines = [
+        f"**{res['name']}** — {res.get('pos') or '?'} {res.get('nfl') or ''}{flag_txt}",
+        f"AAV: `${res['aav']:,.0f}` | Status: {status}",
+    ]
+    if res.get("market"):
+        m = res["market"]
+        lines.append(f"Market: {_ordinal(m['pct'])} percentile of {m['n']} priced {m['pos'].upper()}s (Salary2025)")
+    if res.get("sleeper_id"):
+        lines.append(f"Sleeper ID: `{res['sleeper_id']}`")
+    elif res.get("player_id"):
+        lines.append(f"Player ID: `{res['player_id']}`")
+    if sleeper and (sleeper["status"] or sleeper["injury_status"]):
+        injury = f" · Injury: {sleeper['injury_status']}" if sleeper["injury_status"] else ""
+        lines.append(f"Sleeper: {sleeper['status'] or '?'} {sleeper['team'] or 'FA'}{injury}")
+    if res.get("bye"):
+        lines.append(f"Bye: {res['bye']}")
+    lines.append(f"_Search match: {res.get('match_score', 0)}/100_ · {footer(snap)}")
+    return "\n".join(lines)
+
+
+def _ordinal(pct: float) -> str:
+    n = max(1, min(100, round(pct)))
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+# ---------- market ----------
+
+def _money_m(v: float) -> str:
+    return f"${v / 1e6:,.1f}M"
+
+
+def market_text(snap, pos: str, m) -> str:
+    s, r = m["salary"], m["rosters"]
+    lines = [f"**{pos.upper()} market** — {s['n']} priced in Salary2025 ({s['rostered']} rostered, {s['fa']} FA)"]
+    for label, d in (("Salary2025", s), ("Rosters", r)):
+        if not d["n"]:
+            lines.append(f"{label}: none")
+            continue
+        lines.append(
+            f"{label} ({d['n']}): mean `{_money_m(d['mean'])}` · p10 `{_money_m(d['p10'])}` · p25 `{_money_m(d['p25'])}`"
+            f" · **median `{_money_m(d['p50'])}`** · p75 `{_money_m(d['p75'])}` · p90 `{_money_m(d['p90'])}`"
+            f" · max `{_money_m(d['max'])}`"
+        )
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+def market_overview_text(snap, positions) -> str:
+    if not positions:
+        return f"No priced players in Salary2025.\n{footer(snap)}"
+    lines = ["**Salary market by position** (Salary2025 median / p90 · rostered median)"]
+    for pos, m in positions.items():
+        s, r = m["salary"], m["rosters"]
+        rostered = f"`{_money_m(r['p50'])}`" if r["n"] else "—"
+        lines.append(f"• **{pos.upper()}** ({s['n']}): `{_money_m(s['p50'])}` / `{_money_m(s['p90'])}` · {rostered}")
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+# ---------- transactions (simulated) ----------
+
+def drop_text(snap, res, ts) -> str:
+    used_before = float(ts["cap_used"])
+    cap_limit   = float(ts["cap_limit"])
+
+    base = float(res["salary_base"])
+    dead = float(res["dead_cap"])
+    was_dp = bool(res.get("was_dp", False))
+    was_ir = bool(res.get("was_ir", False))
+
+    if was_dp or was_ir:
+        used_after = used_before + dead
+    else:
+        used_after = used_before - base + dead
+
+    lines = [
+        f"**Drop {res['player']}** for **{res['team']}**",
+        f"Dead Cap (from rules): `${dead:,.0f}` on base `${base:,.0f}`",
+        f"Roster: {res['roster_before']} → {res['roster_after']} (max {14})",
+        "",
+        *_cap_delta_lines(used_before, used_after, cap_limit),
+        footer(snap),
+    ]
+    return "\n".join(lines)
+
+
+def add_text(snap, res, ts) -> str:
+    # Baseline from snapshot
+    used_before = float(ts["cap_used"])
+    cap_limit   = float(ts["cap_limit"])
+    used_after  = used_before + float(res["salary_effective"])
+
+    lines = [
+        f"**Add {res['player']}** to **{res['team']}**",
+        f"Availability: {res.get('availability','FA')}",
+        f"Salary: `${res['salary_effective']:,.0f}` (base `${res['salary_base']:,.0f}`)",
+        f"Roster: {res['roster_before']} → {res['roster_after']} (max {14})",
+        "",
+        *_cap_delta_lines(used_before, used_after, cap_limit),
+    ]
+    for v in res.get("violations", []):
+        lines.append(f"⚠️ {v['code']}: {v['detail']}")
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+def parse_whatif(args: str):
+    """'add aaron rodgers drop mahomes' -> ('aaron rodgers', 'mahomes'); either side may be None."""
+    # very light parser
+    tokens = args.split()
+    add_query, drop_query = None, None
+    i = 0
+    while i < len(tokens):
+        t = tokens[i].lower()
+        if t == "add":
+            i += 1
+            start = i
+            while i < len(tokens) and tokens[i].lower() not in {"add", "drop"}:
+                i += 1
+            add_query = " ".join(tokens[start:i]).strip()
+            continue
+        if t == "drop":
+            i += 1
+            start = i
+            while i < len(tokens) and tokens[i].lower() not in {"add", "drop"}:
+                i += 1
+            drop_query = " ".join(tokens[start:i]).strip()
+            continue
+        i += 1
+    return add_query, drop_query
+
+
+def whatif_text(snap, team: str, add_query, drop_query, res, ts) -> str:
+    used_before = float(ts["cap_used"])
+    cap_limit   = float(ts["cap_limit"])
+    used_after  = used_before + float(res["used_delta"])
+
+    lines = [f"**What-if for {team}**"]
+    if add_query:
+        ar = res.get("add_result")
+        if ar and ar.get("status") == "OK":
+            lines += [
+                f"• Add **{ar['player']}** → Salary `${ar['salary_effective']:,.0f}` (base `${ar['salary_base']:,.0f}`)",
+            ]
+        elif ar:
+            lines += [f"• Add {add_query}: ❌ {ar.get('reason')}"]
+
+    if drop_query:
+        dr = res.get("drop_result")
+        if dr and dr.get("status") == "OK":
+            lines += [
+                f"• Drop **{dr['player']}** → Dead Cap `${dr['dead_cap']:,.0f}` on base `${dr['salary_base']:,.0f}`",
+            ]
+        elif dr:
+            lines += [f"• Drop {drop_query}: ❌ {dr.get('reason')}"]
+
+    if res.get("violations"):
+        for v in res["violations"]:
+            lines.append(f"⚠️ {v['code']}: {v['detail']}")
+
+    if res.get("dp_before") is not None and res.get("dp_after") is not None:
+        if abs(res["dp_after"] - res["dp_before"]) > 1e-6:
+            lines.append(f"_DP re-selected: `${res['dp_before']:,.0f}` → `${res['dp_after']:,.0f}`_")
+
+    lines += [
+        "",
+        *_cap_delta_lines(used_before, used_after, cap_limit),
+        footer(snap),
+    ]
+    return "\n".join(lines)
+
+
+def trade_text(snap, res) -> str:
+    a, b = res["teams"]
+    lines = [f"**Trade (simulated)** — {a['team']} ⇄ {b['team']}"]
+    for t in (a, b):
+        bf, af = t["before"], t["after"]
+        lines += [
+            "",
+            f"__{t['team']}__ sends {', '.join(t['sent']) or 'nothing'} · receives {', '.join(t['received']) or 'nothing'}",
+            *_cap_delta_lines(bf["cap_used"], af["cap_used"], af["cap_limit"]),
+        ]
+        if bf["dp_player"] != af["dp_player"]:
+            lines.append(f"**DP:** {bf['dp_player'] or '—'} → {af['dp_player'] or '—'} (relief `${af['dp_relief']:,.0f}`)")
+        else:
+            lines.append(f"**DP:** {af['dp_player'] or '—'} (unchanged)")
+        roster = f"**Roster:** {bf['roster']} → {af['roster']}/{af['roster_max']}"
+        lines.append(roster + (" ⚠️ over roster max" if t["over_roster"] else ""))
+        if t["over_cap"]:
+            lines.append("⚠️ Over the cap after this trade")
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+# ---------- audit ----------
+
+_AUDIT_ICONS = {"CAP_NEGATIVE": "💸", "ROSTER_MAX": "👥", "MULTIPLE_DP": "⭐", "DP_ON_IR": "🚑"}
+
+def audit_text(snap, violations, title: str = "League Audit", teams: int | None = None) -> str:
+    if not violations:
+        scope = f" across {teams} teams" if teams is not None else ""
+        return f"✅ **{title}** — no violations{scope}.\n{footer(snap)}"
+    lines = [f"**{title}** ({len(violations)} violation{'s' if len(violations) != 1 else ''})"]
+    for v in violations:
+        lines.append(f"{_AUDIT_ICONS.get(v['code'], '⚠️')} {v['code']} **{v['team']}** — {v['detail']}")
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+# ---------- attribute queries ----------
+
+def _player_line(p) -> str:
+    flags = [f for f, on in (("DP", p["dp"]), ("IR", p["on_ir"])) if on]
+    where = f"**{p['team']}**" if p["on_roster"] else "FA"
+    salary = p["roster_aav"] or p["aav"]
+    return (f"• {p['name']} — {p['roster_pos'] or p['pos'] or '?'} {p['nfl'] or ''} · {where}"
+            f"{' (' + ', '.join(flags) + ')' if flags else ''} · `${salary:,.0f}`")
+
+
+def byes_text(snap, week, by_team, pos: str = "") -> str:
+    what = f"{pos.upper()}s" if pos else "players"
+    n = sum(len(v) for v in by_team.values())
+    if not n:
+        return f"No rostered {what} on bye in week {week}.\n{footer(snap)}"
+    lines = [f"**Week {week} byes** — {n} rostered {what} across {len(by_team)} teams"]
+    for team, ps in by_team.items():
+        lines.append(f"**{team}** ({len(ps)}): " + ", ".join(f"{p['name']} ({p['roster_pos'] or p['pos'] or '?'})" for p in ps))
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+def players_text(snap, filters, rows, limit: int = 25) -> str:
+    crit = " ".join(f"{k}={v}" for k, v in filters.items()) or "all"
+    if not rows:
+        return f"No players match `{crit}`.\n{footer(snap)}"
+    lines = [f"**Players** `{crit}` — {len(rows)} match{'es' if len(rows) != 1 else ''}"]
+    lines += [_player_line(p) for p in rows[:limit]]
+    if len(rows) > limit:
+        lines.append(f"_…and {len(rows) - limit} more_")
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+# ---------- !query ----------
+
+def _cell(col: str, v) -> str:
+    if isinstance(v, bool):
+        return "✓" if v else ""
+    if isinstance(v, float):
+        if is_money(col):
+            return f"${v:,.0f}"
+        return f"{v:g}"
+    return str(v) if v not in ("", None) else "—"
+
+
+def query_text(snap, res) -> str:
+    cols, rows = res["columns"], res["rows"]
+    what = "groups" if res["grouped"] else "rows"
+    head = f"**Query** `{res['query']}` — {res['total']} {what[:-1] if res['total'] == 1 else what} · {res['ms']:.1f} ms"
+    if not rows:
+        return f"{head}\n{footer(snap)}"
+    cells = [[_cell(c, v) for c, v in zip(cols, r)] for r in rows]
+    widths = [min(24, max(len(c), *(len(r[i]) for r in cells))) for i, c in enumerate(cols)]
+    numeric = [all(isinstance(r[i], (int, float)) and not isinstance(r[i], bool) for r in rows) for i in range(len(cols))]
+
+    def line(vals):
+        return "  ".join(v[:w].rjust(w) if num else v[:w].ljust(w) for v, w, num in zip(vals, widths, numeric)).rstrip()
+
+    lines = [head, "```", line(cols), *(line(r) for r in cells), "```"]
+    if res["total"] > len(rows):
+        lines.append(f"_…and {res['total'] - len(rows)} more (`limit` up to 100)_")
+    lines.append(footer(snap))
+    return "\n".join(lines)
+
+
+# ---------- write-back ----------
+
+_OP_ICONS = {"add": "➕", "drop": "➖"}
+_OP_STATUS = {"done": "✅", "coalesced": "↩️", "conflict": "⚠️", "failed": "❌"}
+
+
+def _op_line(op) -> str:
+    arrow = "→" if op["kind"] == "add" else "←"
+    return f"{_OP_ICONS.get(op['kind'], '•')} #{op['id']} {op['kind'].upper()} {op['player']} {arrow} {op['team']}"
+
+
+def writeback_text(snap, summary: str, pending, recent, limit: int = 10) -> str:
+    lines = ["**Sheet write-back**", summary]
+    if pending:
+        lines.append(f"__Pending__ ({len(pending)})")
+        lines += [_op_line(op) for op in pending[:limit]]
+        if len(pending) > limit:
+            lines.append(f"_…and {len(pending) - limit} more_")
+    if recent:
+        lines.append("__Recent__")
+        for op in recent:
+            note = f" — {op['error']}" if op.get("error") and op["status"] != "done" else ""
+            lines.append(f"{_OP_STATUS.get(op['status'], '•')} {_op_line(op)} ({op['status']} {op['flushed'] or ''}){note}")
+    lines.append(footer(snap))
+    return "\n".join(lines)
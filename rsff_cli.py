@@ -0,0 +1,163 @@
+# rsff_cli.py
+# Offline batch runner for the bot's read commands: load a snapshot from a saved file
+# or from a fake Sheets backend and run cap / capdetail / teamsum / player / whatif /
+# leaders for one team or every team, across a process pool.
+#
+#   python rsff_cli.py --snapshot rsff_snapshot.json --all-teams cap capdetail teamsum
+#   python rsff_cli.py --fake-sheets book.json --team "Team A" "whatif=add kelce drop hill"
+#   python rsff_cli.py --snapshot s.json --all-teams --format json --workers 4 leaders player=mahomes
+#
+# Commands take an argument with name=value (player=<name>, whatif=<add ... drop ...>).
+# leaders and player are league-wide and run once; the rest run once per selected team.
+# Throughput (commands/sec) is printed to stderr so stdout stays clean for JSON.
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import render
+from snapshot_cache import load_snapshot
+from sim.cap import cap_summary, cap_detail
+from sim.team_summary import team_summary
+from sim.player_lookup import player_lookup
+from sim.ops import simulate_whatif
+from sleeper_players import lookup_player
+
+COMMANDS = ("cap", "capdetail", "teamsum", "player", "whatif", "leaders")
+_LEAGUE_WIDE = {"leaders", "player"}
+
+_SNAP = None  # per-process snapshot, set by _init
+
+
+def load_source(snapshot_file: str | None, fake_sheets: str | None, ranges: list[str] | None = None):
+    if snapshot_file:
+        snap = load_snapshot(snapshot_file)
+        if snap is None:
+            raise SystemExit(f"{snapshot_file}: not a readable snapshot")
+        return snap
+    os.environ["RSFF_FAKE_SHEETS"] = fake_sheets
+    from sheets_sync import pull_snapshot
+    from fake_sheets import load_tabs
+    return pull_snapshot("fake", ranges or [f"{t}!A:ZZ" for t in load_tabs(fake_sheets)])
+
+
+def _init(snapshot_file, fake_sheets, ranges):
+    global _SNAP
+    _SNAP = load_source(snapshot_file, fake_sheets, ranges)
+
+
+def run_one(snap, cmd: str, team: str | None, arg: str | None) -> tuple[dict | list | None, str]:
+    """(raw sim result, message text) for one command, mirroring the bot's replies."""
+    if cmd == "leaders":
+        rows = render.leaders_rows(snap)
+        return rows, render.leaders_text(snap, rows)
+    if cmd == "player":
+        res = player_lookup(snap, arg or "")
+        if not res:
+            return None, f"❌ No match for `{arg}`."
+        sleeper = lookup_player(res.get("sleeper_id"))
+        if sleeper:
+            res["pos"] = res.get("pos") or sleeper["position"]
+            res["nfl"] = res.get("nfl") or sleeper["team"]
+        return res, render.player_text(snap, res, sleeper)
+    if cmd == "cap":
+        res = cap_summary(snap, team)
+        return res, render.cap_text(snap, res)
+    if cmd == "capdetail":
+        res = cap_detail(snap, team, top_n=8)
+        return res, render.capdetail_text(snap, res)
+    if cmd == "teamsum":
+        res = team_summary(snap, team)
+        return res, render.teamsum_text(snap, res)
+    if cmd == "whatif":
+        add_q, drop_q = render.parse_whatif(arg or "")
+        if not add_q and not drop_q:
+            return None, "Try: `whatif=add <player>` or `whatif=drop <player>` or `whatif=add <p1> drop <p2>`"
+        res = simulate_whatif(snap, team, add_q, drop_q)
+        if res["status"] == "INVALID":
+            return res, f"❌ {res['reason']}"
+        return res, render.whatif_text(snap, team, add_q, drop_q, res, team_summary(snap, team))
+    raise ValueError(f"unknown command {cmd!r}")
+
+
+def _run_job(job) -> dict:
+    cmd, team, arg = job
+    out = {"command": cmd, "team": team, "arg": arg}
+    try:
+        out["result"], out["text"] = run_one(_SNAP, cmd, team, arg)
+        out["ok"] = True
+    except Exception as e:
+        out["ok"], out["error"] = False, str(e)
+    return out
+
+
+def _parse_command(spec: str) -> tuple[str, str | None]:
+    name, _, arg = spec.partition("=")
+    name = name.strip().lower()
+    if name not in COMMANDS:
+        raise SystemExit(f"unknown command {name!r} (choose from {', '.join(COMMANDS)})")
+    return name, (arg.strip() or None)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run RSFF bot commands offline against a snapshot.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--snapshot", help="saved snapshot JSON (see snapshot_cache.py)")
+    src.add_argument("--fake-sheets", help="fake Sheets backing file (see fake_sheets.py)")
+    ap.add_argument("--ranges", nargs="*", help="ranges to pull from --fake-sheets (default: every tab)")
+    who = ap.add_mutually_exclusive_group()
+    who.add_argument("--team", help="team name for per-team commands")
+    who.add_argument("--all-teams", action="store_true", help="run per-team commands for every Owners2025 team")
+    ap.add_argument("--format", choices=("text", "json"), default="text")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size (1 = in-process)")
+    ap.add_argument("--repeat", type=int, default=1, help="run the whole batch N times (benchmarking)")
+    ap.add_argument("commands", nargs="*", default=["cap"], help="cap, capdetail, teamsum, leaders, player=<name>, whatif=<add .. drop ..>")
+    args = ap.parse_args(argv)
+
+    specs = [_parse_command(c) for c in args.commands]
+    snap = load_source(args.snapshot, args.fake_sheets, args.ranges)
+    teams = render.team_names(snap) if args.all_teams else ([args.team] if args.team else [])
+    if not teams and any(c not in _LEAGUE_WIDE for c, _ in specs):
+        raise SystemExit("per-team commands need --team or --all-teams")
+
+    jobs = []
+    for cmd, arg in specs:
+        if cmd in _LEAGUE_WIDE:
+            jobs.append((cmd, None, arg))
+        else:
+            jobs += [(cmd, t, arg) for t in teams]
+    jobs *= max(1, args.repeat)
+
+    t0 = time.perf_counter()
+    if args.workers <= 1:
+        global _SNAP
+        _SNAP = snap
+        results = [_run_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(args.workers, initializer=_init,
+                                 initargs=(args.snapshot, args.fake_sheets, args.ranges)) as pool:
+            results = list(pool.map(_run_job, jobs, chunksize=max(1, len(jobs) // (args.workers * 4))))
+    elapsed = time.perf_counter() - t0
+
+    if args.format == "json":
+        json.dump({"snapshot": {"hash": snap["hash"], "ts": snap["ts"]}, "results": results},
+                  sys.stdout, indent=1, default=str, ensure_ascii=False)
+        print()
+    else:
+        for r in results:
+            label = " ".join(x for x in (r["command"], r["team"] or "", r["arg"] or "") if x)
+            print(f"=== {label}")
+            print(r["text"] if r["ok"] else f"❌ {r['error']}")
+            print()
+
+    failed = sum(not r["ok"] for r in results)
+    rate = len(results) / elapsed if elapsed > 0 else float("inf")
+    print(f"{len(results)} commands ({failed} failed) in {elapsed:.3f}s — {rate:,.0f} commands/sec "
+          f"with {max(1, args.workers)} worker(s)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# shared_snapshot.py
+# One process owns the sync and publishes each snapshot (plus its prebuilt indexes)
+# as an immutable generation file; worker processes mmap it read-only and switch to
+# a new generation when the pointer file changes.
+#
+# Layout of <dir>/<league>.gen<N>.bin:
+#   header   "RSFFSHM1" | u32 generation | u32 section count
+#   table    per section: u16 name length | name | u64 offset | u64 length
+#   blobs    marshal-encoded sections: "meta", "tab:<Tab>", "idx:<_key>"
+# <dir>/<league>.current holds {"gen", "file", "hash"} and is swapped with os.replace,
+# so readers see either the old or the new generation, never a partial one.
+#
+# The mapped bytes live once in the OS page cache no matter how many workers attach.
+# Sections are decoded lazily, per tab/index, on first access in each worker, so a
+# worker only holds the Python objects for tabs its commands actually touch.
+import os
+import json
+import mmap
+import time
+import struct
+import marshal
+from collections.abc import Mapping
+
+_MAGIC = b"RSFFSHM1"
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<QQ")
+_KEEP_GENERATIONS = 2
+
+
+# ---------- owner side ----------
+
+def _pointer_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.current")
+
+
+def _read_pointer(directory: str, name: str) -> dict | None:
+    try:
+        with open(_pointer_path(directory, name), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def publish(snapshot, directory: str, name: str) -> int:
+    """Write a new generation for `name` and point readers at it. Returns the generation number."""
+    os.makedirs(directory, exist_ok=True)
+    ptr = _read_pointer(directory, name)
+    gen = (ptr["gen"] + 1) if ptr else 1
+
+    sections = [("meta", marshal.dumps({"hash": snapshot["hash"], "ts": snapshot["ts"]}))]
+    for tab, rows in snapshot.get("tabs", {}).items():
+        sections.append((f"tab:{tab}", marshal.dumps(rows)))
+    for key, val in snapshot.items():
+        if key.startswith("_"):
+            try:
+                sections.append((f"idx:{key}", marshal.dumps(val)))
+            except ValueError:
+                pass  # not a plain-data index; workers rebuild it on demand
+
+    table_size = sum(2 + len(n.encode()) + _ENTRY.size for n, _ in sections)
+    offset = _HEADER.size + table_size
+    header = [_HEADER.pack(_MAGIC, gen, len(sections))]
+    for n, blob in sections:
+        nb = n.encode()
+        header.append(struct.pack("<H", len(nb)) + nb + _ENTRY.pack(offset, len(blob)))
+        offset += len(blob)
+
+    fname = f"{name}.gen{gen}.bin"
+    path = os.path.join(directory, fname)
+    with open(path + ".tmp", "wb") as f:
+        f.writelines(header)
+        f.writelines(blob for _, blob in sections)
+    os.replace(path + ".tmp", path)
+
+    tmp = _pointer_path(directory, name) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"gen": gen, "file": fname, "hash": snapshot["hash"]}, f)
+    os.replace(tmp, _pointer_path(directory, name))
+
+    # Old generations can go: workers still mapping them keep their pages until they switch
+    for old in range(max(1, gen - 10), gen - _KEEP_GENERATIONS + 1):
+        try:
+            os.remove(os.path.join(directory, f"{name}.gen{old}.bin"))
+        except FileNotFoundError:
+            pass
+    return gen
+
+
+# ---------- worker side ----------
+
+class _Generation:
+    """One mapped generation file and its section table."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.gen, count = _HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: not a shared snapshot")
+        self.sections = {}
+        pos = _HEADER.size
+        for _ in range(count):
+            (n,) = struct.unpack_from("<H", self.mm, pos)
+            name = bytes(self.mm[pos + 2:pos + 2 + n]).decode()
+            pos += 2 + n
+            self.sections[name] = _ENTRY.unpack_from(self.mm, pos)
+            pos += _ENTRY.size
+
+    def load(self, section: str):
+        off, length = self.sections[section]
+        return marshal.loads(self.mm[off:off + length])
+
+
+class _LazyTabs(Mapping):
+    """Read-only tab mapping that decodes each tab on first access."""
+
+    def __init__(self, gen: _Generation):
+        self._gen = gen
+        self._names = [s[4:] for s in gen.sections if s.startswith("tab:")]
+        self._cache = {}
+
+    def __getitem__(self, tab):
+        if tab not in self._cache:
+            if f"tab:{tab}" not in self._gen.sections:
+                raise KeyError(tab)
+            self._cache[tab] = self._gen.load(f"tab:{tab}")
+        return self._cache[tab]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class SharedSnapshot(dict):
+    """A snapshot dict whose tabs and published indexes are decoded from the mmap on demand."""
+
+    def __init__(self, gen: _Generation):
+        super().__init__(gen.load("meta"))
+        self["tabs"] = _LazyTabs(gen)
+        self["generation"] = gen.gen
+        self._gen = gen
+
+    def _fill(self, key):
+        if isinstance(key, str) and not dict.__contains__(self, key) and f"idx:{key}" in self._gen.sections:
+            dict.__setitem__(self, key, self._gen.load(f"idx:{key}"))
+
+    def __getitem__(self, key):
+        self._fill(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._fill(key)
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        self._fill(key)
+        return dict.__contains__(self, key)
+
+
+class SnapshotReader:
+    """Attach to a published league snapshot and follow generation bumps."""
+
+    def __init__(self, directory: str, name: str, check_interval_s: float = 1.0):
+        self.directory = directory
+        self.name = name
+        self.check_interval_s = check_interval_s
+        self._snap = None
+        self._gen = 0
+        self._checked = 0.0
+
+    def current(self) -> SharedSnapshot | None:
+        """Latest published snapshot; the pointer file is re-read at most once per check interval."""
+        now = time.monotonic()
+        if self._snap is not None and now - self._checked < self.check_interval_s:
+            return self._snap
+        self._checked = now
+        ptr = _read_pointer(self.directory, self.name)
+        if ptr and ptr["gen"] != self._gen:
+            try:
+                gen = _Generation(os.path.join(self.directory, ptr["file"]))
+            except (FileNotFoundError, ValueError):
+                return self._snap  # owner is mid-rotation; keep serving the current generation
+            self._snap, self._gen = SharedSnapshot(gen), gen.gen  # single reference swap
+        return self._snap
@@ -1,59 +1,318 @@
 # sheets_sync.py
 import os
+import re
+import json
+import time
 import hashlib
 import datetime
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Scope we need: read-only access
-_SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-_SERVICE = None  # global singleton client
+import tracing
+
+# Opt-in: approved transactions are written back to the sheet (see writeback.py)
+WRITEBACK = os.getenv("RSFF_WRITEBACK", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Scopes we need: read access (read-write with write-back on), plus Drive file metadata for the change check
+_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets" if WRITEBACK else "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+_CREDS = None            # service-account credentials, loaded once
+_FAKE = None             # shared FakeService when RSFF_FAKE_SHEETS is set
+_LOCAL = threading.local()  # one client (and its keep-alive HTTP connection) per fetch thread
+_POOL = None
+METRICS = {}             # sheet_id -> fetch/skip counters, see fetch_stats()
+
+# Large tabs are fetched as parallel row partitions of this many rows (0 = one batchGet, as before)
+PARTITION_ROWS = int(os.getenv("RSFF_FETCH_PARTITION_ROWS", "500"))
+FETCH_WORKERS = int(os.getenv("RSFF_FETCH_WORKERS", "4"))
+# UNFORMATTED_VALUE returns numbers/booleans as JSON numbers/bools instead of "$5,489,636" / "TRUE"
+VALUE_RENDER = os.getenv("RSFF_VALUE_RENDER", "UNFORMATTED_VALUE")
+# Cheap "did the sheet change?" signal checked before every full fetch:
+#   drive      — the file's Drive version / modifiedTime (default)
+#   cell:<A1>  — a sentinel cell the sheet keeps current, e.g. "Meta!B1" holding a checksum formula
+#   off        — always fetch
+CHANGE_SIGNAL = os.getenv("RSFF_CHANGE_SIGNAL", "drive").strip()
+
+_RANGE = re.compile(r"^(?P<tab>.+?)(?:!(?P<c1>[A-Za-z]+)(?P<r1>\d*)(?::(?P<c2>[A-Za-z]+)\d*)?)?$")
+
+
+def _client(api: str, version: str):
+    """This thread's client for a Google API (httplib2 connections are not thread-safe)."""
+    global _CREDS, _FAKE
+    if os.getenv("RSFF_FAKE_SHEETS"):
+        # Offline runs (batch CLI, benchmarks): serve ranges and file metadata from a local JSON file
+        if _FAKE is None:
+            from fake_sheets import FakeService
+            _FAKE = FakeService(os.environ["RSFF_FAKE_SHEETS"])
+        return _FAKE
+    svc = getattr(_LOCAL, api, None)
+    if svc is None:
+        # Imported here: googleapiclient's discovery machinery is the slowest part of a cold boot
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        if _CREDS is None:
+            # Use service account JSON (either from file or temp file set in app.py shim)
+            _CREDS = service_account.Credentials.from_service_account_file(
+                os.environ["GOOGLE_APPLICATION_CREDENTIALS"],
+                scopes=_SCOPES
+            )
+        svc = build(api, version, credentials=_CREDS, cache_discovery=False)
+        setattr(_LOCAL, api, svc)
+    return svc
 
 
 def _get_service():
-    """Return a cached Google Sheets service client."""
-    global _SERVICE
-    if _SERVICE is None:
-        # Use service account JSON (either from file or temp file set in app.py shim)
-        creds = service_account.Credentials.from_service_account_file(
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"],
-            scopes=_SCOPES
-        )
-        _SERVICE = build("sheets", "v4", credentials=creds, cache_discovery=False)
-    return _SERVICE
+    return _client("sheets", "v4")
 
 
-def pull_snapshot(sheet_id: str, ranges: list[str]):
+def _stats(sheet_id: str) -> dict:
+    return METRICS.setdefault(sheet_id, {
+        "checks": 0, "fetches": 0, "skips": 0, "check_errors": 0,
+        "bytes_fetched": 0, "bytes_saved": 0, "last_bytes": 0,
+    })
+
+
+def fetch_stats(sheet_id: str) -> dict:
+    """Counters for one sheet: full fetches vs. skipped ones and the payload bytes each saved."""
+    return dict(_stats(sheet_id))
+
+
+def change_token(sheet_id: str) -> str | None:
     """
-    Fetch specified ranges from a Google Sheet and return a structured snapshot dict.
-    Example ranges: ["Salary2025!A1:F1000", "Rosters!A1:K1000", "Owners2025!A1:F1000", "Rules!A1:B995"]
+    A string that changes whenever the sheet's contents may have changed, or None when
+    no signal is configured or the check failed (the caller then does a full fetch).
     """
-    service = _get_service()
+    if not CHANGE_SIGNAL or CHANGE_SIGNAL == "off":
+        return None
+    try:
+        if CHANGE_SIGNAL.startswith("cell:"):
+            rng = CHANGE_SIGNAL[5:]
+            resp = _get_service().spreadsheets().values().get(
+                spreadsheetId=sheet_id, range=rng, valueRenderOption="UNFORMATTED_VALUE",
+            ).execute()
+            values = resp.get("values") or [[]]
+            return f"cell:{values[0][0] if values[0] else ''}"
+        meta = _client("drive", "v3").files().get(
+            fileId=sheet_id, fields="version,modifiedTime", supportsAllDrives=True,
+        ).execute()
+        return f"drive:{meta.get('version')}@{meta.get('modifiedTime')}"
+    except Exception:
+        _stats(sheet_id)["check_errors"] += 1
+        return None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # long-lived workers keep their clients, so partitions reuse warm connections
+        _POOL = ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS), thread_name_prefix="sheets-fetch")
+    return _POOL
+
+
+def _col_letters(n: int) -> str:
+    s = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        s = chr(65 + rem) + s
+    return s or "A"
+
+
+def _parse_range(rng: str) -> tuple[str, str | None, str | None, int]:
+    """
+    'Rosters!A2:K1000' -> ('Rosters', 'A', 'K', 2). The start row (the header row) is
+    kept; the end row is ignored, since tabs are read to their current last row.
+    """
+    m = _RANGE.match(rng.strip())
+    tab = m.group("tab").strip("'")
+    return tab, m.group("c1"), m.group("c2") or m.group("c1"), int(m.group("r1") or 1)
+
+
+def _grid_sizes(service, sheet_id: str) -> dict[str, tuple[int, int]]:
+    """tab -> (rowCount, columnCount) from spreadsheet metadata (one small request)."""
+    meta = service.spreadsheets().get(
+        spreadsheetId=sheet_id,
+        fields="sheets.properties(title,gridProperties(rowCount,columnCount))",
+    ).execute()
+    out = {}
+    for sh in meta.get("sheets", []):
+        p = sh.get("properties", {})
+        g = p.get("gridProperties", {})
+        out[p.get("title")] = (int(g.get("rowCount", 0)), int(g.get("columnCount", 0)))
+    return out
+
+
+def _fetch(sheet_id: str, rng: str) -> tuple[list[list], int]:
+    """One partition's values and their approximate payload size (runs on a pool thread)."""
+    with tracing.span("sync.fetch.partition", range=rng) as sp:
+        resp = _get_service().spreadsheets().values().batchGet(
+            spreadsheetId=sheet_id,
+            ranges=[rng],
+            majorDimension="ROWS",
+            valueRenderOption=VALUE_RENDER,
+            dateTimeRenderOption="FORMATTED_STRING",
+            fields="valueRanges(range,values)",
+        ).execute()
+        vrs = resp.get("valueRanges", [])
+        values = vrs[0].get("values", []) if vrs else []
+        n = len(json.dumps(values, separators=(",", ":"), default=str))
+        sp.set(rows=len(values), bytes=n)
+    return values, n
+
+
+def read_ranges(sheet_id: str, ranges: list[str]) -> list[list[list]]:
+    """Values for a few A1 ranges in one request (write-back's pre-write check)."""
+    resp = _get_service().spreadsheets().values().batchGet(
+        spreadsheetId=sheet_id,
+        ranges=ranges,
+        majorDimension="ROWS",
+        valueRenderOption=VALUE_RENDER,
+        fields="valueRanges(range,values)",
+    ).execute()
+    return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+
+
+def write_ranges(sheet_id: str, data: list[dict]) -> list[list[list]]:
+    """
+    Write [{"range": A1, "values": [[...]]}, ...] in a single values.batchUpdate call.
+    Returns each range's cells as a fetch would now read them (typed per VALUE_RENDER),
+    so callers can patch a snapshot exactly as the next pull will see it.
+    """
+    resp = _get_service().spreadsheets().values().batchUpdate(
+        spreadsheetId=sheet_id,
+        body={
+            "valueInputOption": "USER_ENTERED",
+            "data": data,
+            "includeValuesInResponse": True,
+            "responseValueRenderOption": VALUE_RENDER,
+            "responseDateTimeRenderOption": "FORMATTED_STRING",
+        },
+    ).execute()
+    return [r.get("updatedData", {}).get("values", []) for r in resp.get("responses", [])]
+
+
+def _tab_rows(parts, acct: dict):
+    """
+    Yield a tab's rows in sheet order from its ordered (partition size, future) list,
+    parsing each partition as soon as it (and those before it) have arrived. The API
+    drops trailing blank rows per request, so blank rows between partitions are put
+    back only when data follows them; a tab's own trailing blanks stay dropped.
+    Payload sizes and time spent waiting on the network are added to `acct`.
+    """
+    blanks = 0
+    for size, fut in parts:
+        t = time.perf_counter()
+        values, n = fut.result()
+        acct["wait_s"] += time.perf_counter() - t
+        acct["bytes"] += n
+        if values:
+            for _ in range(blanks):
+                yield []
+            blanks = 0
+            yield from values
+        blanks += size - len(values)
+
+
+def _to_dicts(rows):
+    """Header row + value rows -> list of dicts, built as rows stream in."""
+    it = iter(rows)
+    header = next(it, None)
+    if not header:
+        return None
+    header = [str(h) for h in header]
+    n = len(header)
+    return [{header[i]: (r[i] if i < len(r) else "") for i in range(n)} for r in it]
+
+
+def _pull_single(service, sheet_id: str, ranges: list[str], acct: dict) -> dict:
+    """Original path: one batchGet for all ranges as given."""
     result = service.spreadsheets().values().batchGet(
         spreadsheetId=sheet_id,
         ranges=ranges,
-        majorDimension="ROWS"
+        majorDimension="ROWS",
+        valueRenderOption=VALUE_RENDER,
+        dateTimeRenderOption="FORMATTED_STRING",
+        fields="valueRanges(range,values)",
     ).execute()
 
     tabs = {}
     for resp in result.get("valueRanges", []):
         rng = resp.get("range", "")
         values = resp.get("values", [])
+        acct["bytes"] += len(json.dumps(values, separators=(",", ":"), default=str))
         if not values:
             continue
 
         # Extract sheet name before "!"
         tab_name = rng.split("!")[0]
-        header, *rows = values
-        # Normalize into list of dicts
-        dicts = []
-        for r in rows:
-            d = {header[i]: (r[i] if i < len(r) else "") for i in range(len(header))}
-            dicts.append(d)
-        tabs[tab_name] = dicts
+        tabs[tab_name] = _to_dicts(values)
+    return tabs
+
+
+def pull_snapshot(sheet_id: str, ranges: list[str], since: str | None = None):
+    """
+    Fetch specified ranges from a Google Sheet and return a structured snapshot dict.
+    Example ranges: ["Salary2025!A:F", "Rosters!A:K", "Owners2025!A:F", "Rules!A:B"]
+    A range's start row is its header row; its end row is ignored: each tab is read
+    to its current last row, split into PARTITION_ROWS-row requests that run in parallel.
+
+    `since` is the "rev" of the snapshot the caller holds: when the sheet's change
+    token still matches it, nothing is fetched and None is returned.
+    """
+    st = _stats(sheet_id)
+    st["checks"] += 1
+    with tracing.span("sync.check", signal=CHANGE_SIGNAL) as sp:
+        token = change_token(sheet_id)  # read before the data, so edits made mid-fetch show up next time
+        unchanged = since is not None and token is not None and token == since
+        sp.set(unchanged=unchanged)
+    if unchanged:
+        st["skips"] += 1
+        st["bytes_saved"] += st["last_bytes"]
+        return None
+
+    service = _get_service()
+    acct = {"bytes": 0, "wait_s": 0.0}
+    if PARTITION_ROWS <= 0:
+        with tracing.span("sync.fetch", ranges=len(ranges)):
+            tabs = _pull_single(service, sheet_id, ranges, acct)
+    else:
+        with tracing.span("sync.metadata"):
+            sizes = _grid_sizes(service, sheet_id)
+        pool = _pool()
+        plan = []  # (tab, [(rows in partition, future), ...]) in range order
+        for rng in ranges:
+            tab, c1, c2, top = _parse_range(rng)
+            if tab not in sizes:
+                raise ValueError(f"Unable to parse range: {rng} (no such tab)")
+            nrows, ncols = sizes[tab]
+            c1, c2 = c1 or "A", c2 or _col_letters(ncols)
+            qtab = "'" + tab.replace("'", "''") + "'"
+            parts = []
+            # a grid that ends above the range's start row has nothing to fetch: no partitions
+            for start in range(top, nrows + 1, PARTITION_ROWS):
+                end = min(nrows, start + PARTITION_ROWS - 1)
+                parts.append((end - start + 1, pool.submit(tracing.bind(_fetch), sheet_id, f"{qtab}!{c1}{start}:{c2}{end}")))
+            plan.append((tab, parts))
+
+        tabs = {}
+        for tab, parts in plan:
+            # parse time = ms - wait_ms (rows are parsed while later partitions are in flight)
+            with tracing.span("sync.parse", tab=tab, partitions=len(parts)) as sp:
+                waited = acct["wait_s"]
+                dicts = _to_dicts(_tab_rows(parts, acct))
+                sp.set(rows=len(dicts or []), wait_ms=round((acct["wait_s"] - waited) * 1000, 3))
+            if dicts is not None:
+                tabs[tab] = dicts
+
+    st["fetches"] += 1
+    st["last_bytes"] = acct["bytes"]
+    st["bytes_fetched"] += st["last_bytes"]
 
     # Snapshot metadata
-    h = hashlib.md5(str(tabs).encode()).hexdigest()[:8]
+    with tracing.span("sync.hash"):
+        h = hashlib.md5(str(tabs).encode()).hexdigest()[:8]
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    return {"hash": h, "ts": ts, "tabs": tabs}
\ No newline at end of file
+    return {"hash": h, "ts": ts, "tabs": tabs, "rev": token}
@@ -0,0 +1,142 @@
+# sim/attr_index.py
+# Inverted attribute indexes over the joined player table. Every identity key is one
+# bit; each (attribute, value) maps to a Python int whose set bits are the players
+# having it, so "rostered RBs on bye in week 9" is two ANDs over ints instead of a
+# scan over normalized rows. Built once per snapshot and cached on it.
+
+from __future__ import annotations
+from typing import Dict, Any, List, Tuple
+
+from sim.identity import player_table, _low
+
+# attribute -> what a filter value is matched against (all stored lower-case)
+ATTRS = ("pos", "nfl", "bye", "team", "status")
+# `status=` values: FA / rostered, plus the roster flags
+STATUSES = ("fa", "rostered", "ir", "dp")
+
+# ---------- build ----------
+
+def _bit_add(idx: Dict[str, int], value: str, bit: int):
+    if value:
+        idx[value] = idx.get(value, 0) | bit
+
+def _entries(p: Dict[str, Any]):
+    """(attribute, value) pairs a player's bit is set under."""
+    yield "pos", _low(p["roster_pos"] or p["pos"])
+    yield "nfl", _low(p["nfl"])
+    yield "bye", _low(p["bye"]).split(".")[0]  # unformatted sheets give 9 / 9.0
+    if p["on_roster"]:
+        yield "team", _low(p["team"])
+        yield "status", "rostered"
+        if p["on_ir"]:
+            yield "status", "ir"
+        if p["dp"]:
+            yield "status", "dp"
+    else:
+        yield "status", "fa"
+
+def build_attr_index(table: Dict[str, Any]) -> Dict[str, Any]:
+    """{"all": mask, "<attr>": {value: mask}} over table["players"] (bit i = identity key i)."""
+    out: Dict[str, Any] = {a: {} for a in ATTRS}
+    every = 0
+    for p in table["players"]:
+        bit = 1 << p["key"]
+        every |= bit
+        for attr, value in _entries(p):
+            _bit_add(out[attr], value, bit)
+    out["all"] = every
+    return out
+
+def patch_attr_index(idx: Dict[str, Any], before: List[dict], after: List[dict], keys) -> Dict[str, Any]:
+    """A new index with `keys` moved from their `before` to their `after` attributes (idx is untouched)."""
+    out: Dict[str, Any] = {a: dict(idx[a]) for a in ATTRS}
+    every = idx["all"]
+    for k in keys:
+        bit = 1 << k
+        if k < len(before):
+            for attr, value in _entries(before[k]):
+                m = out[attr].get(value, 0) & ~bit
+                if m:
+                    out[attr][value] = m
+                else:
+                    out[attr].pop(value, None)
+        for attr, value in _entries(after[k]):
+            _bit_add(out[attr], value, bit)
+        every |= bit
+    out["all"] = every
+    return out
+
+def attr_index(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """This snapshot's attribute index, built once and stored on it."""
+    idx = snapshot.get("_attrs")
+    if idx is None:
+        idx = build_attr_index(player_table(snapshot))
+        snapshot["_attrs"] = idx
+    return idx
+
+# ---------- query ----------
+
+def parse_filters(args: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    'pos=RB nfl=KC status=FA' -> ({"pos": "rb", ...}, [unrecognized tokens]).
+    A bare word continues the previous value, so `team=big dawgs` works unquoted.
+    """
+    filters, bad = {}, []
+    aliases = {"position": "pos", "nfl_team": "nfl", "week": "bye", "owner": "team"}
+    last = None
+    for tok in (args or "").split():
+        k, sep, v = tok.partition("=")
+        if not sep and last:
+            filters[last] += " " + _low(tok)
+            continue
+        k = aliases.get(_low(k), _low(k))
+        if not sep or k not in ATTRS or not v:
+            bad.append(tok)
+            last = None
+            continue
+        filters[k] = _low(v).replace("_", " ")
+        last = k
+    return filters, bad
+
+def select_mask(idx: Dict[str, Any], filters: Dict[str, str]) -> int:
+    """AND of each filter's bitset. A value may list alternatives ("rb,wr"), OR-ed together."""
+    mask = idx["all"]
+    for attr, value in filters.items():
+        m = 0
+        for v in value.split(","):
+            v = v.strip()
+            if attr == "team" and v not in idx["team"]:
+                # partial team names, like `!cap` accepts
+                for t, tm in idx["team"].items():
+                    if v in t:
+                        m |= tm
+            else:
+                m |= idx[attr].get(v, 0)
+        mask &= m
+        if not mask:
+            break
+    return mask
+
+def iter_keys(mask: int):
+    """Set bit positions of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def select(snapshot: Dict[str, Any], filters: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Matching player identities, highest salary first."""
+    players = player_table(snapshot)["players"]
+    rows = [players[k] for k in iter_keys(select_mask(attr_index(snapshot), filters))]
+    rows.sort(key=lambda p: (-(p["roster_aav"] or p["aav"] or 0.0), p["name"]))
+    return rows
+
+def byes(snapshot: Dict[str, Any], week: int | str, pos: str = "") -> Dict[str, List[Dict[str, Any]]]:
+    """Rostered players on bye in `week` (optionally one position), by team."""
+    filters = {"bye": str(week).strip(), "status": "rostered"}
+    if pos:
+        filters["pos"] = _low(pos)
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for p in select(snapshot, filters):
+        out.setdefault(p["team"], []).append(p)
+    return dict(sorted(out.items(), key=lambda kv: kv[0].lower()))
@@ -0,0 +1,116 @@
+# sim/audit.py
+# League-wide legality audit: every team checked against the compiled Rules in one
+# pass over the Rosters table. Runs once per snapshot (after each sync) and is
+# cached on it, so `!audit` and the post-sync feed only read the stored result.
+
+from __future__ import annotations
+from typing import Dict, Any, List
+
+from sim.identity import player_table, counts_on_roster, _is_true, _norm, _num
+from sim.cap import _rules_dict, _salary_for
+
+# Violation codes, in the order `!audit` lists them
+CODES = ("CAP_NEGATIVE", "ROSTER_MAX", "MULTIPLE_DP", "DP_ON_IR")
+
+# ---------- rules ----------
+
+def compile_rules(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """The Rules tab reduced to the numbers the audit needs (same defaults as sim.cap / sim.ops)."""
+    rules = _rules_dict((snapshot.get("tabs", {}) or {}).get("Rules", []) or [])
+    return {
+        "cap_limit": float(_num(rules.get("cap_limit"))),
+        "roster_max": int(_num(rules.get("roster_max", 14))),
+        "dp_enabled": bool(rules.get("dp_enabled", True)),
+        "dp_relief_pct": float(rules.get("dp_relief_pct", 1.0)),
+        "dp_auto_highest": bool(rules.get("dp_auto_highest_if_unset", True)),
+    }
+
+# ---------- audit ----------
+
+def _violation(code: str, team: str, detail: str, players: List[str] | None = None) -> Dict[str, Any]:
+    return {"code": code, "team": team, "detail": detail, "players": sorted(players or [])}
+
+def audit_league(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    {"rules": compiled rules, "teams": n, "violations": [...]} for the whole league.
+    Cap math mirrors cap_summary (IR excluded, DP relief on the flagged — else the
+    highest — active salary); roster size counts every on-roster row, as `!add` does.
+    """
+    rules = compile_rules(snapshot)
+    table = player_table(snapshot)
+    players, roster_keys = table["players"], table["roster_keys"]
+
+    teams: Dict[str, Dict[str, Any]] = {}
+    for i, nr in enumerate(table["roster_norm"]):
+        team = _norm(nr.get("team"))
+        if not team:
+            continue
+        t = teams.setdefault(team.lower(), {
+            "team": team, "roster": 0, "used": 0.0, "active": [], "dp": [], "dp_ir": [],
+        })
+        name = _norm(nr.get("player name") or nr.get("player") or nr.get("name")) or "Unknown"
+        on_ir = _is_true(nr.get("on ir?") or nr.get("ir"))
+        is_dp = _is_true(nr.get("dp?") or nr.get("dp"))
+
+        if _is_true(nr.get("on roster flag", "FALSE")):
+            t["roster"] += 1
+            if is_dp:
+                t["dp"].append(name)
+                if on_ir:
+                    t["dp_ir"].append(name)
+
+        # cap_summary treats a blank roster flag as on-roster
+        if not counts_on_roster(nr.get("on roster flag")) or on_ir:
+            continue
+        salary = _salary_for(players, roster_keys[i])
+        if salary is None:
+            salary = _num(nr.get("aav"))
+        t["used"] += salary or 0.0
+        if salary and salary > 0:
+            t["active"].append((salary, is_dp))
+
+    out: List[Dict[str, Any]] = []
+    for t in teams.values():
+        team = t["team"]
+        if rules["cap_limit"] > 0:
+            used = t["used"]
+            if rules["dp_enabled"] and t["active"]:
+                flagged = [s for s, dp in t["active"] if dp]
+                if flagged:
+                    used -= max(flagged) * rules["dp_relief_pct"]
+                elif rules["dp_auto_highest"]:
+                    used -= max(s for s, _ in t["active"]) * rules["dp_relief_pct"]
+            remaining = rules["cap_limit"] - used
+            if remaining < 0:
+                out.append(_violation("CAP_NEGATIVE", team, f"Cap remaining `${remaining:,.0f}` (used `${used:,.0f}` / `${rules['cap_limit']:,.0f}`)"))
+        if t["roster"] > rules["roster_max"]:
+            out.append(_violation("ROSTER_MAX", team, f"Roster {t['roster']}/{rules['roster_max']}"))
+        if len(t["dp"]) > 1:
+            out.append(_violation("MULTIPLE_DP", team, f"{len(t['dp'])} players flagged DP: {', '.join(t['dp'])}", t["dp"]))
+        for name in t["dp_ir"]:
+            out.append(_violation("DP_ON_IR", team, f"{name} is flagged DP while on IR", [name]))
+
+    order = {c: i for i, c in enumerate(CODES)}
+    out.sort(key=lambda v: (order[v["code"]], v["team"].lower(), v["players"]))
+    return {"rules": rules, "teams": len(teams), "violations": out}
+
+def audit(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """This snapshot's audit, computed once and stored on it."""
+    res = snapshot.get("_audit")
+    if res is None:
+        res = audit_league(snapshot)
+        snapshot["_audit"] = res
+    return res
+
+# ---------- change tracking ----------
+
+def _vkey(v: Dict[str, Any]) -> tuple:
+    # amounts drift sync to sync; a violation is "the same" while code/team/players match
+    return (v["code"], v["team"].lower(), tuple(v["players"]))
+
+def new_violations(old: Dict[str, Any] | None, new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Violations in `new` that were not present in `old` (none when there is no baseline)."""
+    if not old:
+        return []
+    seen = {_vkey(v) for v in audit(old)["violations"]}
+    return [v for v in audit(new)["violations"] if _vkey(v) not in seen]
@@ -1,5 +1,7 @@
 # sim/cap.py  (NO imports from .cap at the top)
 
+from sim.identity import player_table, team_rows, counts_on_roster
+
 def _num(x):
     s = str(x or "").replace("$", "").replace(",", "").strip()
     try:
@@ -35,9 +37,15 @@ def _rules_dict(rules_rows):
                 d[k] = vs
     return d
 
+def _salary_for(players, key):
+    """Salary2025 cap hit for a joined roster row; None means fall back to the row's AAV."""
+    if key is None:
+        return None
+    p = players[key]
+    return (p["cap_hit"] or None) if p["has_salary"] else None
+
 def cap_summary(snapshot, team_query: str):
     tabs      = snapshot["tabs"]
-    salaries  = tabs.get("Salary2025", [])
     rosters   = tabs.get("Rosters", [])
     owners    = tabs.get("Owners2025", [])
     rules     = _rules_dict(tabs.get("Rules", []))
@@ -77,33 +85,28 @@ def cap_summary(snapshot, team_query: str):
     dp_relief_pct        = float(rules.get("dp_relief_pct", 1.0))
     dp_auto_highest      = bool(rules.get("dp_auto_highest_if_unset", True))
 
-    # --- salary index ---
-    sal_by_pid, sal_by_name = {}, {}
-    for s in salaries:
-        pid = _get(s, "sleeper_player_id", "yahoo_player_id")
-        nm  = _get(s, "player_name")
-        sal = _num(_get(s, "cap_hit_2025", "aav"))
-        if pid: sal_by_pid[pid] = sal
-        if nm:  sal_by_name[nm.lower()] = sal
+    # --- salary join via the identity table ---
+    table = player_table(snapshot)
+    players, roster_keys = table["players"], table["roster_keys"]
 
     used = 0.0
     counted = 0
     dp_candidates = []   # (salary, player_name)
     all_active    = []   # (salary, player_name)
 
-    for r in rosters:
+    for i in team_rows(table, team_label):
+        r = rosters[i]
         r_team = _get(r, "Team", "team")
         if r_team != team_label:
             continue
 
-        on_roster = (_get(r, "On Roster Flag", "on_roster_flag") or "TRUE").upper() == "TRUE"
+        on_roster = counts_on_roster(_get(r, "On Roster Flag", "on_roster_flag"))
         on_ir     = (_get(r, "On IR?", "on_ir?", "on_ir") or "FALSE").upper() == "TRUE"
         if not on_roster or on_ir:
             continue
 
-        pid    = _get(r, "Player ID", "player_id")
         pname  = _get(r, " Player Name", "player_name") or "Unknown"
-        salary = sal_by_pid.get(pid) or sal_by_name.get(pname.lower())
+        salary = _salary_for(players, roster_keys[i])
         if salary is None:
             salary = _num(_get(r, "AAV"))
 
@@ -147,7 +150,6 @@ def cap_detail(snapshot, team_query: str, top_n: int = 8):
     """Return the players counted toward cap (after IR filter), sorted by salary desc,
        plus which player received DP relief."""
     tabs      = snapshot["tabs"]
-    salaries  = tabs.get("Salary2025", [])
     rosters   = tabs.get("Rosters", [])
     rules     = _rules_dict(tabs.get("Rules", []))
 
@@ -155,28 +157,22 @@ def cap_detail(snapshot, team_query: str, top_n: int = 8):
     base = cap_summary(snapshot, team_query)
     team_label = base["team_name"]
 
-    # salary index
-    sal_by_pid, sal_by_name = {}, {}
-    for s in salaries:
-        pid = _get(s, "sleeper_player_id", "yahoo_player_id")
-        nm  = _get(s, "player_name")
-        sal = _num(_get(s, "cap_hit_2025", "aav"))
-        if pid: sal_by_pid[pid] = sal
-        if nm:  sal_by_name[nm.lower()] = sal
+    table = player_table(snapshot)
+    players, roster_keys = table["players"], table["roster_keys"]
 
     # collect counted rows
     counted = []
-    for r in rosters:
+    for i in team_rows(table, team_label):
+        r = rosters[i]
         if _get(r, "Team", "team") != team_label:
             continue
-        on_roster = (_get(r, "On Roster Flag", "on_roster_flag") or "TRUE").upper() == "TRUE"
+        on_roster = counts_on_roster(_get(r, "On Roster Flag", "on_roster_flag"))
         on_ir     = (_get(r, "On IR?", "on_ir?", "on_ir") or "FALSE").upper() == "TRUE"
         if not on_roster or on_ir:
             continue
-        pid    = _get(r, "Player ID", "player_id")
         pname  = _get(r, " Player Name", "player_name") or "Unknown"
         pos    = _get(r, " Pos", "pos")
-        sal    = sal_by_pid.get(pid) or sal_by_name.get(pname.lower())
+        sal    = _salary_for(players, roster_keys[i])
         if sal is None:
             sal = _num(_get(r, "AAV"))
         is_dp  = (_get(r, "DP?", "dp?") or "FALSE").upper() == "TRUE"
@@ -0,0 +1,63 @@
+# sim/diff.py
+# Row-level diff between two snapshots' Rosters, keyed on player identity.
+
+from __future__ import annotations
+from typing import Dict, Any, List
+
+from sim.identity import player_table
+
+# Change kinds, in the order the feed shows them
+KINDS = ("DROP", "ADD", "IR_ON", "IR_OFF", "DP_ON", "DP_OFF", "SALARY")
+
+def _roster_state(snapshot: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """identity -> current roster state. Identity is the Player ID, else normalized name + team."""
+    out = {}
+    for p in player_table(snapshot)["players"]:
+        if not p["on_roster"]:
+            continue
+        key = p["roster_id"] or f"{p['norm']}|{p['team'].lower()}"
+        out[key] = p
+    return out
+
+def _salary(p: Dict[str, Any]) -> float:
+    return float(p["roster_aav"] or p["aav"] or 0.0)
+
+def _change(kind: str, p: Dict[str, Any], **extra) -> Dict[str, Any]:
+    return {"kind": kind, "player": p["name"], "team": p["team"], "salary": _salary(p), **extra}
+
+def diff_snapshots(old: Dict[str, Any] | None, new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Classify roster changes between consecutive snapshots in one pass over each.
+    A player keyed by ID who changed teams shows up as DROP (old team) + ADD (new team).
+    """
+    if not old:
+        return []
+    before, after = _roster_state(old), _roster_state(new)
+    changes: List[Dict[str, Any]] = []
+
+    for key, b in before.items():
+        a = after.get(key)
+        if a is None or a["team"].lower() != b["team"].lower():
+            changes.append(_change("DROP", b))
+    for key, a in after.items():
+        b = before.get(key)
+        if b is None or a["team"].lower() != b["team"].lower():
+            changes.append(_change("ADD", a))
+            continue
+        if a["on_ir"] != b["on_ir"]:
+            changes.append(_change("IR_ON" if a["on_ir"] else "IR_OFF", a))
+        if a["dp"] != b["dp"]:
+            changes.append(_change("DP_ON" if a["dp"] else "DP_OFF", a))
+        if abs(_salary(a) - _salary(b)) > 0.5:
+            changes.append(_change("SALARY", a, salary_before=_salary(b)))
+
+    order = {k: i for i, k in enumerate(KINDS)}
+    changes.sort(key=lambda c: (order[c["kind"]], c["team"].lower(), c["player"]))
+    return changes
+
+def summarize(changes: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Count of changes per kind, only kinds that occurred."""
+    out: Dict[str, int] = {}
+    for c in changes:
+        out[c["kind"]] = out.get(c["kind"], 0) + 1
+    return out
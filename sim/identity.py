@@ -0,0 +1,267 @@
+# sim/identity.py
+# Per-snapshot player identity table: one integer key per real player, joined
+# across Rosters and Salary2025 by Sleeper ID, then Yahoo ID, then normalized name.
+
+from __future__ import annotations
+from typing import Dict, Any, List
+import re
+
+# ---------- helpers ----------
+
+def _norm_key(k: Any) -> str:
+    return re.sub(r"\s+", " ", str(k or "").strip()).lower()
+
+def _norm(s: Any) -> str:
+    return (str(s or "")).strip()
+
+def _low(s: Any) -> str:
+    return _norm(s).lower()
+
+def _num(x) -> float:
+    if x is None: return 0.0
+    if isinstance(x, (int, float)): return float(x)
+    s = str(x).strip()
+    if not s: return 0.0
+    if s.startswith("$"): s = s[1:]
+    s = s.replace(",", "")
+    try:
+        return float(s)
+    except Exception:
+        s = re.sub(r"[^0-9.\-]", "", s)
+        return float(s) if s else 0.0
+
+def _is_true(v) -> bool:
+    if isinstance(v, bool): return v
+    return _norm(v).upper() in {"TRUE", "T", "YES", "Y", "1"}
+
+def counts_on_roster(v) -> bool:
+    """On Roster Flag as cap math reads it: blank (None / "") counts as on roster; anything
+    else — a bool from unformatted reads, or text — goes through _is_true, so False is off."""
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return True
+    return _is_true(v)
+
+def _norm_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {_norm_key(k): v for k, v in (row or {}).items()}
+
+def _norm_id(v: Any) -> str:
+    """IDs arrive as '4046', 4046 or 4046.0 depending on how the sheet was read."""
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return _norm(v)
+
+def norm_name(s: Any) -> str:
+    """Join key for names: lowercase, punctuation dropped, spaces collapsed ("D'Andre  Swift" -> "dandre swift")."""
+    s = re.sub(r"[^\w\s]", "", _low(s))
+    return re.sub(r"\s+", " ", s).strip()
+
+def _first(nr: Dict[str, Any], *keys) -> Any:
+    for k in keys:
+        v = nr.get(k)
+        if v is not None and _norm(v) != "":
+            return v
+    return None
+
+def _row_name(nr: Dict[str, Any]) -> str:
+    v = _first(nr, "player name", "player_name", "player", "name")
+    if v is not None:
+        return _norm(v)
+    # fallback: first non-empty string field
+    for v in nr.values():
+        if isinstance(v, str) and _norm(v): return _norm(v)
+    return ""
+
+# ---------- table ----------
+
+def _new_player(players: List[dict], name: str) -> int:
+    key = len(players)
+    players.append({
+        "key": key,
+        "name": name,
+        "norm": norm_name(name),
+        "sleeper_id": "",
+        "yahoo_id": "",
+        # Salary2025 side
+        "has_salary": False,
+        "pos": "",
+        "nfl": "",
+        "bye": "",
+        "aav": 0.0,        # Salary2025 aav/salary
+        "cap_hit": 0.0,    # Salary2025 cap_hit_2025, else aav
+        # Rosters side (current row = last row with On Roster Flag TRUE)
+        "row": None,
+        "team": "",
+        "on_roster": False,
+        "on_ir": False,
+        "dp": False,
+        "roster_pos": "",
+        "roster_aav": 0.0,
+        "roster_id": "",
+    })
+    return key
+
+def _index_name(by_name: Dict[str, List[int]], norm: str, key: int):
+    if not norm:
+        return
+    keys = by_name.setdefault(norm, [])
+    if key not in keys:
+        keys.append(key)
+
+# Rosters-side fields of a player who has no current (On Roster Flag TRUE) row
+OFF_ROSTER = {"row": None, "team": "", "on_roster": False, "on_ir": False, "dp": False,
+              "roster_pos": "", "roster_aav": 0.0}
+
+def roster_state(nr: Dict[str, Any], i: int) -> Dict[str, Any]:
+    """Rosters-side player fields from normalized roster row `i` (an On Roster Flag TRUE row)."""
+    return {
+        "row": i,
+        "team": _norm(nr.get("team")),
+        "on_roster": True,
+        "on_ir": _is_true(nr.get("on ir?") or nr.get("ir")),
+        "dp": _is_true(nr.get("dp?") or nr.get("dp")),
+        "roster_pos": _norm(nr.get("pos") or nr.get("position")),
+        "roster_aav": _num(nr.get("aav") or nr.get("salary")),
+    }
+
+def _ids_compatible(p: dict, pid: str) -> bool:
+    """A name match is only trusted when the candidate carries no conflicting ID."""
+    if not pid:
+        return True
+    own = {p["sleeper_id"], p["yahoo_id"], p["roster_id"]} - {""}
+    return not own or pid in own
+
+def build_player_table(tabs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the identity table for one snapshot's tabs.
+    Salary2025 rows seed identities (ID first, then name); Rosters rows then join
+    onto them by Player ID (Sleeper, then Yahoo), falling back to a name match only
+    when exactly one candidate has no conflicting ID. Names shared by several
+    identities stay visible in `by_name` as collision lists instead of overwriting.
+    """
+    rosters = tabs.get("Rosters", []) or []
+    salary  = tabs.get("Salary2025", []) or tabs.get("Salary", []) or []
+
+    players: List[dict] = []
+    by_sleeper: Dict[str, int] = {}
+    by_yahoo: Dict[str, int] = {}
+    by_name: Dict[str, List[int]] = {}
+
+    # --- Salary2025 seeds identities ---
+    salary_keys: List[int | None] = []
+    for s in salary:
+        ns = _norm_row(s)
+        nm = _row_name(ns)
+        sid = _norm_id(_first(ns, "sleeper_player_id", "sleeper id", "sleeper_id"))
+        yid = _norm_id(_first(ns, "yahoo_player_id", "yahoo id", "yahoo_id"))
+        if not sid and not yid:
+            sid = _norm_id(_first(ns, "player id", "player_id", "id"))
+        if not nm and not sid and not yid:
+            salary_keys.append(None)
+            continue
+
+        key = by_sleeper.get(sid) if sid else None
+        if key is None and yid:
+            key = by_yahoo.get(yid)
+        if key is None:
+            key = _new_player(players, nm)
+
+        p = players[key]
+        if sid:
+            p["sleeper_id"] = sid
+            by_sleeper[sid] = key
+        if yid:
+            p["yahoo_id"] = yid
+            by_yahoo[yid] = key
+        aav = _num(_first(ns, "aav", "salary"))
+        p.update({
+            "has_salary": True,
+            "pos": _norm(ns.get("pos") or ns.get("position")),
+            "nfl": _norm(ns.get("nfl") or ns.get("team")),
+            "bye": _norm(ns.get("bye") or ns.get("bye week")),
+            "aav": aav,
+            "cap_hit": _num(_first(ns, "cap_hit_2025", "aav")),
+        })
+        _index_name(by_name, p["norm"], key)
+        salary_keys.append(key)
+
+    # --- Rosters join onto identities ---
+    roster_keys: List[int | None] = []
+    roster_norm: List[Dict[str, Any]] = []
+    by_team: Dict[str, List[int]] = {}
+    for i, r in enumerate(rosters):
+        nr = _norm_row(r)
+        roster_norm.append(nr)
+        team = _norm(nr.get("team"))
+        by_team.setdefault(team.lower(), []).append(i)
+
+        nm = _row_name(nr)
+        pid = _norm_id(_first(nr, "player id", "player_id", "id"))
+        if not nm and not pid:
+            roster_keys.append(None)
+            continue
+
+        key = None
+        if pid:
+            key = by_sleeper.get(pid)
+            if key is None:
+                key = by_yahoo.get(pid)
+        if key is None:
+            cands = [k for k in by_name.get(norm_name(nm), []) if _ids_compatible(players[k], pid)]
+            if len(cands) == 1:
+                key = cands[0]
+        if key is None:
+            key = _new_player(players, nm)
+
+        p = players[key]
+        if pid:
+            p["roster_id"] = p["roster_id"] or pid
+            # Rosters "Player ID" is the Sleeper ID unless it already matched a Yahoo one
+            if not p["sleeper_id"] and by_yahoo.get(pid) != key:
+                p["sleeper_id"] = pid
+                by_sleeper[pid] = key
+        _index_name(by_name, p["norm"], key)
+
+        if _is_true(nr.get("on roster flag", "FALSE")):
+            p.update(roster_state(nr, i))
+        roster_keys.append(key)
+
+    return {
+        "players": players,
+        "by_sleeper": by_sleeper,
+        "by_yahoo": by_yahoo,
+        "by_name": by_name,
+        "by_team": by_team,
+        "roster_keys": roster_keys,
+        "roster_norm": roster_norm,
+        "salary_keys": salary_keys,
+        "collisions": {n: ks for n, ks in by_name.items() if len(ks) > 1},
+        # display names a user can search: rostered now or priced in Salary2025
+        "names": sorted({p["name"] for p in players if p["name"] and (p["on_roster"] or p["has_salary"])}),
+    }
+
+def player_table(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Return this snapshot's identity table, building it once on first use."""
+    table = snapshot.get("_players")
+    if table is None:
+        table = build_player_table(snapshot.get("tabs", {}) or {})
+        snapshot["_players"] = table
+    return table
+
+# ---------- lookups ----------
+
+def keys_for_name(table: Dict[str, Any], name: str) -> List[int]:
+    """All identity keys sharing a (normalized) name, rostered players first."""
+    keys = table["by_name"].get(norm_name(name), [])
+    players = table["players"]
+    return sorted(keys, key=lambda k: (not players[k]["on_roster"], k))
+
+def key_for_id(table: Dict[str, Any], pid: Any) -> int | None:
+    pid = _norm_id(pid)
+    if not pid:
+        return None
+    key = table["by_sleeper"].get(pid)
+    return key if key is not None else table["by_yahoo"].get(pid)
+
+def team_rows(table: Dict[str, Any], team_name: str) -> List[int]:
+    """Rosters row indexes for a team (case-insensitive), in sheet order."""
+    return table["by_team"].get(_low(team_name), [])
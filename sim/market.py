@@ -0,0 +1,98 @@
+# sim/market.py
+# Per-position salary market: for each position, the sorted AAVs from Salary2025 (the
+# whole priced pool) and from Rosters (what teams actually carry), with percentiles,
+# mean and rostered/FA counts. Built in one pass over the identity table after each
+# sync and cached on the snapshot; every player's percentile within their position is
+# stored too, so `!market` and the rank on `!player` are lookups, not scans.
+
+from __future__ import annotations
+from typing import Dict, Any, List
+from bisect import bisect_right
+
+from sim.identity import player_table, _low
+
+PERCENTILES = (10, 25, 50, 75, 90)
+SOURCES = ("salary", "rosters")  # Salary2025 / Rosters
+
+# ---------- stats ----------
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of an already sorted list (0 for an empty one)."""
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def _stats(values: List[float]) -> Dict[str, Any]:
+    n = len(values)
+    return {
+        "n": n,
+        "mean": sum(values) / n if n else 0.0,
+        "min": values[0] if n else 0.0,
+        "max": values[-1] if n else 0.0,
+        **{f"p{p}": percentile(values, p) for p in PERCENTILES},
+    }
+
+def build_market(table: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    {"positions": {pos: {"salary": stats + rostered/fa, "rosters": stats}}, "sorted": {...},
+     "rank": {key: (pos, pct)}} — pos keys are lower-case; pct is the share of the
+    position's Salary2025 pool priced at or below the player's AAV.
+    """
+    sal: Dict[str, List[float]] = {}
+    ros: Dict[str, List[float]] = {}
+    counts: Dict[str, List[int]] = {}  # pos -> [rostered, fa] among priced players
+    for p in table["players"]:
+        if p["has_salary"] and p["aav"] > 0:
+            pos = _low(p["pos"] or p["roster_pos"])
+            if pos:
+                sal.setdefault(pos, []).append(p["aav"])
+                c = counts.setdefault(pos, [0, 0])
+                c[0 if p["on_roster"] else 1] += 1
+        if p["on_roster"]:
+            aav = p["roster_aav"] or p["aav"]
+            pos = _low(p["roster_pos"] or p["pos"])
+            if pos and aav > 0:
+                ros.setdefault(pos, []).append(aav)
+
+    positions: Dict[str, Dict[str, Any]] = {}
+    for pos in sorted(set(sal) | set(ros)):
+        s = sorted(sal.get(pos, []))
+        r = sorted(ros.get(pos, []))
+        sal[pos], ros[pos] = s, r
+        rostered, fa = counts.get(pos, (0, 0))
+        positions[pos] = {"salary": {**_stats(s), "rostered": rostered, "fa": fa}, "rosters": _stats(r)}
+
+    rank: Dict[int, tuple] = {}
+    for p in table["players"]:
+        pos = _low(p["roster_pos"] or p["pos"]) if p["on_roster"] else _low(p["pos"])
+        pool = sal.get(pos)
+        aav = (p["roster_aav"] if p["on_roster"] else 0.0) or p["aav"]
+        if pool and aav > 0:
+            rank[p["key"]] = (pos, 100.0 * bisect_right(pool, aav) / len(pool))
+    return {"positions": positions, "sorted": {"salary": sal, "rosters": ros}, "rank": rank}
+
+def market(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """This snapshot's market statistics, computed once and stored on it."""
+    m = snapshot.get("_market")
+    if m is None:
+        m = build_market(player_table(snapshot))
+        snapshot["_market"] = m
+    return m
+
+# ---------- lookups ----------
+
+def position_market(snapshot: Dict[str, Any], pos: str) -> Dict[str, Any] | None:
+    """Both distributions for one position (case-insensitive), or None if nobody plays it."""
+    return market(snapshot)["positions"].get(_low(pos))
+
+def market_rank(snapshot: Dict[str, Any], key: int | None) -> Dict[str, Any] | None:
+    """{"pos", "pct", "n"}: where a player identity's AAV sits in its position's Salary2025 pool."""
+    m = market(snapshot)
+    hit = m["rank"].get(key) if key is not None else None
+    if hit is None:
+        return None
+    pos, pct = hit
+    return {"pos": pos, "pct": pct, "n": m["positions"][pos]["salary"]["n"]}
@@ -5,6 +5,8 @@ from __future__ import annotations
 from typing import Dict, Any, List
 import re
 
+from sim.identity import player_table, team_rows, keys_for_name
+
 # ---------- helpers ----------
 
 def _norm(s): 
@@ -41,12 +43,10 @@ def _active_salaries(snapshot: Dict[str, Any], team_name: str, exclude_names: se
     """Return AAVs for active (On Roster Flag TRUE and not IR) players on team, optionally excluding names."""
     if exclude_names is None:
         exclude_names = set()
-    rows = (snapshot.get("tabs", {}) or {}).get("Rosters", []) or []
+    table = player_table(snapshot)
     out = []
-    for r in rows:
-        nr = _norm_row(r)
-        if _low(_norm(nr.get("team"))) != _low(team_name):
-            continue
+    for i in team_rows(table, team_name):
+        nr = table["roster_norm"][i]
         if not _is_true(nr.get("on roster flag", "FALSE")):
             continue
         if _is_true(nr.get("on ir?") or nr.get("ir")):
@@ -59,13 +59,11 @@ def _active_salaries(snapshot: Dict[str, Any], team_name: str, exclude_names: se
 
 def _current_dp_salary(snapshot: Dict[str, Any], team_name: str) -> float:
     """Return current DP relief (salary) from the roster; if no explicit DP flag, fall back to max active salary."""
-    rows = (snapshot.get("tabs", {}) or {}).get("Rosters", []) or []
+    table = player_table(snapshot)
     dp_sal = 0.0
     max_active = 0.0
-    for r in rows:
-        nr = _norm_row(r)
-        if _low(_norm(nr.get("team"))) != _low(team_name):
-            continue
+    for i in team_rows(table, team_name):
+        nr = table["roster_norm"][i]
         if not _is_true(nr.get("on roster flag", "FALSE")):
             continue
         sal = float(_num(nr.get("aav") or nr.get("salary")))
@@ -98,43 +96,19 @@ def _cap_limit_from_rules(snapshot: Dict[str, Any]) -> float:
 
 def _roster_rows(snapshot: Dict[str, Any], team_name: str) -> List[Dict[str, Any]]:
     rows = (snapshot.get("tabs", {}) or {}).get("Rosters", []) or []
+    table = player_table(snapshot)
     out = []
-    for r in rows:
-        nr = _norm_row(r)
-        if _low(_norm(nr.get("team"))) != _low(team_name):
+    for i in team_rows(table, team_name):
+        if not _is_true(table["roster_norm"][i].get("on roster flag", "FALSE")):
             continue
-        if not _is_true(nr.get("on roster flag", "FALSE")):
-            continue
-        out.append(r)  # keep original row for downstream (we normalize when reading)
+        out.append(rows[i])  # keep original row for downstream (we normalize when reading)
     return out
 
-def _all_rostered(snapshot: Dict[str, Any]) -> Dict[str, str]:
-    """Current market: player_name -> team_owner for all rostered players."""
-    rows = (snapshot.get("tabs", {}) or {}).get("Rosters", []) or []
-    m = {}
-    for r in rows:
-        nr = _norm_row(r)
-        if not _is_true(nr.get("on roster flag", "FALSE")):
-            continue
-        nm = _norm(nr.get("player name") or nr.get("player") or nr.get("name"))
-        tm = _norm(nr.get("team"))
-        if nm:
-            m[nm] = tm
-    return m
-
-def _salary_index(snapshot: Dict[str, Any]) -> Dict[str, float]:
-    """Salary DB for FAs: player_name -> AAV."""
-    tabs = snapshot.get("tabs", {}) or {}
-    sal = tabs.get("Salary2025", []) or tabs.get("Salary", []) or []
-    idx = {}
-    for s in sal:
-        ns = _norm_row(s)
-        nm = _norm(ns.get("player name") or ns.get("player") or ns.get("name"))
-        if not nm:
-            continue
-        aav = _num(ns.get("aav") or ns.get("salary"))
-        idx[nm] = aav
-    return idx
+def _market_entry(snapshot: Dict[str, Any], name: str) -> Dict[str, Any] | None:
+    """Identity for a picked display name: the rostered one if any, else the Salary2025 one."""
+    table = player_table(snapshot)
+    keys = keys_for_name(table, name)
+    return table["players"][keys[0]] if keys else None
 
 # ---------- fuzzy-ish name picking ----------
 
@@ -184,17 +158,14 @@ def simulate_add(snapshot: Dict[str, Any], team_name: str, player_query: str) ->
     current = _roster_rows(snapshot, team_name)
     roster_before = len(current)
 
-    rostered_map = _all_rostered(snapshot)
-    salary_idx   = _salary_index(snapshot)
-
-    all_names = sorted(set(list(rostered_map.keys()) + list(salary_idx.keys())))
-    picked = _pick_name(all_names, player_query)
+    picked = _pick_name(player_table(snapshot)["names"], player_query)
     if not picked:
         return {"status": "INVALID", "reason": f"No player match for '{player_query}'."}
+    entry = _market_entry(snapshot, picked)
 
     # availability
-    if picked in rostered_map:
-        owner = rostered_map[picked]
+    if entry and entry["on_roster"]:
+        owner = entry["team"]
         if _low(owner) != _low(team_name):
             return {"status": "INVALID", "reason": f"{picked} is already rostered by {owner}.", "availability": f"ROSTERED by {owner}"}
         else:
@@ -208,7 +179,7 @@ def simulate_add(snapshot: Dict[str, Any], team_name: str, player_query: str) ->
             "detail": f"Roster would be {roster_before + 1}/{roster_max}. You must drop someone to make this legal."
         })
 
-    base = float(salary_idx.get(picked, 0.0))  # effective = base (no discount)
+    base = float(entry["aav"] if entry else 0.0)  # effective = base (no discount)
 
     return {
         "status": "OK",
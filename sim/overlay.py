@@ -0,0 +1,226 @@
+# sim/overlay.py
+# Copy-on-write scenarios over the immutable snapshot. Each team's cap "book" (gross
+# counted salary, roster size, DP candidates sorted by salary) is built once per
+# snapshot and cached on it; an Overlay records only the roster rows a scenario moves
+# and recomputes the touched teams from their base book plus those rows, so a trade
+# costs O(players moved), and untouched teams are the shared base objects.
+#
+# Cap math mirrors cap_summary / audit_league: IR rows are not counted, DP relief goes
+# to the flagged — else (dp_auto_highest_if_unset) the highest — counted salary.
+
+from __future__ import annotations
+from typing import Dict, Any, List, Iterable
+import re
+
+from sim.identity import player_table, counts_on_roster, _is_true, _norm, _num, _low
+from sim.cap import _salary_for
+from sim.audit import compile_rules
+from sim.ops import _pick_name
+
+# ---------- base books ----------
+
+def build_books(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """{"rules": compiled rules, "teams": {team_lower: book}} from one pass over Rosters."""
+    table = player_table(snapshot)
+    players, roster_keys = table["players"], table["roster_keys"]
+    teams: Dict[str, Dict[str, Any]] = {}
+    for i, nr in enumerate(table["roster_norm"]):
+        team = _norm(nr.get("team"))
+        # cap_summary counts a blank roster flag; an explicit False (bool or text) is off
+        if not team or not counts_on_roster(nr.get("on roster flag")):
+            continue
+        b = teams.setdefault(team.lower(), {"team": team, "rows": {}, "roster": 0, "used": 0.0,
+                                             "active": [], "flagged": []})
+        on_ir = _is_true(nr.get("on ir?") or nr.get("ir"))
+        salary = _salary_for(players, roster_keys[i])
+        if salary is None:
+            salary = _num(nr.get("aav"))
+        row = {
+            "row": i,
+            "key": roster_keys[i],
+            "name": _norm(nr.get("player name") or nr.get("player") or nr.get("name")) or "Unknown",
+            "pos": _norm(nr.get("pos") or nr.get("position")),
+            "salary": salary or 0.0,
+            "on_ir": on_ir,
+            "dp": _is_true(nr.get("dp?") or nr.get("dp")),
+            "rostered": _is_true(nr.get("on roster flag", "FALSE")),  # roster size needs an explicit TRUE
+        }
+        b["rows"][i] = row
+        b["roster"] += row["rostered"]
+        if not on_ir:
+            b["used"] += row["salary"]
+            if row["salary"] > 0:
+                b["active"].append((row["salary"], i))
+                if row["dp"]:
+                    b["flagged"].append((row["salary"], i))
+    for b in teams.values():
+        b["active"].sort(reverse=True)
+        b["flagged"].sort(reverse=True)
+    return {"rules": compile_rules(snapshot), "teams": teams}
+
+def books(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """This snapshot's team books, built once and stored on it."""
+    b = snapshot.get("_books")
+    if b is None:
+        b = build_books(snapshot)
+        snapshot["_books"] = b
+    return b
+
+# ---------- overlay ----------
+
+class Overlay:
+    """
+    A scenario over one snapshot: roster rows moved between teams, nothing copied.
+    `cap(team)` gives the team's numbers with the moves applied; teams no move
+    touches come straight from the base book.
+    """
+
+    def __init__(self, snapshot: Dict[str, Any]):
+        base = books(snapshot)
+        self.rules = base["rules"]
+        self.base = base["teams"]
+        self.out: Dict[str, Dict[int, dict]] = {}   # team_lower -> {row: row dict} leaving
+        self.into: Dict[str, Dict[int, dict]] = {}  # team_lower -> {row: row dict} arriving
+
+    def book(self, team: str) -> Dict[str, Any] | None:
+        return self.base.get(_low(team))
+
+    def move(self, row: dict, src: str, dst: str):
+        """Move one base roster row from team `src` to team `dst`. DP flags don't travel."""
+        src, dst = _low(src), _low(dst)
+        self.out.setdefault(src, {})[row["row"]] = row
+        self.into.setdefault(dst, {})[row["row"]] = {**row, "dp": False}
+
+    def touched(self) -> List[str]:
+        return sorted(set(self.out) | set(self.into))
+
+    def cap(self, team: str) -> Dict[str, Any]:
+        t = _low(team)
+        b = self.base.get(t) or {"team": team, "rows": {}, "roster": 0, "used": 0.0, "active": [], "flagged": []}
+        out = self.out.get(t, {})
+        into = self.into.get(t, {})
+        used, roster = b["used"], b["roster"]
+        for r in out.values():
+            roster -= r["rostered"]
+            if not r["on_ir"]:
+                used -= r["salary"]
+        for r in into.values():
+            roster += r["rostered"]
+            if not r["on_ir"]:
+                used += r["salary"]
+
+        rules = self.rules
+        dp = None  # (salary, row dict)
+        if rules["dp_enabled"]:
+            flagged = next(((s, i) for s, i in b["flagged"] if i not in out), None)
+            if flagged:
+                dp = (flagged[0], b["rows"][flagged[1]])
+            elif rules["dp_auto_highest"]:
+                kept = next(((s, i) for s, i in b["active"] if i not in out), None)
+                cand = [(kept[0], b["rows"][kept[1]])] if kept else []
+                cand += [(r["salary"], r) for r in into.values() if not r["on_ir"] and r["salary"] > 0]
+                if cand:
+                    dp = max(cand, key=lambda c: c[0])
+        relief = dp[0] * rules["dp_relief_pct"] if dp else 0.0
+        used -= relief
+        return {
+            "team_name": b["team"],
+            "cap_limit": rules["cap_limit"],
+            "cap_used": round(used, 2),
+            "cap_remaining": round(rules["cap_limit"] - used, 2),
+            "dp_player": dp[1]["name"] if dp else None,
+            "dp_relief": round(relief, 2),
+            "roster": roster,
+            "roster_max": rules["roster_max"],
+        }
+
+# ---------- trades ----------
+
+_TRADE = re.compile(r"^(?P<give>.*?)\s+for\s+(?P<get>.*?)\s+with\s+(?P<team>.+)$", re.I)
+_NOTHING = {"", "nothing", "none", "-"}
+
+def _names(part: str) -> List[str]:
+    bits = re.split(r"\s*(?:,|\band\b|&|\+)\s*", part.strip(), flags=re.I)
+    return [b for b in bits if _low(b) not in _NOTHING]
+
+def parse_trade(args: str) -> tuple | None:
+    """'kelce, hill for adams with big dawgs' -> (["kelce", "hill"], ["adams"], "big dawgs"); None if malformed."""
+    m = _TRADE.match((args or "").strip())
+    if not m:
+        return None
+    return _names(m["give"]), _names(m["get"]), m["team"].strip()
+
+def _resolve_team(base: Dict[str, Any], query: str) -> str | None:
+    q = _low(query)
+    if q in base:
+        return q
+    hits = [t for t in base if q in t]
+    return hits[0] if len(hits) == 1 else None
+
+def resolve_team(snapshot: Dict[str, Any], query: str) -> str | None:
+    """Display name of the one team with roster rows matching `query` (exact, else substring)."""
+    base = books(snapshot)["teams"]
+    t = _resolve_team(base, query)
+    return base[t]["team"] if t else None
+
+def _pick_rows(book: Dict[str, Any], queries: Iterable[str]) -> tuple:
+    """Roster rows on `book` for each query, plus the queries that didn't match."""
+    rows = [r for r in book["rows"].values() if r["rostered"]]
+    by_name = {r["name"]: r for r in rows}
+    picked, missing = [], []
+    for q in queries:
+        name = _pick_name(list(by_name), q)
+        if name is None or by_name[name] in picked:
+            missing.append(q)
+        else:
+            picked.append(by_name[name])
+    return picked, missing
+
+def simulate_trade(snapshot: Dict[str, Any], team_name: str, give: List[str], get: List[str],
+                   other_team: str) -> Dict[str, Any]:
+    """
+    Both sides of a trade on one overlay. Returns {"status": "OK", "teams": [mine, theirs]}
+    with each side's before/after cap, sent/received players and the roster max — or
+    {"status": "INVALID", "reason": ...}.
+    """
+    ov = Overlay(snapshot)
+    mine = _resolve_team(ov.base, team_name)
+    theirs = _resolve_team(ov.base, other_team)
+    if mine is None:
+        return {"status": "INVALID", "reason": f"Team '{team_name}' has no roster rows."}
+    if theirs is None:
+        return {"status": "INVALID", "reason": f"No single team matches '{other_team}'."}
+    if mine == theirs:
+        return {"status": "INVALID", "reason": "A trade needs two different teams."}
+    if not give and not get:
+        return {"status": "INVALID", "reason": "Name at least one player on either side."}
+
+    sent, miss_a = _pick_rows(ov.base[mine], give)
+    recv, miss_b = _pick_rows(ov.base[theirs], get)
+    if miss_a or miss_b:
+        parts = []
+        if miss_a:
+            parts.append(f"not on {ov.base[mine]['team']}: {', '.join(miss_a)}")
+        if miss_b:
+            parts.append(f"not on {ov.base[theirs]['team']}: {', '.join(miss_b)}")
+        return {"status": "INVALID", "reason": "Players " + "; ".join(parts) + "."}
+
+    before = {t: ov.cap(t) for t in (mine, theirs)}
+    for r in sent:
+        ov.move(r, mine, theirs)
+    for r in recv:
+        ov.move(r, theirs, mine)
+
+    out = []
+    for t, gone, came in ((mine, sent, recv), (theirs, recv, sent)):
+        after = ov.cap(t)
+        out.append({
+            "team": after["team_name"],
+            "before": before[t],
+            "after": after,
+            "sent": [r["name"] for r in gone],
+            "received": [r["name"] for r in came],
+            "over_roster": after["roster"] > after["roster_max"],
+            "over_cap": after["cap_limit"] > 0 and after["cap_remaining"] < 0,
+        })
+    return {"status": "OK", "teams": out}
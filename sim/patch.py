@@ -0,0 +1,180 @@
+# sim/patch.py
+# Roster transactions as Rosters rows, and copy-on-write patches of a snapshot once
+# they have been written to the sheet (see writeback.py). A patched snapshot shares
+# every untouched row and player with the one it came from; the identity table,
+# attribute bitsets and query columns are updated only for the rows and players the
+# transactions touch, instead of being rebuilt (or re-fetched) from scratch.
+
+from __future__ import annotations
+from typing import Dict, Any, List
+import time
+import hashlib
+
+from sim.identity import (player_table, team_rows, keys_for_name, norm_name, roster_state, OFF_ROSTER,
+                          _norm_row, _norm_key, _norm_id, _first, _row_name, _ids_compatible, _is_true, _low)
+from sim.attr_index import attr_index, patch_attr_index
+from sim.query import columns, patch_columns
+
+# Rosters columns a transaction fills in, by normalized header
+_FLAG = ("on roster flag",)
+_NAME = ("player name", "player_name", "player", "name")
+_ID = ("player id", "player_id", "id")
+_POS = ("pos", "position")
+_AAV = ("aav", "salary")
+_IR = ("on ir?", "ir")
+_DP = ("dp?", "dp")
+
+# ---------- transactions -> rows ----------
+
+def roster_header(snapshot: Dict[str, Any]) -> List[str]:
+    """Rosters column headers in sheet order (as the snapshot's row dicts carry them)."""
+    rows = (snapshot.get("tabs", {}) or {}).get("Rosters", []) or []
+    return list(rows[0].keys()) if rows else []
+
+def column_for(header: List[str], names) -> str | None:
+    """The header (as written in the sheet) whose normalized form is one of `names`."""
+    for h in header:
+        if _norm_key(h) in names:
+            return h
+    return None
+
+def _bool_cell(snapshot: Dict[str, Any], flag_col: str, value: bool):
+    """True/False as the sheet's existing flag cells are typed (bool when read unformatted, else text)."""
+    rows = snapshot["tabs"]["Rosters"]
+    sample = rows[0].get(flag_col) if rows else None
+    if isinstance(sample, bool):
+        return value
+    return "TRUE" if value else "FALSE"
+
+def add_row(snapshot: Dict[str, Any], team: str, player: str) -> Dict[str, Any]:
+    """A new on-roster Rosters row for `player` (a display name from the identity table) on `team`."""
+    table = player_table(snapshot)
+    keys = keys_for_name(table, player)
+    if not keys:
+        raise ValueError(f"No player named '{player}'.")
+    p = table["players"][keys[0]]
+    header = roster_header(snapshot)
+    flag_col = column_for(header, _FLAG)
+    if not header or flag_col is None:
+        raise ValueError("Rosters has no 'On Roster Flag' column to write to.")
+    fill = {
+        _norm_key(column_for(header, ("team",)) or ""): team,
+        _norm_key(column_for(header, _NAME) or ""): p["name"],
+        _norm_key(column_for(header, _ID) or ""): p["sleeper_id"] or p["yahoo_id"] or p["roster_id"],
+        _norm_key(column_for(header, _POS) or ""): p["pos"],
+        _norm_key(column_for(header, _AAV) or ""): p["aav"],
+        _norm_key(flag_col): _bool_cell(snapshot, flag_col, True),
+        _norm_key(column_for(header, _IR) or ""): _bool_cell(snapshot, flag_col, False),
+        _norm_key(column_for(header, _DP) or ""): _bool_cell(snapshot, flag_col, False),
+    }
+    fill.pop("", None)
+    return {h: fill.get(_norm_key(h), "") for h in header}
+
+def drop_row(snapshot: Dict[str, Any], team: str, player: str) -> int | None:
+    """Index of `player`'s current On Roster Flag TRUE row on `team`, if there is one."""
+    table = player_table(snapshot)
+    want = norm_name(player)
+    for i in reversed(team_rows(table, team)):
+        nr = table["roster_norm"][i]
+        if norm_name(_row_name(nr)) == want and _is_true(nr.get("on roster flag", "FALSE")):
+            return i
+    return None
+
+# ---------- incremental patch ----------
+
+def _join_key(table: Dict[str, Any], players: List[dict], nr: Dict[str, Any]) -> int | None:
+    """The identity a new Rosters row joins onto, by the same rules as build_player_table."""
+    pid = _norm_id(_first(nr, *_ID))
+    if pid:
+        key = table["by_sleeper"].get(pid)
+        if key is None:
+            key = table["by_yahoo"].get(pid)
+        if key is not None:
+            return key
+    cands = [k for k in table["by_name"].get(norm_name(_row_name(nr)), []) if _ids_compatible(players[k], pid)]
+    return cands[0] if len(cands) == 1 else None
+
+def _patch_table(table: Dict[str, Any], rosters: List[dict], changed: List[int]) -> tuple:
+    """(new identity table, touched keys), or (None, None) when a row joins to no known identity."""
+    players = list(table["players"])
+    roster_keys = list(table["roster_keys"])
+    roster_norm = list(table["roster_norm"])
+    by_team = dict(table["by_team"])
+    by_sleeper = table["by_sleeper"]
+    touched = set()
+    for i in changed:
+        nr = _norm_row(rosters[i])
+        if i < len(roster_norm):
+            roster_norm[i] = nr
+            key = roster_keys[i]
+        else:
+            key = _join_key(table, players, nr)
+            if key is None:
+                return None, None
+            roster_norm.append(nr)
+            roster_keys.append(key)
+            t = _low(nr.get("team"))
+            by_team[t] = by_team.get(t, []) + [i]
+            pid, p = _norm_id(_first(nr, *_ID)), players[key]
+            if pid:
+                ids = {"roster_id": p["roster_id"] or pid}
+                if not p["sleeper_id"] and table["by_yahoo"].get(pid) != key:
+                    ids["sleeper_id"] = pid
+                    by_sleeper = {**by_sleeper, pid: key}
+                players[key] = {**p, **ids}
+        if key is None:
+            continue
+        p = players[key]
+        if _is_true(nr.get("on roster flag", "FALSE")):
+            if p["row"] is None or p["row"] <= i:  # the last TRUE row is the current one
+                players[key] = {**p, **roster_state(nr, i)}
+        elif p["row"] == i:
+            # that was the current row: fall back to an earlier TRUE row for the player, if any
+            prev = next((j for j in range(i - 1, -1, -1) if roster_keys[j] == key
+                         and _is_true(roster_norm[j].get("on roster flag", "FALSE"))), None)
+            players[key] = {**p, **(roster_state(roster_norm[prev], prev) if prev is not None else OFF_ROSTER)}
+        touched.add(key)
+    return {**table, "players": players, "roster_keys": roster_keys, "roster_norm": roster_norm,
+            "by_team": by_team, "by_sleeper": by_sleeper}, sorted(touched)
+
+def apply_roster_ops(snapshot: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    A new snapshot with written transactions applied: {"kind": "add", "values": row} appends
+    a Rosters row, {"kind": "drop", "team", "player"} clears that player's roster flag (to
+    op["flag"] when given). Rows should hold the cells as the sheet reads them back, so the
+    patched Rosters tab, and its hash, are what the next full pull returns.
+    Player table, attribute bitsets and columns carry over patched; other derived data is
+    left to rebuild lazily. "rev" is cleared so the next sync fetches and confirms.
+    """
+    table = player_table(snapshot)
+    idx, cols = attr_index(snapshot), columns(snapshot)
+    rosters = list(snapshot["tabs"]["Rosters"])
+    flag_col = column_for(roster_header(snapshot), _FLAG)
+    changed = []
+    # write-back never sends an add and a drop of the same player in one batch, so drops
+    # resolve against the snapshot as it was and adds simply go on the end
+    for op in ops:
+        if op["kind"] == "drop":
+            i = drop_row(snapshot, op["team"], op["player"])
+            if i is not None and flag_col and i not in changed:
+                rosters[i] = {**rosters[i], flag_col: op.get("flag", _bool_cell(snapshot, flag_col, False))}
+                changed.append(i)
+    for op in ops:
+        if op["kind"] == "add":
+            rosters.append(dict(op["values"]))
+            changed.append(len(rosters) - 1)
+
+    tabs = {**snapshot["tabs"], "Rosters": rosters}
+    new = {k: v for k, v in snapshot.items() if not k.startswith("_")}
+    new.update({
+        "tabs": tabs,
+        "hash": hashlib.md5(str(tabs).encode()).hexdigest()[:8],  # as pull_snapshot hashes the same content
+        "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "rev": None,
+    })
+    patched, keys = _patch_table(table, rosters, changed)
+    if patched is not None:
+        new["_players"] = patched
+        new["_attrs"] = patch_attr_index(idx, table["players"], patched["players"], keys)
+        new["_columns"] = patch_columns(cols, patched["players"], keys)
+    return new
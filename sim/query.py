@@ -0,0 +1,479 @@
+# sim/query.py
+# A small query language over the snapshot's player table, for the ad-hoc questions
+# that would otherwise each need a command:
+#
+#   !query status=fa aav<2m sort aav desc limit 10
+#   !query rosters where ir group by team count having count>3
+#   !query rostered group by pos sum aav, max aav sort sum_aav desc
+#
+# A query is compiled once into a plan (cached by its normalized text) and run against
+# columnar copies of the identity table. Equality filters on indexed attributes (pos,
+# nfl, bye, team, status) are bitset ANDs from sim.attr_index; the remaining filters,
+# sorts and aggregates are C-level passes over one column at a time. Each stage checks
+# the execution budget (RSFF_QUERY_BUDGET_MS) and the query is abandoned once it is spent.
+
+from __future__ import annotations
+from typing import Dict, Any, List
+from itertools import compress, repeat
+from functools import lru_cache
+import operator
+import os
+import re
+import time
+
+from sim.identity import player_table
+from sim.attr_index import attr_index, select_mask, iter_keys
+
+BUDGET_MS = float(os.getenv("RSFF_QUERY_BUDGET_MS", "250"))
+MAX_LIMIT = 100
+DEFAULT_LIMIT = 20
+
+class QueryError(ValueError):
+    """A query that doesn't parse, names an unknown column, or runs past its budget."""
+
+# ---------- columns ----------
+
+# column -> "str" | "num" | "bool"
+COLUMNS = {
+    "name": "str", "pos": "str", "nfl": "str", "team": "str", "status": "str",
+    "bye": "num", "aav": "num", "cap_hit": "num",
+    "rostered": "bool", "ir": "bool", "dp": "bool",
+}
+_ALIASES = {"salary": "aav", "position": "pos", "owner": "team", "nfl_team": "nfl", "caphit": "cap_hit",
+            "week": "bye", "player": "name", "on_ir": "ir"}
+# equality on these is answered by the attribute bitsets; bare booleans map to a status bit
+_INDEXED = ("pos", "nfl", "bye", "team", "status")
+_BOOL_STATUS = {"rostered": "rostered", "ir": "ir", "dp": "dp"}
+TABLES = ("players", "rosters")
+AGGS = ("count", "sum", "max")
+_DEFAULT_SHOW = ("name", "pos", "nfl", "team", "aav")
+_MONEY = ("aav", "cap_hit")
+
+def _bye_num(v: str) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _column_values(p: Dict[str, Any]) -> Dict[str, Any]:
+    """One identity's value in every column."""
+    return {
+        "name": p["name"],
+        "pos": p["roster_pos"] or p["pos"],
+        "nfl": p["nfl"],
+        "team": p["team"] if p["on_roster"] else "",
+        "status": ("IR" if p["on_ir"] else "rostered") if p["on_roster"] else "FA",
+        "bye": _bye_num(p["bye"]),
+        "aav": p["roster_aav"] or p["aav"] or 0.0,
+        "cap_hit": p["cap_hit"] or p["roster_aav"] or 0.0,
+        "rostered": p["on_roster"],
+        "ir": p["on_roster"] and p["on_ir"],
+        "dp": p["on_roster"] and p["dp"],
+    }
+
+def build_columns(table: Dict[str, Any]) -> Dict[str, Any]:
+    """Column lists indexed by identity key, plus the masks the two tables start from."""
+    cols: Dict[str, Any] = {c: [] for c in COLUMNS}
+    listed = rostered = 0
+    for p in table["players"]:
+        bit = 1 << p["key"]
+        if p["on_roster"] or p["has_salary"]:
+            listed |= bit
+        if p["on_roster"]:
+            rostered |= bit
+        for c, v in _column_values(p).items():
+            cols[c].append(v)
+    cols["_tables"] = {"players": listed, "rosters": rostered}
+    return cols
+
+def patch_columns(cols: Dict[str, Any], players: List[dict], keys) -> Dict[str, Any]:
+    """New columns with the rows for `keys` rewritten from `players` (cols is untouched)."""
+    out: Dict[str, Any] = {c: list(cols[c]) for c in COLUMNS}
+    listed, rostered = cols["_tables"]["players"], cols["_tables"]["rosters"]
+    for k in keys:
+        p, bit = players[k], 1 << k
+        for c, v in _column_values(p).items():
+            if k < len(out[c]):
+                out[c][k] = v
+            else:
+                out[c].append(v)
+        listed = listed | bit if p["on_roster"] or p["has_salary"] else listed & ~bit
+        rostered = rostered | bit if p["on_roster"] else rostered & ~bit
+    out["_tables"] = {"players": listed, "rosters": rostered}
+    return out
+
+def columns(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """This snapshot's columnar player table, built once and stored on it."""
+    cols = snapshot.get("_columns")
+    if cols is None:
+        cols = build_columns(player_table(snapshot))
+        snapshot["_columns"] = cols
+    return cols
+
+# ---------- parsing ----------
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<str>"[^"]*"|'[^']*')
+  | (?P<op><=|>=|!=|<>|==|=|<|>|~)
+  | (?P<punct>[(),])
+  | (?P<word>[^\s<>=!~(),"']+)
+)""", re.X)
+
+_OPS = {
+    "=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge, "~": operator.contains,
+}
+_KEYWORDS = {"from", "where", "and", "group", "having", "sort", "order", "by", "limit", "show", "asc", "desc"}
+_CLAUSES = ("group", "having", "sort", "order", "limit", "show")
+
+def _scan(text: str) -> List[str]:
+    """Tokens of a query, lower-cased except quoted strings, which stay whole."""
+    out = []
+    for m in _TOKEN.finditer((text or "").strip()):
+        tok = m.group(m.lastgroup)
+        if m.lastgroup == "op":
+            tok = {"==": "=", "<>": "!="}.get(tok, tok)
+        elif m.lastgroup != "str":
+            tok = tok.lower()
+        out.append(tok)
+    return out
+
+def normalize(text: str) -> str:
+    """Canonical form used as the plan-cache key: lower case, one space between tokens."""
+    return " ".join(_scan(text))
+
+def _number(tok: str) -> float:
+    """'2m' / '$2,000,000' / '1.5M' / '750k' -> float."""
+    s = tok.lower().replace("$", "").replace(",", "")
+    mult = 1.0
+    if s[-1:] in ("k", "m"):
+        mult = 1e3 if s[-1] == "k" else 1e6
+        s = s[:-1]
+    try:
+        return float(s) * mult
+    except ValueError:
+        raise QueryError(f"`{tok}` isn't a number")
+
+def _column(tok: str) -> str:
+    col = _ALIASES.get(tok, tok)
+    if col not in COLUMNS:
+        raise QueryError(f"unknown column `{tok}` — columns: {', '.join(COLUMNS)}")
+    return col
+
+class _Tokens:
+    def __init__(self, text: str):
+        self.toks = _scan(text)  # re-scan, not split: quoted values may hold spaces
+        self.i = 0
+
+    def peek(self, ahead: int = 0) -> str | None:
+        j = self.i + ahead
+        return self.toks[j] if j < len(self.toks) else None
+
+    def take(self) -> str:
+        tok = self.peek()
+        if tok is None:
+            raise QueryError("query ends too early")
+        self.i += 1
+        return tok
+
+    def accept(self, *words: str) -> bool:
+        if self.peek() in words:
+            self.i += 1
+            return True
+        return False
+
+def _value(ts: _Tokens) -> str:
+    tok = ts.take()
+    if tok[:1] in "\"'":
+        return tok[1:-1].lower()
+    if tok in _KEYWORDS or tok in _OPS:
+        raise QueryError(f"expected a value, got `{tok}`")
+    return tok
+
+def _continues(ts: _Tokens) -> bool:
+    """Whether the next bare word extends a text value ("team=big dawgs") rather than starting a condition."""
+    tok = ts.peek()
+    return (tok is not None and tok not in _KEYWORDS and tok not in _OPS and tok not in ("(", ")", ",", "not")
+            and tok not in COLUMNS and tok not in _ALIASES and ts.peek(1) not in _OPS)
+
+def _values(ts: _Tokens, text: bool) -> List[str]:
+    """A value, or a comma-separated list of alternatives. Text values may run over several words."""
+    vals = [_value(ts)]
+    while True:
+        if ts.accept(","):
+            vals.append(_value(ts))
+        elif text and _continues(ts):
+            vals[-1] += " " + ts.take()
+        else:
+            return vals
+
+def _condition(ts: _Tokens, names) -> tuple:
+    """`col op value[,value]`, a bare boolean column, or `not <bool>` -> (col, op, values)."""
+    negate = ts.accept("not")
+    tok = ts.take()
+    col = names(tok)
+    if ts.peek() not in _OPS:
+        if COLUMNS.get(col) != "bool":
+            raise QueryError(f"`{col}` needs a comparison, e.g. `{col}=...`")
+        return (col, "!=" if negate else "=", (True,))
+    op = ts.take()
+    kind = COLUMNS.get(col, "num")  # aggregates are numeric
+    vals = _values(ts, kind == "str")
+    if kind == "num":
+        if op == "~":
+            raise QueryError("`~` (contains) only works on text columns")
+        vals = [_number(v) for v in vals]
+    elif kind == "bool":
+        vals = [v in ("true", "yes", "y", "1", "t") for v in vals]
+    elif op not in ("=", "!=", "~"):
+        raise QueryError(f"`{col}` is text: use =, != or ~ (contains)")
+    if len(vals) > 1 and op not in ("=", "!="):
+        raise QueryError("a list of values only works with = or !=")
+    if negate:
+        op = {"=": "!=", "!=": "=", "<": ">=", ">=": "<", ">": "<=", "<=": ">"}.get(op, op)
+        if op == "~":
+            raise QueryError("`not` can't be combined with ~")
+    return (col, op, tuple(vals))
+
+def _agg(ts: _Tokens) -> tuple:
+    fn = ts.take()
+    if fn == "count":
+        return ("count", None, "count")
+    paren = ts.accept("(")
+    col = _column(ts.take())
+    if paren and not ts.accept(")"):
+        raise QueryError(f"missing `)` after {fn}({col}")
+    if COLUMNS[col] != "num":
+        raise QueryError(f"{fn} needs a number column, not `{col}`")
+    return (fn, col, f"{fn}_{col}")
+
+def _agg_name(tok: str, ts: _Tokens | None = None) -> str:
+    """Aggregates in having/sort: `count`, `sum_aav`, or `sum aav` / `max(aav)`."""
+    if tok in ("sum", "max") and ts is not None:
+        paren = ts.accept("(")
+        col = _column(ts.take())
+        if paren:
+            ts.accept(")")
+        return f"{tok}_{col}"
+    return tok
+
+@lru_cache(maxsize=256)
+def compile_query(text: str) -> Dict[str, Any]:
+    """
+    Plan for a normalized query (see normalize). Clauses, in this order, all optional:
+      [from players|rosters] [where] cond [and] cond ... [group by col [agg, ...]]
+      [having cond ...] [sort|order by key [asc|desc], ...] [limit n] [show col, ...]
+    """
+    ts = _Tokens(text)
+    plan: Dict[str, Any] = {
+        "table": "players", "where": [], "group": None, "aggs": [], "having": [],
+        "sort": [], "limit": DEFAULT_LIMIT, "show": None,
+    }
+    if ts.accept("from") or ts.peek() in TABLES:
+        plan["table"] = ts.take()
+        if plan["table"] not in TABLES:
+            raise QueryError(f"unknown table `{plan['table']}` — tables: {', '.join(TABLES)}")
+    ts.accept("where")
+    while ts.peek() is not None and ts.peek() not in _CLAUSES:
+        if not ts.accept("and"):
+            plan["where"].append(_condition(ts, _column))
+
+    if ts.accept("group"):
+        ts.accept("by")
+        col = _column(ts.take())
+        if COLUMNS[col] == "num" and col != "bye":
+            raise QueryError(f"group by a category (pos, nfl, team, status, bye…), not `{col}`")
+        plan["group"] = col
+        while ts.peek() in AGGS:
+            plan["aggs"].append(_agg(ts))
+            ts.accept(",")
+        if not plan["aggs"]:
+            plan["aggs"].append(("count", None, "count"))
+    names = {a[2] for a in plan["aggs"]}
+
+    def agg_or_group(tok, _ts=ts):
+        name = _agg_name(tok, _ts)
+        if name in names or name == plan["group"]:
+            return name
+        raise QueryError(f"`{name}` isn't in this query's group by — have: {', '.join([plan['group'], *names])}")
+
+    # the trailing clauses may come in any order, each at most once
+    seen = set()
+    while ts.peek() is not None:
+        clause = ts.take()
+        clause = "sort" if clause == "order" else clause
+        if clause not in ("having", "sort", "limit", "show") or clause in seen:
+            raise QueryError(f"unexpected `{clause}`" + (" — group by goes before having/sort/limit" if clause == "group" else ""))
+        seen.add(clause)
+        if clause == "having":
+            if not plan["group"]:
+                raise QueryError("`having` needs a `group by`")
+            while ts.peek() is not None and ts.peek() not in _CLAUSES:
+                if not ts.accept("and"):
+                    plan["having"].append(_condition(ts, agg_or_group))
+        elif clause == "sort":
+            ts.accept("by")
+            while True:
+                tok = ts.take()
+                key = agg_or_group(tok) if plan["group"] else _column(tok)
+                desc = ts.accept("desc")
+                if not desc:
+                    ts.accept("asc")
+                plan["sort"].append((key, desc))
+                if not ts.accept(","):
+                    break
+        elif clause == "limit":
+            plan["limit"] = max(1, min(MAX_LIMIT, int(_number(ts.take()))))
+        else:
+            if plan["group"]:
+                raise QueryError("`show` is for row queries; grouped ones show their aggregates")
+            show = [_column(ts.take())]
+            while ts.accept(","):
+                show.append(_column(ts.take()))
+            plan["show"] = tuple(show)
+
+    # split equality on indexed attributes off the scan list: those are bitset lookups
+    index, scans = {}, []
+    for col, op, vals in plan["where"]:
+        if op == "=" and COLUMNS[col] == "bool" and vals == (True,):
+            key, v = "status", _BOOL_STATUS[col]
+        elif op == "=" and col in _INDEXED:
+            key, v = col, ",".join(str(int(x)) if col == "bye" else x for x in vals)
+        else:
+            scans.append((col, op, vals))
+            continue
+        index[key] = f"{index[key]}+{v}" if key in index else v
+    plan["index"] = index
+    plan["scans"] = scans
+    if plan["show"] is None and not plan["group"]:
+        extra = [c for c, _, _ in plan["where"]] + [k for k, _ in plan["sort"]]
+        plan["show"] = tuple(dict.fromkeys([*_DEFAULT_SHOW, *(c for c in extra if c != "status" and COLUMNS[c] != "bool")]))
+    return plan
+
+def plan_cache() -> str:
+    ci = compile_query.cache_info()
+    return f"{ci.currsize} plans cached, {ci.hits} hits / {ci.misses} misses"
+
+# ---------- execution ----------
+
+class _Budget:
+    def __init__(self, ms: float):
+        self.t0 = time.perf_counter()
+        self.limit = ms / 1000.0
+
+    def ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    def check(self, stage: str):
+        if time.perf_counter() - self.t0 > self.limit:
+            raise QueryError(f"query ran past its {self.limit * 1000:.0f} ms budget ({stage}) — narrow it down")
+
+def _match(values, op: str, vals: tuple) -> List[bool] | Any:
+    """Truth values for one column slice against a condition, without a per-row Python branch."""
+    fn = _OPS[op]
+    if len(vals) == 1:
+        v = vals[0]
+        if op == "~":
+            return map(fn, map(str.lower, values), repeat(v))
+        if isinstance(v, str):
+            values = map(str.lower, values)
+        return map(fn, values, repeat(v))
+    vs = frozenset(vals)
+    hit = map(vs.__contains__, map(str.lower, values) if isinstance(vals[0], str) else values)
+    return hit if op == "=" else map(operator.not_, hit)
+
+def _index_mask(idx: Dict[str, Any], index: Dict[str, str]) -> int:
+    """Bitset for the indexed equalities; a key repeated in the query ("pos=rb pos=wr") is ANDed."""
+    mask = idx["all"]
+    for key, spec in index.items():
+        for part in spec.split("+"):
+            mask &= select_mask(idx, {key: part})
+    return mask
+
+def run_query(snapshot: Dict[str, Any], text: str, budget_ms: float | None = None) -> Dict[str, Any]:
+    """
+    Execute a query. Returns {"query", "columns", "rows", "total", "ms", "grouped"} where
+    rows are tuples in `columns` order, already sorted and limited; total is before limit.
+    """
+    budget = _Budget(BUDGET_MS if budget_ms is None else budget_ms)
+    norm = normalize(text)
+    if not norm:
+        raise QueryError("empty query")
+    plan = compile_query(norm)
+    cols = columns(snapshot)
+
+    mask = cols["_tables"][plan["table"]]
+    if plan["index"]:
+        mask &= _index_mask(attr_index(snapshot), plan["index"])
+    sel = list(iter_keys(mask))
+    budget.check("index")
+    for col, op, vals in plan["scans"]:
+        c = cols[col]
+        sel = list(compress(sel, _match(map(c.__getitem__, sel), op, vals)))
+        budget.check("filter")
+
+    if plan["group"]:
+        return _grouped(plan, cols, sel, budget, norm)
+
+    for key, desc in reversed(plan["sort"] or [("aav", True)]):
+        c = cols[key]
+        sel.sort(key=c.__getitem__, reverse=desc)
+    budget.check("sort")
+    show = plan["show"]
+    picked = sel[:plan["limit"]]
+    rows = list(zip(*(map(cols[c].__getitem__, picked) for c in show))) if picked else []
+    return {"query": norm, "columns": show, "rows": rows, "total": len(sel), "ms": budget.ms(), "grouped": False}
+
+def _grouped(plan, cols, sel, budget, norm) -> Dict[str, Any]:
+    gcol = cols[plan["group"]]
+    groups: Dict[Any, List[int]] = {}
+    for k, g in zip(sel, map(gcol.__getitem__, sel)):
+        groups.setdefault(g, []).append(k)
+    budget.check("group")
+
+    names = [plan["group"], *(a[2] for a in plan["aggs"])]
+    rows: List[tuple] = []
+    for g, ks in groups.items():
+        row = [g]
+        for fn, col, _ in plan["aggs"]:
+            if fn == "count":
+                row.append(len(ks))
+            else:
+                vals = map(cols[col].__getitem__, ks)
+                row.append(sum(vals) if fn == "sum" else max(vals))
+        rows.append(tuple(row))
+    budget.check("aggregate")
+
+    pos = {n: i for i, n in enumerate(names)}
+    for name, op, vals in plan["having"]:
+        i = pos[name]
+        rows = list(compress(rows, _match([r[i] for r in rows], op, vals)))
+    # unless the query sorts them, groups come out by their first aggregate, largest first
+    rows.sort(key=lambda r: str(r[0]).lower())
+    for key, desc in reversed(plan["sort"] or [(names[1], True)]):
+        i = pos[key]
+        rows.sort(key=lambda r: r[i], reverse=desc)
+    budget.check("sort")
+    return {"query": norm, "columns": tuple(names), "rows": rows[:plan["limit"]], "total": len(rows),
+            "ms": budget.ms(), "grouped": True}
+
+def is_money(column: str) -> bool:
+    return column in _MONEY or column.endswith(tuple(f"_{m}" for m in _MONEY))
+
+if __name__ == "__main__":
+    # python -m sim.query — tokenizer self-check: quoted values keep their spaces
+    cases = {
+        'name="player 1"': ["name", "=", '"player 1"'],
+        "team = 'big  dawgs' and aav>2m": ["team", "=", "'big  dawgs'", "and", "aav", ">", "2m"],
+        "from rosters where POS in (qb,wr)": ["from", "rosters", "where", "pos", "in", "(", "qb", ",", "wr", ")"],
+    }
+    bad = 0
+    for text, want in cases.items():
+        got = _Tokens(normalize(text)).toks
+        bad += got != want
+        print(f"{text}: {got}" + ("" if got == want else f" — expected {want}"))
+    plan = compile_query(normalize('where name="player 1"'))
+    ok = '"player 1"' not in str(plan) and "player 1" in str(plan)
+    bad += not ok
+    print(f"compiled quoted value: {'ok' if ok else plan}")
+    raise SystemExit(1 if bad else 0)
@@ -4,6 +4,8 @@ from __future__ import annotations
 import re
 from typing import Dict, Any, List
 
+from sim.identity import player_table, team_rows
+
 # ---------- helpers ----------
 
 def _norm_key(k: Any) -> str:
@@ -66,9 +68,10 @@ def team_summary(snapshot: Dict[str, Any], team_name: str) -> Dict[str, Any]:
     """
     Full team summary for a given team name.
     Uses Rules.tab['cap_limit'] first, then Owners2025.cap_limit, then fallback=96M.
+    Blank roster AAV/pos cells fall back to the player's joined Salary2025 row.
     """
-    tabs = snapshot.get("tabs", {}) or {}
-    rosters: List[Dict[str, Any]] = tabs.get("Rosters", []) or []
+    table = player_table(snapshot)
+    players, roster_keys = table["players"], table["roster_keys"]
 
     # Cap limit resolution
     cap_limit = _cap_limit_from_rules(snapshot)
@@ -78,23 +81,27 @@ def team_summary(snapshot: Dict[str, Any], team_name: str) -> Dict[str, Any]:
         cap_limit = 96_000_000.0  # confirmed fallback for RSFF
 
     # Filter to this team’s current roster entries
-    team_rows: List[Dict[str, Any]] = []
-    for r in rosters:
-        nr = _norm_row(r)
-        if _norm_val(nr.get("team")).lower() != _norm_val(team_name).lower():
-            continue
-        if not _is_true(nr.get("on roster flag", "FALSE")):
+    rows: List[int] = []
+    for i in team_rows(table, team_name):
+        if not _is_true(table["roster_norm"][i].get("on roster flag", "FALSE")):
             continue
-        team_rows.append(nr)
+        rows.append(i)
 
     active, ir = [], []
     dp_player = None
     dp_relief = 0.0
 
-    for nr in team_rows:
+    for i in rows:
+        nr = table["roster_norm"][i]
+        key = roster_keys[i]
+        sal_info = players[key] if key is not None and players[key]["has_salary"] else None
         name = _norm_val(nr.get("player name") or nr.get("name") or nr.get("player"))
         pos = _norm_val(nr.get("pos") or nr.get("position"))
         salary = _num(nr.get("aav") or nr.get("salary"))
+        # Blank roster cells fall back to the joined Salary2025 row
+        if sal_info:
+            pos = pos or sal_info["pos"]
+            salary = salary or sal_info["aav"]
         is_ir = _is_true(nr.get("on ir?") or nr.get("ir"))
         is_dp = _is_true(nr.get("dp?") or nr.get("dp"))
 
@@ -0,0 +1,171 @@
+# sleeper_players.py
+# Import a local Sleeper `players/nfl` dump into a compact, memory-mapped index.
+#
+#   python sleeper_players.py players_nfl.json sleeper_players.idx
+#
+# The dump is one JSON object {player_id: {...}, ...} of ~5 MB. It is parsed one
+# entry at a time, and only the fields `!player` shows are kept, as fixed-width
+# records sorted by player ID so lookups are a binary search over the mmap.
+import os
+import sys
+import json
+import mmap
+import struct
+import time
+
+_MAGIC = b"RSFFSLP1"
+_HEADER = struct.Struct("<8sII")              # magic, record count, record size
+_FIELDS = (                                   # (dump key, width in bytes)
+    ("player_id", 12),
+    ("full_name", 40),
+    ("position", 4),
+    ("team", 4),
+    ("status", 16),
+    ("injury_status", 16),
+)
+_RECORD = struct.Struct("<" + "".join(f"{w}s" for _, w in _FIELDS))
+_KEY_WIDTH = _FIELDS[0][1]
+
+_INDEX = None  # cached (path, mmap, (st_ino, st_mtime_ns), checked at) for the open index
+# build_index swaps the file in with os.replace: a running bot notices (new inode or
+# mtime) within this many seconds and maps the new file
+RECHECK_S = float(os.getenv("SLEEPER_INDEX_RECHECK_SECONDS", "30"))
+
+
+# ---------- streaming parse ----------
+
+def iter_players(path: str, chunk_size: int = 64 * 1024):
+    """
+    Yield (player_id, entry) pairs from a Sleeper players dump without loading it whole.
+    Only the current entry plus one read chunk is ever held in memory.
+    """
+    dec = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos = "", 0
+
+        def fill():
+            nonlocal buf, pos
+            chunk = f.read(chunk_size)
+            buf, pos = buf[pos:] + chunk, 0
+            return bool(chunk)
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,:":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    val, end = dec.raw_decode(buf, pos)
+                    pos = end
+                    return val
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+
+        skip_ws()
+        if buf[pos:pos + 1] != "{":
+            raise ValueError(f"{path}: expected a JSON object of players")
+        pos += 1
+        while True:
+            skip_ws()
+            if pos >= len(buf) or buf[pos] == "}":
+                return
+            pid = decode()
+            skip_ws()
+            entry = decode()
+            if isinstance(entry, dict):
+                yield str(pid), entry
+
+
+# ---------- index build ----------
+
+def _pack(pid: str, entry: dict) -> bytes:
+    vals = []
+    for key, width in _FIELDS:
+        v = pid if key == "player_id" else entry.get(key)
+        if key == "full_name" and not v:
+            v = " ".join(x for x in (entry.get("first_name"), entry.get("last_name")) if x)
+        vals.append(str(v or "").encode("utf-8")[:width])
+    return _RECORD.pack(*vals)
+
+def build_index(dump_path: str, index_path: str) -> int:
+    """Stream the dump into a sorted fixed-width index file. Returns the record count."""
+    records = [_pack(pid, e) for pid, e in iter_players(dump_path)]
+    records.sort(key=lambda r: r[:_KEY_WIDTH])
+    tmp = index_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(records), _RECORD.size))
+        f.writelines(records)
+    os.replace(tmp, index_path)  # readers never see a half-written index
+    return len(records)
+
+
+# ---------- lookup ----------
+
+def _open(path: str):
+    global _INDEX
+    now = time.monotonic()
+    if _INDEX and _INDEX[0] == path and now - _INDEX[3] < RECHECK_S:
+        return _INDEX[1]
+    try:
+        st = os.stat(path)
+    except OSError:
+        _INDEX = None
+        return None
+    ident = (st.st_ino, st.st_mtime_ns)
+    if _INDEX and _INDEX[0] == path and _INDEX[2] == ident:
+        _INDEX = (path, _INDEX[1], ident, now)
+        return _INDEX[1]
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, _, size = _HEADER.unpack_from(mm, 0)
+    if magic != _MAGIC or size != _RECORD.size:
+        mm.close()
+        raise ValueError(f"{path}: not a Sleeper players index")
+    # a replaced map is not closed here: a lookup on another thread may still be reading it
+    _INDEX = (path, mm, ident, now)
+    return mm
+
+def mapped_bytes() -> int:
+    """Size of the currently mapped index (page cache, shared across processes), 0 if none."""
+    return len(_INDEX[1]) if _INDEX else 0
+
+def _unpack(mm, i: int) -> dict:
+    vals = _RECORD.unpack_from(mm, _HEADER.size + i * _RECORD.size)
+    return {key: v.rstrip(b"\0").decode("utf-8", "ignore") for (key, _), v in zip(_FIELDS, vals)}
+
+def lookup_player(player_id, path: str | None = None) -> dict | None:
+    """Return {player_id, full_name, position, team, status, injury_status} or None."""
+    pid = str(player_id or "").strip()
+    if not pid:
+        return None
+    mm = _open(path or os.getenv("SLEEPER_PLAYERS_INDEX", "sleeper_players.idx"))
+    if mm is None:
+        return None
+    _, count, size = _HEADER.unpack_from(mm, 0)
+    want = pid.encode("utf-8")[:_KEY_WIDTH].ljust(_KEY_WIDTH, b"\0")
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        off = _HEADER.size + mid * size
+        key = mm[off:off + _KEY_WIDTH]
+        if key < want:
+            lo = mid + 1
+        elif key > want:
+            hi = mid
+        else:
+            return _unpack(mm, mid)
+    return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python sleeper_players.py <players_nfl.json> <index.idx>")
+    n = build_index(sys.argv[1], sys.argv[2])
+    print(f"✅ Indexed {n} players → {sys.argv[2]}")
@@ -0,0 +1,36 @@
+# snapshot_cache.py
+# Last good snapshot on local disk, so a restart can serve commands before the
+# Sheets client is even built.
+import os
+import json
+import time
+
+_DEFAULT_PATH = "rsff_snapshot.json"
+
+
+def _path(path: str | None) -> str:
+    return path or os.getenv("RSFF_SNAPSHOT_FILE", _DEFAULT_PATH)
+
+
+def save_snapshot(snapshot, path: str | None = None):
+    """Atomically write hash/ts/tabs (derived '_' keys such as indexes are rebuilt on load)."""
+    path = _path(path)
+    data = {k: v for k, v in snapshot.items() if not k.startswith("_")}
+    data["saved_at"] = time.time()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"), default=str)
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: str | None = None):
+    """Return the saved snapshot dict (with 'saved_at' epoch) or None if missing/corrupt."""
+    path = _path(path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            snap = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(snap, dict) or "tabs" not in snap or "hash" not in snap:
+        return None
+    return snap
@@ -0,0 +1,48 @@
+# startup.py
+# Boot timeline: import-time breakdown plus milestones up to the first command
+# answered, so cold-start regressions show up in the logs and in `!startup`.
+import time
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()  # as close to process start as app.py allows
+_IMPORTS = []              # (label, seconds)
+_MARKS = []                # (label, seconds since _T0)
+_FIRST_RESPONSE = None     # seconds since _T0
+
+
+def elapsed() -> float:
+    return time.perf_counter() - _T0
+
+
+@contextmanager
+def timed_import(label: str):
+    """Time an import block: `with timed_import("discord"): import discord`."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _IMPORTS.append((label, time.perf_counter() - t))
+
+
+def mark(label: str):
+    """Record a milestone once (later calls with the same label are ignored)."""
+    if not any(lbl == label for lbl, _ in _MARKS):
+        _MARKS.append((label, elapsed()))
+
+
+def first_response() -> float | None:
+    """Record time-to-first-response on the first call; returns it only that once."""
+    global _FIRST_RESPONSE
+    if _FIRST_RESPONSE is not None:
+        return None
+    _FIRST_RESPONSE = elapsed()
+    mark("first command answered")
+    return _FIRST_RESPONSE
+
+
+def report() -> list[str]:
+    lines = ["Imports: " + ", ".join(f"{lbl} {sec * 1000:,.0f}ms" for lbl, sec in _IMPORTS)]
+    lines += [f"+{sec:6.2f}s  {lbl}" for lbl, sec in _MARKS]
+    if _FIRST_RESPONSE is not None:
+        lines.append(f"Time to first response: {_FIRST_RESPONSE:.2f}s")
+    return lines
@@ -0,0 +1,178 @@
+# sync_schedule.py
+# Adaptive autosync interval: tighten when the sheet is moving or the bot is busy,
+# back off exponentially (with jitter) while it stays unchanged, and sleep through
+# optional quiet hours. Failed pulls are handled separately by CircuitBreaker.
+import os
+import time
+import random
+import datetime
+from collections import deque
+
+
+def _parse_quiet(spec: str):
+    """'1-7' -> (1, 7) local hours [start, end). Wraps midnight ('23-6'). Blank -> None."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    a, b = spec.split("-", 1)
+    return int(a) % 24, int(b) % 24
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        min_minutes: float = 5,
+        max_minutes: float = 120,
+        quiet_hours: str = "",
+        jitter: float = 0.2,
+        busy_commands: int = 20,
+        busy_window_s: float = 600,
+    ):
+        self.min_s = float(min_minutes) * 60
+        self.max_s = max(float(max_minutes) * 60, self.min_s)
+        self.quiet = _parse_quiet(quiet_hours)
+        self.jitter = jitter
+        self.busy_commands = busy_commands
+        self.busy_window_s = busy_window_s
+
+        self._commands = deque()      # monotonic timestamps of recent commands
+        self.unchanged_streak = 0
+        self.interval_s = self.min_s
+        self.reason = "startup"
+        self.next_run: datetime.datetime | None = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            min_minutes=float(os.getenv("RSFF_SYNC_MIN_MINUTES", "5")),
+            max_minutes=float(os.getenv("RSFF_SYNC_MAX_MINUTES", "120")),
+            quiet_hours=os.getenv("RSFF_SYNC_QUIET_HOURS", ""),
+        )
+
+    # ---- signals
+    def note_command(self):
+        now = time.monotonic()
+        self._commands.append(now)
+        while self._commands and now - self._commands[0] > self.busy_window_s:
+            self._commands.popleft()
+
+    def recent_commands(self) -> int:
+        now = time.monotonic()
+        while self._commands and now - self._commands[0] > self.busy_window_s:
+            self._commands.popleft()
+        return len(self._commands)
+
+    # ---- decision
+    def _quiet_until(self, now: datetime.datetime) -> datetime.datetime | None:
+        if not self.quiet:
+            return None
+        start, end = self.quiet
+        h = now.hour
+        inside = (start <= h < end) if start < end else (h >= start or h < end)
+        if not inside:
+            return None
+        wake = now.replace(hour=end, minute=0, second=0, microsecond=0)
+        if wake <= now:
+            wake += datetime.timedelta(days=1)
+        return wake
+
+    def next_delay(self, changed: bool, now: datetime.datetime | None = None) -> float:
+        """Record the outcome of the sync that just ran and return seconds until the next one."""
+        now = now or datetime.datetime.now()
+        busy = self.recent_commands()
+
+        if changed:
+            self.unchanged_streak = 0
+            base, self.reason = self.min_s, "sheet changed"
+        elif busy >= self.busy_commands:
+            self.unchanged_streak = 0
+            base, self.reason = self.min_s, f"busy ({busy} commands/{self.busy_window_s / 60:.0f}m)"
+        else:
+            self.unchanged_streak += 1
+            base = min(self.max_s, self.min_s * (2 ** min(self.unchanged_streak, 16)))
+            self.reason = f"unchanged x{self.unchanged_streak} (backoff)"
+
+        delay = base * random.uniform(1 - self.jitter, 1 + self.jitter)
+        delay = max(self.min_s, min(self.max_s, delay))
+
+        # A run that would land inside quiet hours is pushed to when they end
+        wake = self._quiet_until(now + datetime.timedelta(seconds=delay))
+        if wake is not None:
+            delay = (wake - now).total_seconds() + random.uniform(0, 60)
+            self.reason = f"quiet hours until {wake:%H:%M}"
+
+        self.interval_s = delay
+        self.next_run = now + datetime.timedelta(seconds=delay)
+        return delay
+
+    def describe(self) -> str:
+        if not self.next_run:
+            return f"Next sync: pending ({self.reason})"
+        return f"Next sync: {self.next_run:%H:%M:%S} (in {self.interval_s / 60:.0f}m — {self.reason})"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for a league's Sheets pulls. Each failure pushes the
+    next attempt out exponentially (with jitter); after `threshold` failures in a row
+    the circuit opens and automatic pulls stop until `retry_at`, when a single probe
+    is let through (half-open). Any success closes it again.
+    """
+
+    def __init__(self, threshold: int = 3, base_s: float = 30, max_s: float = 1800, jitter: float = 0.2):
+        self.threshold = max(1, threshold)
+        self.base_s = base_s
+        self.max_s = max(max_s, base_s)
+        self.jitter = jitter
+
+        self.failures = 0
+        self.last_error = ""
+        self.failing_since: float | None = None   # time.time() of the first failure in this run
+        self.retry_at = 0.0                       # time.monotonic() of the next allowed attempt
+        self.opened = 0                           # times the circuit has opened (lifetime)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            threshold=int(os.getenv("RSFF_BREAKER_FAILURES", "3")),
+            base_s=float(os.getenv("RSFF_RETRY_BASE_SECONDS", "30")),
+            max_s=float(os.getenv("RSFF_RETRY_MAX_MINUTES", "30")) * 60,
+        )
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.threshold:
+            return "closed"
+        return "half-open" if time.monotonic() >= self.retry_at else "open"
+
+    def allow(self) -> bool:
+        """Whether an automatic pull may run now (no side effects)."""
+        return self.failures == 0 or time.monotonic() >= self.retry_at
+
+    def wait_s(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.last_error = ""
+        self.failing_since = None
+        self.retry_at = 0.0
+
+    def record_failure(self, error) -> float:
+        """Count a failed pull; returns seconds until the next attempt."""
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if self.failing_since is None:
+            self.failing_since = time.time()
+        delay = min(self.max_s, self.base_s * (2 ** min(self.failures - 1, 16)))
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.retry_at = time.monotonic() + delay
+        if self.failures == self.threshold:
+            self.opened += 1
+        return delay
+
+    def describe(self) -> str:
+        if self.failures == 0:
+            return "Sheets: ok"
+        return (f"Sheets: {self.state} after {self.failures} failure(s), retry in {self.wait_s() / 60:.1f}m"
+                f" — {self.last_error}")
@@ -0,0 +1,243 @@
+# tracing.py
+# Structured spans for syncs and commands. Each finished span is one JSON line:
+#   {"trace": "9f2c…", "span": "1a2b3c4d", "parent": "…", "name": "sync.fetch.partition",
+#    "start": 1760000000.123, "ms": 41.7, "status": "ok", "thread": "sheets-fetch_0", ...attrs}
+# written to RSFF_TRACE_FILE (a path, or "-" for stdout). Spans nest through a
+# ContextVar, so work handed to asyncio.to_thread lands in the caller's trace; pool
+# submissions keep it with bind().
+#
+#   python tracing.py rsff_trace.jsonl [--slowest 5] [--name command]
+# prints the slowest traces as span trees, for breaking a slow request down afterwards.
+#
+# Off means off: EXPORTER is None, span() hands back a shared no-op, bind() returns
+# the function unchanged and app.py wraps nothing.
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import functools
+import threading
+import contextvars
+
+EXPORTER = None  # the configured _Exporter, if tracing is on
+
+_CURRENT = contextvars.ContextVar("rsff_span", default=None)
+
+
+class _Exporter:
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+        self._f = sys.stdout if target == "-" else open(target, "a", encoding="utf-8", buffering=1)
+        self.spans = 0
+
+    def write(self, record: dict):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._f.write(line + "\n")
+            self.spans += 1
+
+    def close(self):
+        if self._f is not sys.stdout:
+            self._f.close()
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent", "name", "attrs", "start", "_t0", "_token", "status")
+
+    def __init__(self, name: str, parent: "Span | None" = None, **attrs):
+        parent = parent if parent is not None else _CURRENT.get()
+        self.trace = parent.trace if parent is not None else os.urandom(8).hex()
+        self.parent = parent.id if parent is not None else None
+        self.id = os.urandom(4).hex()
+        self.name = name
+        self.attrs = attrs
+        self.status = "ok"
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error):
+        self.status = "error"
+        self.attrs["error"] = f"{type(error).__name__}: {error}"[:200]
+
+    def __enter__(self):
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.fail(exc)
+        self.end()
+        return False
+
+    def end(self):
+        ms = (time.perf_counter() - self._t0) * 1000
+        if self._token is not None:
+            try:
+                _CURRENT.reset(self._token)
+            except ValueError:  # ended from another context (e.g. a different task)
+                pass
+            self._token = None
+        exp = EXPORTER
+        if exp is not None:
+            exp.write({
+                "trace": self.trace, "span": self.id, "parent": self.parent, "name": self.name,
+                "start": round(self.start, 6), "ms": round(ms, 3), "status": self.status,
+                "thread": threading.current_thread().name, **self.attrs,
+            })
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoSpan()
+
+
+# ---------- API ----------
+
+def configure(target: str | None = None):
+    """Turn tracing on for RSFF_TRACE_FILE (or `target`); blank leaves it off."""
+    global EXPORTER
+    target = target if target is not None else os.getenv("RSFF_TRACE_FILE", "")
+    if EXPORTER is not None:
+        EXPORTER.close()
+        EXPORTER = None
+    if target:
+        EXPORTER = _Exporter(target)
+    return EXPORTER
+
+
+def span(name: str, parent: Span | None = None, **attrs):
+    """`with span("sim", team=t):` — a child of the current span (or a new trace's root)."""
+    if EXPORTER is None:
+        return _NOOP
+    return Span(name, parent, **attrs)
+
+
+def begin(name: str, **attrs):
+    """Open a span and make it current without a `with` block; close it with .end()."""
+    if EXPORTER is None:
+        return _NOOP
+    return Span(name, **attrs).__enter__()
+
+
+def current() -> Span | None:
+    return _CURRENT.get() if EXPORTER is not None else None
+
+
+def detach():
+    """Start the calling task with no current span (for long-lived workers spawned from a command)."""
+    if EXPORTER is not None:
+        _CURRENT.set(None)
+
+
+def bind(fn):
+    """fn carrying the caller's current span, for executor.submit (which doesn't copy context)."""
+    if EXPORTER is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def traced(name: str, fn):
+    """fn (plain or async) wrapped in a span named `name`; callers only wrap when tracing is on."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def awrapper(*a, **kw):
+            with span(name):
+                return await fn(*a, **kw)
+        return awrapper
+
+    @functools.wraps(fn)
+    def wrapper(*a, **kw):
+        with span(name):
+            return fn(*a, **kw)
+    return wrapper
+
+
+def instrument(namespace, *names: str, prefix: str = "", name: str | None = None):
+    """Replace functions in a module (or globals() dict) with traced versions of themselves."""
+    get = namespace.get if isinstance(namespace, dict) else functools.partial(getattr, namespace)
+    put = namespace.__setitem__ if isinstance(namespace, dict) else functools.partial(setattr, namespace)
+    for n in names:
+        fn = get(n)
+        if fn is not None and not hasattr(fn, "__wrapped__"):
+            put(n, traced(name or f"{prefix}{n}", fn))
+
+
+# ---------- offline breakdown ----------
+
+def load(path: str) -> dict[str, list[dict]]:
+    traces = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            traces.setdefault(rec["trace"], []).append(rec)
+    return traces
+
+
+def format_trace(spans: list[dict]) -> list[str]:
+    """One trace as an indented tree, children in start order."""
+    kids = {}
+    ids = {s["span"] for s in spans}
+    for s in spans:
+        kids.setdefault(s["parent"] if s["parent"] in ids else None, []).append(s)
+    skip = {"trace", "span", "parent", "name", "start", "ms", "status", "thread"}
+    out = []
+
+    def walk(parent, depth):
+        for s in sorted(kids.get(parent, []), key=lambda s: s["start"]):
+            extra = " ".join(f"{k}={v}" for k, v in s.items() if k not in skip)
+            flag = "" if s["status"] == "ok" else " ❌"
+            out.append(f"{'  ' * depth}{s['name']:<{max(1, 34 - 2 * depth)}} {s['ms']:>9.2f} ms{flag}  {extra}".rstrip())
+            walk(s["span"], depth + 1)
+
+    walk(None, 0)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Show the slowest traces in an RSFF trace file.")
+    ap.add_argument("file")
+    ap.add_argument("--slowest", type=int, default=5)
+    ap.add_argument("--name", default="", help="only traces whose root span has this name (command, sync, ...)")
+    args = ap.parse_args()
+    roots = []
+    for spans in load(args.file).values():
+        ids = {s["span"] for s in spans}
+        for r in (s for s in spans if s["parent"] not in ids):
+            if not args.name or r["name"] == args.name:
+                roots.append((r["ms"], spans))
+                break
+    roots.sort(key=lambda x: -x[0])
+    for ms, spans in roots[:args.slowest]:
+        print(f"--- trace {spans[0]['trace']} ({ms:.2f} ms)")
+        print("\n".join(format_trace(spans)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# writeback.py
+# Opt-in write-back (RSFF_WRITEBACK=1): admin-approved adds/drops go onto a durable
+# local SQLite queue and are written to the Rosters tab in batches.
+#
+# A flush costs two Sheets requests however many ops it carries: one values.batchGet
+# that checks the rows about to change still hold what the snapshot says (and that
+# nobody appended rows since), and one values.batchUpdate with every write. An add and
+# a later drop of the same player on the same team cancel out locally and never reach
+# the sheet. Requests are paced by a per-minute limiter under the Sheets write quota,
+# and API failures back off on their own circuit breaker; ops stay queued across
+# restarts until written, found conflicting, or out of attempts.
+import os
+import time
+import sqlite3
+
+import sheets_sync
+from outbound import _Bucket
+from sync_schedule import CircuitBreaker
+from sim.identity import player_table, keys_for_name, norm_name, _is_true, _low
+from sim.patch import add_row, drop_row, roster_header, column_for, _bool_cell, _FLAG, _NAME
+
+ENABLED = sheets_sync.WRITEBACK
+BATCH = int(os.getenv("RSFF_WRITEBACK_BATCH", "25"))                      # ops per flush
+MAX_ATTEMPTS = int(os.getenv("RSFF_WRITEBACK_MAX_ATTEMPTS", "5"))         # failed flushes before an op gives up
+REQUESTS_PER_MIN = int(os.getenv("RSFF_WRITEBACK_REQUESTS_PER_MIN", "50"))  # Sheets allows 60 writes/min/user
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ops (
+    id           INTEGER PRIMARY KEY,
+    created      TEXT NOT NULL,
+    kind         TEXT NOT NULL,          -- 'add' | 'drop'
+    team         TEXT NOT NULL,
+    player       TEXT NOT NULL,
+    approved_by  TEXT,
+    status       TEXT NOT NULL DEFAULT 'pending',  -- pending | done | coalesced | conflict | failed
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    flushed      TEXT
+);
+CREATE INDEX IF NOT EXISTS ops_status ON ops(status, id);
+"""
+
+_QUEUES = {}
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _col_number(letters: str) -> int:
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def queue(path: str) -> "WriteQueue":
+    """The queue for one league's database, opened once per process."""
+    q = _QUEUES.get(path)
+    if q is None:
+        q = _QUEUES[path] = WriteQueue(path)
+    return q
+
+
+class WriteQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)  # flushes run in a worker thread
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.bucket = _Bucket(REQUESTS_PER_MIN, 60.0)
+        self.breaker = CircuitBreaker.from_env()
+        self.stats = {"flushes": 0, "requests": 0, "written": 0, "coalesced": 0, "conflicts": 0, "stale": 0}
+
+    # ---------- queue ----------
+
+    def enqueue(self, kind: str, team: str, player: str, approved_by: str = "") -> tuple[int, bool]:
+        """(op id, newly queued) — an identical op already pending is not queued twice."""
+        row = self.conn.execute(
+            "SELECT id FROM ops WHERE status='pending' AND kind=? AND team=? AND player=?",
+            (kind, team, player)).fetchone()
+        if row:
+            return row[0], False
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO ops(created, kind, team, player, approved_by) VALUES (?,?,?,?,?)",
+                (_now(), kind, team, player, approved_by))
+        return cur.lastrowid, True
+
+    def pending(self, limit: int | None = None) -> list[dict]:
+        sql = "SELECT id, kind, team, player, attempts FROM ops WHERE status='pending' ORDER BY id"
+        rows = self.conn.execute(sql + (f" LIMIT {int(limit)}" if limit else "")).fetchall()
+        return [{"id": r[0], "kind": r[1], "team": r[2], "player": r[3], "attempts": r[4]} for r in rows]
+
+    def recent(self, n: int = 10) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT id, kind, team, player, status, error, flushed FROM ops WHERE status != 'pending'"
+            " ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+        return [dict(zip(("id", "kind", "team", "player", "status", "error", "flushed"), r)) for r in rows]
+
+    def counts(self) -> dict:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM ops GROUP BY status").fetchall())
+
+    def _mark(self, ids, status: str, error: str | None = None):
+        if not ids:
+            return
+        with self.conn:
+            self.conn.executemany("UPDATE ops SET status=?, error=?, flushed=? WHERE id=?",
+                                  [(status, error, _now(), i) for i in ids])
+
+    # ---------- flush ----------
+
+    @staticmethod
+    def _plan(ops: list[dict]) -> tuple[list[dict], list[int], int]:
+        """
+        (ops to write, ids that cancel out, ops deferred). Only one op per player goes
+        into a batch: an add then a drop of the same player on the same team cancel;
+        any other second op for that player waits for the next flush.
+        """
+        batch: dict[int, dict] = {}
+        seen: dict[str, dict] = {}
+        held: set[str] = set()
+        cancel, deferred = [], 0
+        for op in ops:
+            k = norm_name(op["player"])
+            prev = seen.get(k)
+            if k in held:
+                deferred += 1
+            elif prev is None:
+                seen[k] = batch[op["id"]] = op
+            elif prev["kind"] == "add" and op["kind"] == "drop" and _low(prev["team"]) == _low(op["team"]):
+                del batch[prev["id"]], seen[k]
+                cancel += [prev["id"], op["id"]]
+            else:
+                held.add(k)
+                deferred += 1
+        return list(batch.values()), cancel, deferred
+
+    def ready(self) -> bool:
+        """Whether a flush may run now: breaker closed (or probing) and two requests of quota left."""
+        self.bucket.wait_time(time.monotonic())  # drops sends older than the window
+        return self.breaker.allow() and len(self.bucket.times) + 2 <= self.bucket.count
+
+    def flush(self, snapshot: dict, sheet_id: str, rosters_range: str) -> dict:
+        """
+        Write up to BATCH pending ops against `snapshot`. Returns {"status": ...}:
+          idle     — nothing to write (or nothing left after cancelling pairs)
+          ok       — "written" holds the ops as apply_roster_ops takes them
+          stale    — the sheet no longer matches the snapshot; nothing written, resync first
+        plus "conflicts" [(op, reason)], "coalesced" and "deferred" counts.
+        API errors count against the op attempts and the breaker, and are re-raised.
+        """
+        ops = self.pending(BATCH)
+        batch, cancel, deferred = self._plan(ops)
+        self._mark(cancel, "coalesced")
+        self.stats["coalesced"] += len(cancel)
+        out = {"status": "idle", "written": [], "conflicts": [], "coalesced": len(cancel), "deferred": deferred}
+        if not batch:
+            return out
+
+        table = player_table(snapshot)
+        rosters = snapshot["tabs"].get("Rosters", [])
+        header = roster_header(snapshot)
+        flag_col, name_col = column_for(header, _FLAG), column_for(header, _NAME)
+        tab, c1, _, top = sheets_sync._parse_range(rosters_range)
+        qtab = "'" + tab.replace("'", "''") + "'"
+        base = _col_number(c1 or "A")
+        letter = {h: sheets_sync._col_letters(base + j) for j, h in enumerate(header)}
+        last = sheets_sync._col_letters(base + len(header) - 1)
+
+        # resolve every op against the snapshot; what can't apply is a conflict, not a retry
+        drops, adds, conflicts = [], [], []
+        for op in batch:
+            if flag_col is None or name_col is None:
+                conflicts.append((op, "Rosters has no player name / On Roster Flag column."))
+            elif op["kind"] == "drop":
+                i = drop_row(snapshot, op["team"], op["player"])
+                if i is None:
+                    conflicts.append((op, f"{op['player']} is not on {op['team']}'s roster."))
+                else:
+                    drops.append((op, i))
+            else:
+                keys = keys_for_name(table, op["player"])
+                p = table["players"][keys[0]] if keys else None
+                if p is not None and p["on_roster"]:
+                    conflicts.append((op, f"{p['name']} is already rostered by {p['team']}."))
+                    continue
+                try:
+                    adds.append((op, add_row(snapshot, op["team"], op["player"])))
+                except ValueError as e:
+                    conflicts.append((op, str(e)))
+        for op, reason in conflicts:
+            self._mark([op["id"]], "conflict", reason)
+        self.stats["conflicts"] += len(conflicts)
+        out["conflicts"] = conflicts
+        if not drops and not adds:
+            return out
+
+        # sheet row = snapshot index + top + 1 (the header is on row `top`); adds go after the
+        # snapshot's last row
+        start = len(rosters) + top + 1
+        check = [f"{qtab}!{letter[name_col]}{top}:{letter[name_col]}"]
+        check += [f"{qtab}!{c1 or 'A'}{i + top + 1}:{last}{i + top + 1}" for _, i in drops]
+        try:
+            self.bucket.take(time.monotonic())
+            self.stats["requests"] += 1
+            got = sheets_sync.read_ranges(sheet_id, check)
+            last_row = top + len(got[0]) - 1  # last non-blank name on the sheet
+            if last_row >= start or any(not self._same(rosters[i], header, vals[0] if vals else [])
+                                        for (_, i), vals in zip(drops, got[1:])):
+                self.stats["stale"] += 1
+                return {**out, "status": "stale"}
+
+            data = [{"range": f"{qtab}!{letter[flag_col]}{i + top + 1}",
+                     "values": [[_bool_cell(snapshot, flag_col, False)]]} for _, i in drops]
+            if adds:
+                data.append({"range": f"{qtab}!{c1 or 'A'}{start}:{last}{start + len(adds) - 1}",
+                             "values": [[row[h] for h in header] for _, row in adds]})
+            self.bucket.take(time.monotonic())
+            self.stats["requests"] += 1
+            echoed = sheets_sync.write_ranges(sheet_id, data)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            err = f"{type(e).__name__}: {e}"[:200]
+            with self.conn:
+                for op in [o for o, _ in drops] + [o for o, _ in adds]:
+                    gave_up = op["attempts"] + 1 >= MAX_ATTEMPTS
+                    self.conn.execute("UPDATE ops SET attempts=attempts+1, error=?, status=? WHERE id=?",
+                                      (err, "failed" if gave_up else "pending", op["id"]))
+            raise
+        self.breaker.record_success()
+
+        # patch with the cells as the sheet echoed them back (USER_ENTERED turns "1114" into 1114,
+        # 2300000.0 into 2300000…), so the next pull reads the same rows and hashes the same
+        echoed += [[]] * (len(data) - len(echoed))
+        written = [{"id": op["id"], "kind": "drop", "team": op["team"], "player": op["player"],
+                    "flag": (vals[0][0] if vals and vals[0] else data[k]["values"][0][0])}
+                   for k, ((op, _), vals) in enumerate(zip(drops, echoed))]
+        block = echoed[-1] if adds else []
+        for j, (op, row) in enumerate(adds):
+            if j < len(block):
+                cells = block[j]
+                row = {h: (cells[i] if i < len(cells) else "") for i, h in enumerate(header)}
+            written.append({"id": op["id"], "kind": "add", "team": op["team"], "player": op["player"], "values": row})
+        self._mark([w["id"] for w in written], "done")
+        self.stats["flushes"] += 1
+        self.stats["written"] += len(written)
+        return {**out, "status": "ok", "written": written}
+
+    @staticmethod
+    def _same(row: dict, header: list[str], cells: list) -> bool:
+        """Whether a row read back from the sheet still is the snapshot's row (team, name, flag)."""
+        got = {h: (cells[j] if j < len(cells) else "") for j, h in enumerate(header)}
+        flag = column_for(header, _FLAG)
+        for h in (column_for(header, ("team",)), column_for(header, _NAME)):
+            if h is not None and norm_name(got[h]) != norm_name(row.get(h)):
+                return False
+        return _is_true(got[flag]) == _is_true(row.get(flag))
+
+    def describe(self) -> str:
+        c = self.counts()
+        s = self.stats
+        line = (f"Write-back → {c.get('pending', 0)} pending, {c.get('done', 0)} written, "
+                f"{c.get('coalesced', 0)} coalesced, {c.get('conflict', 0)} conflict(s), {c.get('failed', 0)} failed"
+                f" | {s['flushes']} flush(es), {s['requests']} request(s)")
+        if s["stale"]:
+            line += f", {s['stale']} stale (resynced)"
+        if self.breaker.failures:
+            line += " | " + self.breaker.describe().replace("Sheets:", "writes:")
+        return line